@@ -0,0 +1,60 @@
+import argparse
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+from PySide6 import QtCore
+
+from api.audio.library_analyzer import LibraryAnalyzer, ALL_CORES_ANALYSIS_WORKERS
+from api.music.music_and_playlists_manager import MusicAndPlaylistsManager
+from config.config import USER_DATA_FOLDER
+
+basedir = Path(os.path.dirname(__file__))
+
+
+if __name__ == '__main__':
+    # Headless batch analysis of the whole archive on every core, interrupting it with Ctrl+C loses nothing already
+    # analyzed and the next run resumes with the remaining songs
+    parser = argparse.ArgumentParser(description="Analyze loudness, silences, waveform, tempo and energy of the archive")
+    parser.add_argument("--workers", type=int, default=ALL_CORES_ANALYSIS_WORKERS)
+    args = parser.parse_args()
+
+    app = QtCore.QCoreApplication([])
+
+    musics_and_playlists_manager = MusicAndPlaylistsManager()
+    musics_and_playlists_manager.start(basedir / USER_DATA_FOLDER)
+    songs_to_analyze = musics_and_playlists_manager.get_songs_to_analyze()
+    print(f"{len(songs_to_analyze)} songs to analyze with {args.workers} workers")
+    if len(songs_to_analyze) == 0:
+        sys.exit(0)
+
+    library_analyzer = LibraryAnalyzer(p_max_workers=args.workers, p_throttle_s=0.0)
+    start = time.perf_counter()
+    progress = [0]
+
+    def handle_track_analyzed(p_uid, p_results):
+        musics_and_playlists_manager.store_analysis_results(p_uid, p_results)
+        progress[0] += 1
+        if progress[0] % 50 == 0:
+            elapsed = time.perf_counter() - start
+            print(f"{progress[0]}/{len(songs_to_analyze)} songs, {elapsed / progress[0]:.2f} s per song")
+
+    def handle_interruption(*p_args):
+        library_analyzer.stop()
+        app.quit()
+
+    library_analyzer.track_analyzed.connect(handle_track_analyzed)
+    library_analyzer.analysis_finished.connect(app.quit)
+    signal.signal(signal.SIGINT, handle_interruption)
+    # Python signal handlers only run when the interpreter gets control back from the event loop
+    interrupt_timer = QtCore.QTimer()
+    interrupt_timer.timeout.connect(lambda: None)
+    interrupt_timer.start(200)
+
+    library_analyzer.enqueue_songs(songs_to_analyze)
+    app.exec()
+    musics_and_playlists_manager.flush_analysis_results()
+    musics_and_playlists_manager.flush_db_writes()
+    print(f"{progress[0]} songs analyzed in {time.perf_counter() - start:.1f} s")
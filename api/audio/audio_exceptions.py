@@ -0,0 +1,13 @@
+class AudioError(Exception):
+
+    def __init__(self, p_message):
+        self.message = p_message
+        super().__init__(self.message)
+
+
+class AudioDecodeError(AudioError):
+
+    def __init__(self, p_path_to_file, p_reason: str = ""):
+        self.undecodable_path = p_path_to_file
+        self.message = f"Path {self.undecodable_path} could not be decoded {p_reason}".strip()
+        super().__init__(self.message)
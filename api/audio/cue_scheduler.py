@@ -0,0 +1,87 @@
+from typing import Dict, List, Tuple, Hashable
+
+DEFAULT_CUE_LATENCY_MS = 80.0
+NOT_READY_EXTRA_LEAD_MS = 150.0
+MAX_CUE_LEAD_MS = 900.0
+LATENCY_SMOOTHING_FACTOR = 0.3
+
+
+class CueLatencyTable:
+    _latencies_ms: Dict[str, float]
+    _is_dirty: bool
+
+    def __init__(self, p_latencies_ms: Dict[str, float] = None):
+        self._latencies_ms = {} if p_latencies_ms is None else dict(p_latencies_ms)
+        self._is_dirty = False
+
+    @property
+    def is_dirty(self):
+        return self._is_dirty
+
+    @is_dirty.setter
+    def is_dirty(self, p_is_dirty):
+        if isinstance(p_is_dirty, bool):
+            self._is_dirty = p_is_dirty
+
+    def latency(self, p_cue_name: str):
+        return self._latencies_ms.get(p_cue_name, DEFAULT_CUE_LATENCY_MS)
+
+    def all_latencies(self):
+        return dict(self._latencies_ms)
+
+    def record_measurement(self, p_cue_name: str, p_measured_latency_ms: float):
+        if p_measured_latency_ms < 0 or p_measured_latency_ms > MAX_CUE_LEAD_MS:
+            return
+        if p_cue_name in self._latencies_ms:
+            # Exponential moving average, a single noisy measurement only moves the estimate a little
+            previous = self._latencies_ms[p_cue_name]
+            self._latencies_ms[p_cue_name] = previous + LATENCY_SMOOTHING_FACTOR * (p_measured_latency_ms - previous)
+        else:
+            self._latencies_ms[p_cue_name] = p_measured_latency_ms
+        self.is_dirty = True
+
+    def lead_time(self, p_cue_name: str, p_is_decode_ready: bool = True):
+        lead_time = self.latency(p_cue_name)
+        if not p_is_decode_ready:
+            lead_time += NOT_READY_EXTRA_LEAD_MS
+        return min(lead_time, MAX_CUE_LEAD_MS)
+
+
+class CueScheduler:
+    _planned_keys: set
+    _fired_keys: set
+
+    def __init__(self):
+        self._planned_keys = set()
+        self._fired_keys = set()
+
+    def is_planned(self, p_key: Hashable):
+        return p_key in self._planned_keys
+
+    def plan(self, p_now: float, p_upcoming_cues: List[Tuple[Hashable, float, str]], p_lead_time_ms) \
+            -> List[Tuple[Hashable, float, str]]:
+        # Returns (key, delay in seconds, cue name) for every cue not planned yet, triggered early by its lead time
+        plans = []
+        for key, due_time, cue_name in p_upcoming_cues:
+            if key in self._planned_keys:
+                continue
+            self._planned_keys.add(key)
+            fire_time = due_time - p_lead_time_ms(cue_name) / 1000
+            plans.append((key, max(0.0, fire_time - p_now), cue_name))
+        return plans
+
+    def forget_before(self, p_key: Tuple):
+        # Keys are ordered, everything before the engine position has already been consumed
+        self._planned_keys = {x for x in self._planned_keys if x >= p_key}
+        self._fired_keys = {x for x in self._fired_keys if x >= p_key}
+
+    def mark_fired(self, p_key: Hashable):
+        self._fired_keys.add(p_key)
+
+    def cancel_all(self):
+        # A cue already fired ahead of its due time must not be planned again after a pause
+        self._planned_keys = set(self._fired_keys)
+
+    def reset(self):
+        self._planned_keys.clear()
+        self._fired_keys.clear()
@@ -0,0 +1,127 @@
+from typing import Dict, Hashable
+
+DEFAULT_DUCKED_GAIN = 0.1
+DEFAULT_ATTACK_MS = 120.0
+DEFAULT_RELEASE_MS = 600.0
+UNITY_GAIN = 1.0
+
+
+class DuckingEngine:
+    # Works on anything exposing setVolume(float), a QAudioOutput or a fake output for headless use
+    _base_volumes: Dict[object, float]
+    _holders: Dict[Hashable, int]
+    _ducked_gain: float
+    _attack_ms: float
+    _release_ms: float
+    _gain: float
+    _ramp_start_gain: float
+    _ramp_target_gain: float
+    _ramp_start_time: float
+    _ramp_duration_ms: float
+
+    def __init__(self, p_ducked_gain: float = DEFAULT_DUCKED_GAIN, p_attack_ms: float = DEFAULT_ATTACK_MS,
+                 p_release_ms: float = DEFAULT_RELEASE_MS):
+        self._base_volumes = {}
+        self._holders = {}
+        self.ducked_gain = p_ducked_gain
+        self.attack_ms = p_attack_ms
+        self.release_ms = p_release_ms
+        self._gain = UNITY_GAIN
+        self._ramp_start_gain = UNITY_GAIN
+        self._ramp_target_gain = UNITY_GAIN
+        self._ramp_start_time = 0.0
+        self._ramp_duration_ms = 0.0
+
+    @property
+    def ducked_gain(self):
+        return self._ducked_gain
+
+    @ducked_gain.setter
+    def ducked_gain(self, p_ducked_gain):
+        if isinstance(p_ducked_gain, (int, float)) and 0 <= p_ducked_gain <= UNITY_GAIN:
+            self._ducked_gain = float(p_ducked_gain)
+
+    @property
+    def attack_ms(self):
+        return self._attack_ms
+
+    @attack_ms.setter
+    def attack_ms(self, p_attack_ms):
+        if isinstance(p_attack_ms, (int, float)) and p_attack_ms >= 0:
+            self._attack_ms = float(p_attack_ms)
+
+    @property
+    def release_ms(self):
+        return self._release_ms
+
+    @release_ms.setter
+    def release_ms(self, p_release_ms):
+        if isinstance(p_release_ms, (int, float)) and p_release_ms >= 0:
+            self._release_ms = float(p_release_ms)
+
+    @property
+    def gain(self):
+        return self._gain
+
+    @property
+    def is_ducked(self):
+        return len(self._holders) > 0
+
+    @property
+    def is_ramping(self):
+        return self._gain != self._ramp_target_gain
+
+    def add_output(self, p_output, p_base_volume: float):
+        self._base_volumes[p_output] = p_base_volume
+        p_output.setVolume(p_base_volume * self._gain)
+
+    def base_volume(self, p_output):
+        return self._base_volumes[p_output]
+
+    def set_base_volume(self, p_output, p_base_volume: float):
+        # The user volume is kept apart from the ducking gain, the effective volume is their product
+        self._base_volumes[p_output] = p_base_volume
+        p_output.setVolume(p_base_volume * self._gain)
+
+    def duck(self, p_holder: Hashable, p_now: float):
+        # Overlapping ducks are reference counted, only the first one starts the attack ramp
+        self._holders[p_holder] = self._holders.get(p_holder, 0) + 1
+        if self._ramp_target_gain != self._ducked_gain:
+            self.start_ramp(self._ducked_gain, self._attack_ms, p_now)
+
+    def release(self, p_holder: Hashable, p_now: float):
+        if p_holder not in self._holders:
+            return
+        self._holders[p_holder] -= 1
+        if self._holders[p_holder] <= 0:
+            del self._holders[p_holder]
+        if not self._holders:
+            self.start_ramp(UNITY_GAIN, self._release_ms, p_now)
+
+    def release_all(self, p_now: float):
+        self._holders.clear()
+        self.start_ramp(UNITY_GAIN, self._release_ms, p_now)
+
+    def start_ramp(self, p_target_gain: float, p_duration_ms: float, p_now: float):
+        # A new ramp always starts from the current gain, so reversing half way never jumps
+        self._ramp_start_gain = self._gain
+        self._ramp_target_gain = p_target_gain
+        self._ramp_start_time = p_now
+        # The duration is scaled by the distance left to cover, so the slope stays the same
+        distance = abs(p_target_gain - self._gain) / max(UNITY_GAIN - self._ducked_gain, 1e-6)
+        self._ramp_duration_ms = p_duration_ms * min(1.0, distance)
+        self.tick(p_now)
+
+    def tick(self, p_now: float):
+        # Returns True while a ramp is still in progress
+        if not self.is_ramping:
+            return False
+        elapsed_ms = (p_now - self._ramp_start_time) * 1000
+        if self._ramp_duration_ms <= 0 or elapsed_ms >= self._ramp_duration_ms:
+            self._gain = self._ramp_target_gain
+        else:
+            progress = max(0.0, elapsed_ms / self._ramp_duration_ms)
+            self._gain = self._ramp_start_gain + (self._ramp_target_gain - self._ramp_start_gain) * progress
+        for output, base_volume in self._base_volumes.items():
+            output.setVolume(base_volume * self._gain)
+        return self.is_ramping
@@ -0,0 +1,146 @@
+import os
+import threading
+from collections import deque
+from pathlib import Path
+
+from PySide6 import QtCore
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QThread
+
+from api.audio.audio_exceptions import AudioDecodeError
+
+# Analysis is a background chore, it keeps at least half of the cores for the playback and the UI
+DEFAULT_MAX_ANALYSIS_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+ALL_CORES_ANALYSIS_WORKERS = os.cpu_count() or 1
+ANALYSIS_THROTTLE_S = 0.002
+
+
+def get_default_analysis_stages():
+    # Imported on first use, the stages pull numpy in and the analysis only starts once the window is shown
+    from api.audio.loudness import LoudnessMeter
+    from api.audio.silence import SilenceDetector
+    from api.audio.tempo import TempoEnergyAnalyzer
+    from api.audio.waveform import WaveformPeaksBuilder
+    return LoudnessMeter, SilenceDetector, WaveformPeaksBuilder, TempoEnergyAnalyzer
+
+
+class AnalysisTaskSignals(QObject):
+    track_analyzed = QtCore.Signal(object, dict)
+    track_failed = QtCore.Signal(object, str)
+
+
+class AnalysisTask(QRunnable):
+    _uid: object
+    _path: Path
+    _stages: tuple
+    _signals: AnalysisTaskSignals
+    _stop_event: threading.Event
+    _throttle_s: float
+
+    def __init__(self, p_uid, p_path: Path, p_stages, p_signals: AnalysisTaskSignals, p_stop_event: threading.Event,
+                 p_throttle_s: float):
+        super().__init__()
+        self._uid = p_uid
+        self._path = p_path
+        self._stages = p_stages
+        self._signals = p_signals
+        self._stop_event = p_stop_event
+        self._throttle_s = p_throttle_s
+
+    def run(self):
+        from api.audio.pcm_decoder import decode_file
+        QThread.currentThread().setPriority(QThread.Priority.LowestPriority)
+        stages = [x() for x in self._stages]
+
+        def feed_stages(p_samples, p_sample_rate):
+            for stage in stages:
+                stage.feed(p_samples, p_sample_rate)
+
+        try:
+            decode_file(self._path, feed_stages, self._stop_event.is_set, self._throttle_s)
+        except AudioDecodeError as e:
+            self._signals.track_failed.emit(self._uid, e.message)
+            return
+        if self._stop_event.is_set():
+            return
+        results = {}
+        for stage in stages:
+            results.update(stage.result())
+        self._signals.track_analyzed.emit(self._uid, results)
+
+
+class LibraryAnalyzer(QObject):
+    track_analyzed = QtCore.Signal(object, dict)
+    analysis_finished = QtCore.Signal()
+
+    _pool: QThreadPool
+    _pending: deque
+    _queued_uids: set
+    _failed_uids: set
+    _nb_of_running_tasks: int
+    _stages: tuple
+    _throttle_s: float
+    _stop_event: threading.Event
+    _signals: AnalysisTaskSignals
+
+    def __init__(self, p_parent=None, p_max_workers: int = DEFAULT_MAX_ANALYSIS_WORKERS,
+                 p_stages=None, p_throttle_s: float = ANALYSIS_THROTTLE_S):
+        super().__init__(p_parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(p_max_workers)
+        self._pending = deque()
+        self._queued_uids = set()
+        self._failed_uids = set()
+        self._nb_of_running_tasks = 0
+        self._stages = None if p_stages is None else tuple(p_stages)
+        self._throttle_s = p_throttle_s
+        self._stop_event = threading.Event()
+        self._signals = AnalysisTaskSignals()
+        self._signals.track_analyzed.connect(self.handle_track_analyzed)
+        self._signals.track_failed.connect(self.handle_track_failed)
+
+    @property
+    def is_running(self):
+        return self._nb_of_running_tasks > 0 or len(self._pending) > 0
+
+    def enqueue_songs(self, p_music_objects: list):
+        # Songs already queued or already failed during this session are skipped
+        for music_object in p_music_objects:
+            if music_object is None or music_object.uid in self._queued_uids or music_object.uid in self._failed_uids:
+                continue
+            self._queued_uids.add(music_object.uid)
+            self._pending.append((music_object.uid, music_object.path))
+        self._stop_event.clear()
+        self.submit_next_tasks()
+
+    def submit_next_tasks(self):
+        # Tasks are handed to the pool one worker at a time, so stopping never leaves a long backlog behind
+        if self._stages is None and len(self._pending) > 0:
+            self._stages = get_default_analysis_stages()
+        while len(self._pending) > 0 and self._nb_of_running_tasks < self._pool.maxThreadCount():
+            uid, path = self._pending.popleft()
+            self._nb_of_running_tasks += 1
+            self._pool.start(AnalysisTask(uid, path, self._stages, self._signals, self._stop_event, self._throttle_s))
+
+    def handle_track_analyzed(self, p_uid, p_results: dict):
+        self.track_analyzed.emit(p_uid, p_results)
+        self.task_done(p_uid)
+
+    def handle_track_failed(self, p_uid, p_message: str):
+        print(p_message)
+        self._failed_uids.add(p_uid)
+        self.task_done(p_uid)
+
+    def task_done(self, p_uid):
+        self._queued_uids.discard(p_uid)
+        self._nb_of_running_tasks = max(0, self._nb_of_running_tasks - 1)
+        self.submit_next_tasks()
+        if not self.is_running:
+            self.analysis_finished.emit()
+
+    def stop(self):
+        self._stop_event.set()
+        self._pending.clear()
+        self._pool.waitForDone()
+        # Interrupted songs are simply analyzed again on the next start
+        self._queued_uids.clear()
+        self._nb_of_running_tasks = 0
@@ -0,0 +1,55 @@
+import numpy as np
+
+LOUDNESS_BLOCK_S = 0.4
+ABSOLUTE_GATE_DB = -70.0
+RELATIVE_GATE_DB = -10.0
+TARGET_LOUDNESS_DB = -18.0
+MAX_GAIN_DB = 12.0
+GAIN_DB_COLUMN = "gain_db"
+
+
+def db_to_linear(p_db: float):
+    return 10 ** (p_db / 20)
+
+
+class LoudnessMeter:
+    # Gated block RMS in the spirit of BS.1770, without the K-weighting filter
+    _sample_rate: int
+    _block_size: int
+    _remainder: np.ndarray
+    _block_energies: list
+
+    def __init__(self):
+        self._sample_rate = 0
+        self._block_size = 0
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._block_energies = []
+
+    def feed(self, p_samples: np.ndarray, p_sample_rate: int):
+        if p_sample_rate != self._sample_rate:
+            self._sample_rate = p_sample_rate
+            self._block_size = max(1, int(p_sample_rate * LOUDNESS_BLOCK_S))
+        samples = np.concatenate((self._remainder, p_samples)) if len(self._remainder) > 0 else p_samples
+        nb_of_blocks = len(samples) // self._block_size
+        if nb_of_blocks > 0:
+            blocks = samples[:nb_of_blocks * self._block_size].reshape(nb_of_blocks, self._block_size)
+            self._block_energies.append(np.mean(np.square(blocks, dtype=np.float64), axis=1))
+        self._remainder = samples[nb_of_blocks * self._block_size:].copy()
+
+    def loudness_db(self):
+        if len(self._block_energies) == 0:
+            return None
+        energies = np.concatenate(self._block_energies)
+        energies = energies[energies > 10 ** (ABSOLUTE_GATE_DB / 10)]
+        if len(energies) == 0:
+            return None
+        relative_gate = np.mean(energies) * 10 ** (RELATIVE_GATE_DB / 10)
+        energies = energies[energies > relative_gate]
+        return float(10 * np.log10(np.mean(energies)))
+
+    def result(self):
+        loudness_db = self.loudness_db()
+        if loudness_db is None:
+            return {GAIN_DB_COLUMN: 0.0}
+        gain_db = min(MAX_GAIN_DB, max(-MAX_GAIN_DB, TARGET_LOUDNESS_DB - loudness_db))
+        return {GAIN_DB_COLUMN: round(gain_db, 2)}
@@ -0,0 +1,71 @@
+import time
+from pathlib import Path
+
+import numpy as np
+from PySide6.QtCore import QEventLoop, QUrl
+from PySide6.QtMultimedia import QAudioDecoder, QAudioFormat, QAudioBuffer
+
+from api.audio.audio_exceptions import AudioDecodeError
+
+ANALYSIS_SAMPLE_RATE = 22050
+
+SAMPLE_FORMAT_DTYPES = {
+    QAudioFormat.SampleFormat.UInt8: (np.uint8, 128.0, 128.0),
+    QAudioFormat.SampleFormat.Int16: (np.int16, 0.0, 32768.0),
+    QAudioFormat.SampleFormat.Int32: (np.int32, 0.0, 2147483648.0),
+    QAudioFormat.SampleFormat.Float: (np.float32, 0.0, 1.0),
+}
+
+
+def buffer_to_mono(p_buffer: QAudioBuffer) -> np.ndarray:
+    audio_format = p_buffer.format()
+    dtype, offset, scale = SAMPLE_FORMAT_DTYPES[audio_format.sampleFormat()]
+    data = p_buffer.constData()
+    if hasattr(data, "toBytes"):
+        data = data.toBytes()
+    samples = np.frombuffer(data, dtype=dtype, count=p_buffer.byteCount() // np.dtype(dtype).itemsize)
+    samples = (samples.astype(np.float32) - offset) / scale
+    channel_count = max(1, audio_format.channelCount())
+    if channel_count > 1:
+        samples = samples[:len(samples) - len(samples) % channel_count].reshape(-1, channel_count).mean(axis=1)
+    return samples
+
+
+def decode_file(p_path: Path, p_consumer, p_should_stop=None, p_throttle_s: float = 0.0):
+    # Streams the decoded file to p_consumer(samples, sample_rate) one buffer at a time, so memory stays bounded
+    # whatever the length of the track. Must run in a thread able to spin its own event loop.
+    decoder = QAudioDecoder()
+    requested_format = QAudioFormat()
+    requested_format.setSampleFormat(QAudioFormat.SampleFormat.Float)
+    requested_format.setChannelCount(1)
+    requested_format.setSampleRate(ANALYSIS_SAMPLE_RATE)
+    decoder.setAudioFormat(requested_format)
+    decoder.setSource(QUrl.fromLocalFile(str(p_path)))
+    loop = QEventLoop()
+    errors = []
+
+    def read_buffer():
+        if p_should_stop is not None and p_should_stop():
+            decoder.stop()
+            loop.quit()
+            return
+        while decoder.bufferAvailable():
+            audio_buffer = decoder.read()
+            if audio_buffer.isValid():
+                p_consumer(buffer_to_mono(audio_buffer), audio_buffer.format().sampleRate())
+        if p_throttle_s > 0:
+            # Leaves room to the playback, analysis is never urgent
+            time.sleep(p_throttle_s)
+
+    def handle_error(p_error):
+        errors.append(decoder.errorString())
+        loop.quit()
+
+    decoder.bufferReady.connect(read_buffer)
+    decoder.finished.connect(loop.quit)
+    decoder.error.connect(handle_error)
+    decoder.start()
+    loop.exec()
+    decoder.stop()
+    if len(errors) > 0:
+        raise AudioDecodeError(p_path, errors[0])
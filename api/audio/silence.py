@@ -0,0 +1,52 @@
+import numpy as np
+
+SILENCE_FRAME_S = 0.02
+SILENCE_THRESHOLD_DB = -50.0
+START_OFFSET_MS_COLUMN = "start_offset_ms"
+END_OFFSET_MS_COLUMN = "end_offset_ms"
+
+
+class SilenceDetector:
+    # Only the position of the first and last loud frames is kept, memory does not grow with the track length
+    _sample_rate: int
+    _frame_size: int
+    _threshold_energy: float
+    _remainder: np.ndarray
+    _nb_of_frames_seen: int
+    _first_loud_frame: int
+    _last_loud_frame: int
+
+    def __init__(self, p_threshold_db: float = SILENCE_THRESHOLD_DB):
+        self._sample_rate = 0
+        self._frame_size = 0
+        self._threshold_energy = 10 ** (p_threshold_db / 10)
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._nb_of_frames_seen = 0
+        self._first_loud_frame = -1
+        self._last_loud_frame = -1
+
+    def feed(self, p_samples: np.ndarray, p_sample_rate: int):
+        if self._sample_rate == 0:
+            self._sample_rate = p_sample_rate
+            self._frame_size = max(1, int(p_sample_rate * SILENCE_FRAME_S))
+        samples = np.concatenate((self._remainder, p_samples)) if len(self._remainder) > 0 else p_samples
+        nb_of_frames = len(samples) // self._frame_size
+        if nb_of_frames > 0:
+            frames = samples[:nb_of_frames * self._frame_size].reshape(nb_of_frames, self._frame_size)
+            loud_frames = np.flatnonzero(np.mean(np.square(frames, dtype=np.float64), axis=1) > self._threshold_energy)
+            if len(loud_frames) > 0:
+                if self._first_loud_frame < 0:
+                    self._first_loud_frame = self._nb_of_frames_seen + int(loud_frames[0])
+                self._last_loud_frame = self._nb_of_frames_seen + int(loud_frames[-1])
+            self._nb_of_frames_seen += nb_of_frames
+        self._remainder = samples[nb_of_frames * self._frame_size:].copy()
+
+    def frame_to_ms(self, p_frame: int):
+        return int(p_frame * self._frame_size * 1000 / self._sample_rate)
+
+    def result(self):
+        if self._first_loud_frame < 0:
+            # Nothing but silence, the track is left untouched
+            return {START_OFFSET_MS_COLUMN: 0, END_OFFSET_MS_COLUMN: 0}
+        return {START_OFFSET_MS_COLUMN: self.frame_to_ms(self._first_loud_frame),
+                END_OFFSET_MS_COLUMN: self.frame_to_ms(self._last_loud_frame + 1)}
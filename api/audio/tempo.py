@@ -0,0 +1,77 @@
+import numpy as np
+
+TEMPO_HOP_SIZE = 512
+MIN_BPM = 60.0
+MAX_BPM = 200.0
+PREFERRED_BPM = 120.0
+PREFERRED_BPM_SPREAD_OCTAVES = 1.0
+ENERGY_FLOOR_DB = -40.0
+BPM_COLUMN = "bpm"
+ENERGY_COLUMN = "energy"
+
+
+class TempoEnergyAnalyzer:
+    # Works on an onset envelope of one value per hop, about 43 values per second of music
+    _sample_rate: int
+    _remainder: np.ndarray
+    _frame_energies: list
+
+    def __init__(self):
+        self._sample_rate = 0
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._frame_energies = []
+
+    def feed(self, p_samples: np.ndarray, p_sample_rate: int):
+        if self._sample_rate == 0:
+            self._sample_rate = p_sample_rate
+        samples = np.concatenate((self._remainder, p_samples)) if len(self._remainder) > 0 else p_samples
+        nb_of_frames = len(samples) // TEMPO_HOP_SIZE
+        if nb_of_frames > 0:
+            frames = samples[:nb_of_frames * TEMPO_HOP_SIZE].reshape(nb_of_frames, TEMPO_HOP_SIZE)
+            self._frame_energies.append(np.mean(np.square(frames, dtype=np.float64), axis=1))
+        self._remainder = samples[nb_of_frames * TEMPO_HOP_SIZE:].copy()
+
+    def onset_envelope(self, p_frame_energies: np.ndarray):
+        # Half-wave rectified variation of the log energy, peaks on every attack
+        log_energies = np.log10(p_frame_energies + 1e-10)
+        return np.maximum(0.0, np.diff(log_energies))
+
+    def estimate_bpm(self, p_onsets: np.ndarray):
+        frame_rate = self._sample_rate / TEMPO_HOP_SIZE
+        min_lag = int(frame_rate * 60 / MAX_BPM)
+        max_lag = int(frame_rate * 60 / MIN_BPM) + 1
+        if len(p_onsets) <= 2 * max_lag:
+            return None
+        # Autocorrelation through the FFT, zero padded to avoid the circular wrap
+        spectrum = np.fft.rfft(p_onsets - np.mean(p_onsets), 2 * len(p_onsets))
+        autocorrelation = np.fft.irfft(spectrum * np.conj(spectrum))[:max_lag + 1]
+        lags = np.arange(min_lag, max_lag)
+        bpms = 60 * frame_rate / lags
+        # A log-normal prior around the usual tempo keeps halves and doubles from winning
+        prior = np.exp(-0.5 * (np.log2(bpms / PREFERRED_BPM) / PREFERRED_BPM_SPREAD_OCTAVES) ** 2)
+        scores = autocorrelation[min_lag:max_lag] * prior
+        best = int(np.argmax(scores))
+        lag = float(lags[best])
+        if 0 < best < len(scores) - 1:
+            left, center, right = scores[best - 1], scores[best], scores[best + 1]
+            denominator = left - 2 * center + right
+            if denominator != 0:
+                lag += 0.5 * (left - right) / denominator
+        return round(60 * frame_rate / lag, 1)
+
+    def estimate_energy(self, p_frame_energies: np.ndarray, p_onsets: np.ndarray):
+        # Half loudness, half density of attacks, both brought back to [0, 1]
+        loudness_db = 10 * np.log10(np.mean(p_frame_energies) + 1e-10)
+        loudness = min(1.0, max(0.0, (loudness_db - ENERGY_FLOOR_DB) / -ENERGY_FLOOR_DB))
+        if len(p_onsets) == 0:
+            return round(0.5 * loudness, 3)
+        attack_density = float(np.count_nonzero(p_onsets > 2 * np.mean(p_onsets))) / len(p_onsets)
+        return round(0.5 * loudness + 0.5 * min(1.0, 4 * attack_density), 3)
+
+    def result(self):
+        if len(self._frame_energies) == 0:
+            return {BPM_COLUMN: 0.0, ENERGY_COLUMN: 0.0}
+        frame_energies = np.concatenate(self._frame_energies)
+        onsets = self.onset_envelope(frame_energies)
+        bpm = self.estimate_bpm(onsets)
+        return {BPM_COLUMN: 0.0 if bpm is None else bpm, ENERGY_COLUMN: self.estimate_energy(frame_energies, onsets)}
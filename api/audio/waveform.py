@@ -0,0 +1,77 @@
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from config.config import WAVEFORM_PEAKS_KEY
+
+WAVEFORM_NB_OF_PEAKS = 2000
+WAVEFORM_BIN_SIZE = 256
+WAVEFORM_FILE_MAGIC = b"WPK1"
+WAVEFORM_FILE_HEADER = struct.Struct("<4sI")
+
+
+def reduce_peaks(p_mins: np.ndarray, p_maxs: np.ndarray, p_nb_of_peaks: int):
+    # Min/max pairs of p_nb_of_peaks equal slices, a slice keeps the extremes of the bins it covers
+    if len(p_mins) <= p_nb_of_peaks:
+        return p_mins, p_maxs
+    edges = np.linspace(0, len(p_mins), p_nb_of_peaks, endpoint=False).astype(np.int64)
+    return np.minimum.reduceat(p_mins, edges), np.maximum.reduceat(p_maxs, edges)
+
+
+def peaks_for_width(p_peaks: np.ndarray, p_width: int):
+    # One min/max pair per pixel column, shorter peak arrays are stretched instead of reduced
+    nb_of_peaks = len(p_peaks)
+    if nb_of_peaks >= p_width:
+        return reduce_peaks(p_peaks[:, 0], p_peaks[:, 1], p_width)
+    indexes = (np.arange(p_width) * nb_of_peaks) // p_width
+    return p_peaks[indexes, 0], p_peaks[indexes, 1]
+
+
+class WaveformPeaksBuilder:
+    # Keeps one min/max pair per bin of samples, a few tens of kilobytes for a whole track
+    _remainder: np.ndarray
+    _mins: list
+    _maxs: list
+
+    def __init__(self):
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._mins = []
+        self._maxs = []
+
+    def feed(self, p_samples: np.ndarray, p_sample_rate: int):
+        samples = np.concatenate((self._remainder, p_samples)) if len(self._remainder) > 0 else p_samples
+        nb_of_bins = len(samples) // WAVEFORM_BIN_SIZE
+        if nb_of_bins > 0:
+            bins = samples[:nb_of_bins * WAVEFORM_BIN_SIZE].reshape(nb_of_bins, WAVEFORM_BIN_SIZE)
+            self._mins.append(bins.min(axis=1))
+            self._maxs.append(bins.max(axis=1))
+        self._remainder = samples[nb_of_bins * WAVEFORM_BIN_SIZE:].copy()
+
+    def result(self):
+        if len(self._mins) == 0:
+            return {WAVEFORM_PEAKS_KEY: np.zeros((0, 2), dtype=np.int8)}
+        mins, maxs = reduce_peaks(np.concatenate(self._mins), np.concatenate(self._maxs), WAVEFORM_NB_OF_PEAKS)
+        peaks = np.stack((mins, maxs), axis=1)
+        return {WAVEFORM_PEAKS_KEY: np.clip(np.round(peaks * 127), -127, 127).astype(np.int8)}
+
+
+def write_peaks_file(p_path: Path, p_peaks: np.ndarray):
+    temporary_path = p_path.with_suffix(".tmp")
+    with open(temporary_path, "wb") as f:
+        f.write(WAVEFORM_FILE_HEADER.pack(WAVEFORM_FILE_MAGIC, len(p_peaks)))
+        f.write(np.ascontiguousarray(p_peaks, dtype=np.int8).tobytes())
+    os.replace(temporary_path, p_path)
+
+
+def load_peaks_file(p_path: Path):
+    # Memory-mapped, nothing is read from disk until the waveform is actually drawn
+    if not p_path.exists() or p_path.stat().st_size < WAVEFORM_FILE_HEADER.size:
+        return None
+    with open(p_path, "rb") as f:
+        magic, nb_of_peaks = WAVEFORM_FILE_HEADER.unpack(f.read(WAVEFORM_FILE_HEADER.size))
+    if magic != WAVEFORM_FILE_MAGIC or nb_of_peaks == 0 or \
+            p_path.stat().st_size != WAVEFORM_FILE_HEADER.size + 2 * nb_of_peaks:
+        return None
+    return np.memmap(p_path, dtype=np.int8, mode="r", offset=WAVEFORM_FILE_HEADER.size, shape=(nb_of_peaks, 2))
@@ -0,0 +1,123 @@
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from api.util.instrumentation import Instrumentation
+
+
+class DbWrite:
+    _function: object
+    _args: tuple
+    _key: object
+    _future: Future
+
+    def __init__(self, p_function, p_args: tuple, p_key):
+        self._function = p_function
+        self._args = p_args
+        self._key = p_key
+        self._future = Future()
+
+    @property
+    def key(self):
+        return self._key
+
+    @property
+    def args(self):
+        return self._args
+
+    @args.setter
+    def args(self, p_args):
+        if isinstance(p_args, tuple):
+            self._args = p_args
+
+    @property
+    def future(self):
+        return self._future
+
+    def run(self):
+        if not self._future.set_running_or_notify_cancel():
+            return
+        try:
+            self._future.set_result(self._function(*self._args))
+        except Exception as e:
+            print(e)
+            self._future.set_exception(e)
+
+
+class DbWriter:
+    # The only thread writing to the DB, the writes run one after the other in the order they were submitted. A write
+    # submitted with the key of a write still waiting is merged with it and moved to the end of the queue, both callers
+    # then get the same future
+    _thread: threading.Thread
+    _condition: threading.Condition
+    _writes: deque
+    _waiting_writes_by_key: dict
+    _is_writing: bool
+    _is_stopping: bool
+
+    def __init__(self):
+        self._thread = None
+        self._condition = threading.Condition()
+        self._writes = deque()
+        self._waiting_writes_by_key = {}
+        self._is_writing = False
+        self._is_stopping = False
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return
+        self._is_stopping = False
+        self._thread = threading.Thread(target=self.run, name="DbWriter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # Returns once every write submitted before is in the DB
+        with self._condition:
+            self._is_stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def flush(self, p_timeout: float = None):
+        with self._condition:
+            return self._condition.wait_for(lambda: len(self._writes) == 0 and not self._is_writing, p_timeout)
+
+    def submit(self, p_function, p_args: tuple = (), p_key=None, p_merge=None) -> Future:
+        # p_merge(waiting args, new args) gives the args of the merged write, by default the new ones replace them
+        if not self.is_running():
+            # Once stopped, or before being started, the write runs right away on the caller's thread
+            db_write = DbWrite(p_function, p_args, p_key)
+            db_write.run()
+            return db_write.future
+        with self._condition:
+            db_write = None if p_key is None else self._waiting_writes_by_key.get(p_key)
+            if db_write is None:
+                db_write = DbWrite(p_function, p_args, p_key)
+                if p_key is not None:
+                    self._waiting_writes_by_key[p_key] = db_write
+            else:
+                self._writes.remove(db_write)
+                db_write.args = p_args if p_merge is None else p_merge(db_write.args, p_args)
+                Instrumentation().count("db_writer.coalesced_writes")
+            self._writes.append(db_write)
+            self._condition.notify_all()
+            return db_write.future
+
+    def run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._writes) > 0 or self._is_stopping)
+                if len(self._writes) == 0:
+                    return
+                db_write = self._writes.popleft()
+                if db_write.key is not None:
+                    del self._waiting_writes_by_key[db_write.key]
+                self._is_writing = True
+            db_write.run()
+            with self._condition:
+                self._is_writing = False
+                self._condition.notify_all()
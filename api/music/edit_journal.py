@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+from api.util.instrumentation import Instrumentation
+
+JOURNAL_SEQ_KEY = "seq"
+JOURNAL_KIND_KEY = "kind"
+SONG_ADDED_RECORD = "song_added"
+SONGS_DELETED_RECORD = "songs_deleted"
+PLAYLIST_CREATED_RECORD = "playlist_created"
+PLAYLIST_DELETED_RECORD = "playlist_deleted"
+PLAYLIST_EDITED_RECORD = "playlist_edited"
+# The journal is written into the DB, and emptied, this often while the application runs
+JOURNAL_COMPACTION_INTERVAL_S = 300
+
+
+def encode_record(p_record: dict):
+    # Uids are written as strings, tuples as lists
+    return (json.dumps(p_record, separators=(",", ":"), ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def read_journal_records(p_path: Path):
+    # A crash can leave the last line half written, everything from the first unreadable line on is ignored
+    records = []
+    if not p_path.exists():
+        return records
+    try:
+        with open(p_path, "rb") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+    except OSError as e:
+        print(e)
+    return records
+
+
+class EditJournal:
+    # Append only, the records are numbered and kept in memory by the caller's thread, the journal thread writes them
+    # and syncs the file. Every record that comes in while the disk syncs goes with the next write, one sync for the
+    # whole batch
+    _path: Path
+    _file: object
+    _thread: threading.Thread
+    _condition: threading.Condition
+    _file_lock: threading.Lock
+    _pending_records: list
+    _last_seq: int
+    _synced_seq: int
+    _is_closing: bool
+
+    def __init__(self, p_path: Path):
+        self._path = p_path
+        self._file = None
+        self._thread = None
+        self._condition = threading.Condition()
+        self._file_lock = threading.Lock()
+        self._pending_records = []
+        self._last_seq = 0
+        self._synced_seq = 0
+        self._is_closing = False
+
+    @property
+    def last_seq(self):
+        return self._last_seq
+
+    def is_open(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def open(self, p_last_seq: int):
+        # Numbering goes on after p_last_seq, the highest number already used in the file or in the DB
+        if self.is_open():
+            return
+        self._last_seq = p_last_seq
+        self._synced_seq = p_last_seq
+        self._is_closing = False
+        try:
+            self._file = open(self._path, "ab")
+        except OSError as e:
+            print(e)
+            return
+        self._thread = threading.Thread(target=self.run, name="EditJournal", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        # Returns once every record appended before is on disk
+        with self._condition:
+            self._is_closing = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def delete(self):
+        self.close()
+        self._path.unlink(missing_ok=True)
+
+    def append(self, p_kind: str, **p_values):
+        # Only numbers and queues the record, it is encoded and written by the journal thread. The values must not
+        # change afterwards
+        if not self.is_open():
+            return None
+        with self._condition:
+            self._last_seq += 1
+            p_values[JOURNAL_SEQ_KEY] = self._last_seq
+            p_values[JOURNAL_KIND_KEY] = p_kind
+            self._pending_records.append(p_values)
+            self._condition.notify_all()
+            return self._last_seq
+
+    def sync(self, p_timeout: float = None):
+        with self._condition:
+            return self._condition.wait_for(lambda: self._synced_seq >= self._last_seq or not self.is_open(),
+                                            p_timeout)
+
+    def run(self):
+        instrumentation = Instrumentation()
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._pending_records) > 0 or self._is_closing)
+                if len(self._pending_records) == 0:
+                    return
+                records = self._pending_records
+                self._pending_records = []
+            data = b"".join(encode_record(x) for x in records)
+            with self._file_lock:
+                try:
+                    if self._file is None:
+                        # Left closed by a failed truncation, tried again with every batch
+                        self._file = open(self._path, "ab")
+                    self._file.write(data)
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                except (OSError, ValueError) as e:
+                    print(e)
+            instrumentation.observe("journal.records_per_sync", len(records))
+            with self._condition:
+                self._synced_seq = records[-1][JOURNAL_SEQ_KEY]
+                self._condition.notify_all()
+
+    def truncate(self, p_up_to_seq: int):
+        # Drops the records already written into the DB. The remaining ones are copied next to the journal, which is
+        # then replaced, a crash leaves either the old or the new journal. Returns whether the journal was truncated
+        with self._file_lock:
+            if self._file is None:
+                return False
+            records = [x for x in read_journal_records(self._path) if x[JOURNAL_SEQ_KEY] > p_up_to_seq]
+            temporary_path = self._path.with_name(self._path.name + ".tmp")
+            try:
+                with open(temporary_path, "wb") as f:
+                    f.write(b"".join(encode_record(x) for x in records))
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                print(e)
+                return False
+            # An open file cannot be replaced on Windows
+            self._file.close()
+            try:
+                os.replace(temporary_path, self._path)
+                is_truncated = True
+            except OSError as e:
+                print(e)
+                is_truncated = False
+            # The journal is reopened whether it was replaced or not, the next records go after the ones it holds
+            try:
+                self._file = open(self._path, "ab")
+            except OSError as e:
+                print(e)
+                self._file = None
+                return False
+            return is_truncated
@@ -0,0 +1,164 @@
+import mmap
+import os
+import struct
+import uuid
+from array import array
+from pathlib import Path
+from typing import List
+
+from api.music.music_object import MusicObject
+from api.music.playlist import Playlist
+
+LIBRARY_SNAPSHOT_MAGIC = b"PLTNGLIB"
+# Bumped whenever the layout or the stored song fields change, older snapshots are then ignored
+LIBRARY_SNAPSHOT_VERSION = 1
+# Magic, version, DB change counter, archive stamp, number of uids, of songs, of playlists, of playlist entries and
+# size of the strings table, followed by the arrays, the songs uids, the playlists uids and the strings table. Native
+# byte order, the snapshot is a cache that never leaves the machine
+SNAPSHOT_HEADER = struct.Struct("=8sIqqIIIIQ")
+SNAPSHOT_HEADER_SIZE = 64
+UID_SIZE = 16
+STRINGS_SEPARATOR = "\x00"
+# Stands for a NULL offset in the integer arrays, NULL reals are stored as NaN
+NO_OFFSET_VALUE = -2 ** 63
+
+
+def to_real(p_value):
+    return float("nan") if p_value is None else p_value
+
+
+def from_real(p_value):
+    return None if p_value != p_value else p_value
+
+
+def to_offset(p_value):
+    return NO_OFFSET_VALUE if p_value is None else p_value
+
+
+def from_offset(p_value):
+    return None if p_value == NO_OFFSET_VALUE else p_value
+
+
+def write_library_snapshot(p_path: Path, p_change_counter: int, p_archive_folder: Path, p_archive_stamp: int,
+                           p_music_objects: List[MusicObject], p_playlists: List[Playlist]):
+    # Only the file names are stored, every song lives in the archive folder
+    if any(x.path.parent != p_archive_folder for x in p_music_objects):
+        return False
+    # Songs come first in the uids table, followed by the uids only known from the playlists
+    uids = [x.uid for x in p_music_objects]
+    uid_indexes = {x: i for i, x in enumerate(uids)}
+    playlists_entries = []
+    for playlist in p_playlists:
+        for song_uid in playlist.get_all_songs():
+            index = uid_indexes.get(song_uid)
+            if index is None:
+                index = len(uids)
+                uid_indexes[song_uid] = index
+                uids.append(song_uid)
+            playlists_entries.append(index)
+
+    strings = [x.title for x in p_music_objects] + [x.artist for x in p_music_objects] + \
+              [x.path.name for x in p_music_objects] + [x.name for x in p_playlists]
+    if any(STRINGS_SEPARATOR in x for x in strings):
+        return False
+    strings_table = STRINGS_SEPARATOR.join(strings).encode("utf-8")
+
+    # Eight bytes items first, then four bytes items, so that every array stays aligned on its item size
+    sections = [
+        array("d", [x.duration for x in p_music_objects]),
+        array("d", [to_real(x.gain_db) for x in p_music_objects]),
+        array("d", [to_real(x.bpm) for x in p_music_objects]),
+        array("d", [to_real(x.energy) for x in p_music_objects]),
+        array("q", [to_offset(x.start_offset_ms) for x in p_music_objects]),
+        array("q", [to_offset(x.end_offset_ms) for x in p_music_objects]),
+        array("d", [x.creation_date.timestamp() for x in p_playlists]),
+        array("d", [x.total_duration for x in p_playlists]),
+        array("I", [x.size() for x in p_playlists]),
+        array("I", playlists_entries),
+    ]
+    header = SNAPSHOT_HEADER.pack(LIBRARY_SNAPSHOT_MAGIC, LIBRARY_SNAPSHOT_VERSION, p_change_counter, p_archive_stamp,
+                                  len(uids), len(p_music_objects), len(p_playlists), len(playlists_entries),
+                                  len(strings_table))
+
+    # Written next to the snapshot then renamed, a crash never leaves a half written snapshot behind
+    temporary_path = p_path.with_name(p_path.name + ".tmp")
+    try:
+        with open(temporary_path, "wb") as f:
+            f.write(header.ljust(SNAPSHOT_HEADER_SIZE, b"\x00"))
+            [x.tofile(f) for x in sections]
+            f.write(b"".join(x.bytes for x in uids))
+            f.write(b"".join(x.uid.bytes for x in p_playlists))
+            f.write(strings_table)
+        os.replace(temporary_path, p_path)
+        return True
+    except OSError as e:
+        print(e)
+        return False
+
+
+def read_library_snapshot(p_path: Path, p_change_counter: int, p_archive_folder: Path, p_archive_stamp: int):
+    # Returns the songs and the playlists, or None when there is no snapshot or when it does not match the DB
+    if not p_path.exists():
+        return None
+    try:
+        with open(p_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            magic, version, change_counter, archive_stamp, nb_of_uids, nb_of_songs, nb_of_playlists, \
+                nb_of_entries, strings_table_size = SNAPSHOT_HEADER.unpack_from(mapped)
+            if magic != LIBRARY_SNAPSHOT_MAGIC or version != LIBRARY_SNAPSHOT_VERSION or \
+                    change_counter != p_change_counter or archive_stamp != p_archive_stamp:
+                return None
+            offset = SNAPSHOT_HEADER_SIZE
+
+            def read_array(p_type_code: str, p_length: int):
+                nonlocal offset
+                values = array(p_type_code)
+                values.frombytes(mapped[offset:offset + p_length * values.itemsize])
+                offset += p_length * values.itemsize
+                return values.tolist()
+
+            durations = read_array("d", nb_of_songs)
+            gains = read_array("d", nb_of_songs)
+            bpms = read_array("d", nb_of_songs)
+            energies = read_array("d", nb_of_songs)
+            start_offsets = read_array("q", nb_of_songs)
+            end_offsets = read_array("q", nb_of_songs)
+            creation_time_stamps = read_array("d", nb_of_playlists)
+            total_durations = read_array("d", nb_of_playlists)
+            playlists_sizes = read_array("I", nb_of_playlists)
+            playlists_entries = read_array("I", nb_of_entries)
+            uids_table = mapped[offset:offset + nb_of_uids * UID_SIZE]
+            offset += nb_of_uids * UID_SIZE
+            playlists_uids_table = mapped[offset:offset + nb_of_playlists * UID_SIZE]
+            offset += nb_of_playlists * UID_SIZE
+            nb_of_strings = 3 * nb_of_songs + nb_of_playlists
+            strings = mapped[offset:offset + strings_table_size].decode("utf-8").split(STRINGS_SEPARATOR) \
+                if nb_of_strings > 0 else []
+            offset += strings_table_size
+            if offset != len(mapped) or len(strings) != nb_of_strings:
+                return None
+    except (OSError, ValueError, struct.error, UnicodeDecodeError) as e:
+        print(e)
+        return None
+
+    uids = [uuid.UUID(bytes=uids_table[i:i + UID_SIZE]) for i in range(0, len(uids_table), UID_SIZE)]
+    titles = strings[:nb_of_songs]
+    artists = strings[nb_of_songs:2 * nb_of_songs]
+    file_names = strings[2 * nb_of_songs:3 * nb_of_songs]
+    names = strings[3 * nb_of_songs:]
+    music_objects = [MusicObject.from_stored_values(uids[i], titles[i], artists[i], durations[i],
+                                                    p_archive_folder / file_names[i],
+                                                    (from_real(gains[i]), from_offset(start_offsets[i]),
+                                                     from_offset(end_offsets[i]), from_real(bpms[i]),
+                                                     from_real(energies[i])))
+                     for i in range(nb_of_songs)]
+    playlists = []
+    entries_start = 0
+    for i in range(nb_of_playlists):
+        playlist_uid = uuid.UUID(bytes=playlists_uids_table[i * UID_SIZE:(i + 1) * UID_SIZE])
+        playlist = Playlist(str(playlist_uid), names[i], creation_time_stamps[i], total_durations[i])
+        entries_end = entries_start + playlists_sizes[i]
+        playlist.insert_songs_uids(0, [uids[x] for x in playlists_entries[entries_start:entries_end]])
+        playlist.is_dirty = False
+        playlists.append(playlist)
+        entries_start = entries_end
+    return music_objects, playlists
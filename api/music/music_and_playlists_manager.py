@@ -1,22 +1,40 @@
 import uuid
 import inspect
+import json
 from pathlib import Path
 import sqlite3
 from sqlite3 import Error
 import shutil
 from typing import List
 
+from api.audio.cue_scheduler import CueLatencyTable
+from api.music.db_writer import DbWriter
+from api.music.edit_journal import EditJournal, read_journal_records, JOURNAL_SEQ_KEY, JOURNAL_KIND_KEY, \
+    SONG_ADDED_RECORD, SONGS_DELETED_RECORD, PLAYLIST_CREATED_RECORD, PLAYLIST_DELETED_RECORD, PLAYLIST_EDITED_RECORD
+from api.music.library_snapshot import read_library_snapshot, write_library_snapshot
 from api.music.music_object import MusicObject
+from api.music.play_queue import PlayQueue
+from api.music.playlist_edit import PlaylistEdit, INSERT_EDIT, REMOVE_EDIT, added_and_removed_uids
 from api.music.playlist import Playlist
+from api.music.playlist_planner import PlaylistPlanner, DEFAULT_TOLERANCE_S
+from api.timer.sequence import Sequence, build_default_sequence
+from api.timer.timer_exceptions import SequenceDefinitionError
+from api.util.instrumentation import instrumented, instrument_methods
 from api.util.singleton import Singleton
 from config.config import MUSICS_AND_PLAYLISTS_DIR_NAME, MUSICS_ARCHIVE_DIR_NAME, AMBIENT_MUSICS_ARCHIVE_DIR_NAME, \
     DATABASE_MUSICS_FILE_NAME, RESOURCES_DIR_NAME, PRELOADED_SOUNDS_DIR_NAME, AMBIENT_RAIN_FILE_NAME, \
-    AMBIENT_SHREKSOPHONE_FILE_NAME
+    AMBIENT_SHREKSOPHONE_FILE_NAME, WAVEFORMS_CACHE_DIR_NAME, LIBRARY_SNAPSHOT_FILE_NAME, \
+    LIBRARY_JOURNAL_FILE_NAME, WAVEFORM_PEAKS_KEY, WAVEFORM_PEAKS_FILE_EXTENSION
 
 SQL_SONGS_TABLE_NAME = "songs"
 SQL_PLAYLISTS_TABLE_NAME = "playlists"
 SQL_PLAYLIST_SONGS_TABLE_NAME = "playlist_songs"
 SQL_AMBIENT_MUSICS_TABLE_NAME = "ambient_musics"
+SQL_SEQUENCES_TABLE_NAME = "sequences"
+SQL_CUE_LATENCIES_TABLE_NAME = "cue_latencies"
+SQL_PLAY_QUEUE_TABLE_NAME = "play_queue"
+SQL_SESSION_STATE_TABLE_NAME = "session_state"
+SQL_LIBRARY_VERSION_TABLE_NAME = "library_version"
 
 SQL_ID_COLUMN_NAME = "id"
 SQL_NAME_COLUMN_NAME = "name"
@@ -29,9 +47,57 @@ SQL_SONG_ID_COLUMN_NAME = "song_id"
 SQL_PLAYLIST_POSITION_COLUMN_NAME = "playlist_position"
 SQL_SELECTED_COLUMN_NAME = "selected"
 SQL_CREATION_TIME_STAMP_COLUMN_NAME = "creation_time_stamp"
+SQL_DEFINITION_COLUMN_NAME = "definition"
+SQL_DEVICE_ID_COLUMN_NAME = "device_id"
+SQL_CUE_NAME_COLUMN_NAME = "cue_name"
+SQL_LATENCY_MS_COLUMN_NAME = "latency_ms"
+SQL_QUEUE_POSITION_COLUMN_NAME = "queue_position"
+SQL_GAIN_DB_COLUMN_NAME = "gain_db"
+SQL_START_OFFSET_MS_COLUMN_NAME = "start_offset_ms"
+SQL_END_OFFSET_MS_COLUMN_NAME = "end_offset_ms"
+SQL_BPM_COLUMN_NAME = "bpm"
+SQL_ENERGY_COLUMN_NAME = "energy"
+SQL_TOTAL_DURATION_COLUMN_NAME = "total_duration"
+SQL_NB_OF_SONGS_COLUMN_NAME = "nb_of_songs"
+SQL_CHANGE_COUNTER_COLUMN_NAME = "change_counter"
+SQL_JOURNAL_SEQ_COLUMN_NAME = "journal_seq"
+
+# Columns filled by the background analysis, NULL until the song has been analyzed
+SQL_SONGS_ANALYSIS_COLUMNS = {SQL_GAIN_DB_COLUMN_NAME: "REAL", SQL_START_OFFSET_MS_COLUMN_NAME: "INTEGER",
+                              SQL_END_OFFSET_MS_COLUMN_NAME: "INTEGER", SQL_BPM_COLUMN_NAME: "REAL",
+                              SQL_ENERGY_COLUMN_NAME: "REAL"}
+SQL_SONGS_COLUMNS = [SQL_ID_COLUMN_NAME, SQL_TITLE_COLUMN_NAME, SQL_ARTIST_COLUMN_NAME, SQL_DURATION_COLUMN_NAME,
+                     SQL_FILE_PATH_COLUMN_NAME] + list(SQL_SONGS_ANALYSIS_COLUMNS)
+
+# Summary of the playlist songs kept in its header row, readable without loading the playlist_songs entries
+SQL_PLAYLISTS_SUMMARY_COLUMNS = {SQL_TOTAL_DURATION_COLUMN_NAME: "REAL", SQL_NB_OF_SONGS_COLUMN_NAME: "INTEGER"}
+SQL_PLAYLISTS_COLUMNS = [SQL_ID_COLUMN_NAME, SQL_NAME_COLUMN_NAME, SQL_CREATION_TIME_STAMP_COLUMN_NAME] + \
+                        list(SQL_PLAYLISTS_SUMMARY_COLUMNS)
+# Number of the last edit journal record written with the playlist, the older ones are not replayed on it
+SQL_PLAYLISTS_JOURNAL_COLUMNS = {SQL_JOURNAL_SEQ_COLUMN_NAME: "INTEGER"}
+# Number of the last song deletion journal record written into the DB, the older ones are not replayed
+SQL_LIBRARY_VERSION_JOURNAL_COLUMNS = {SQL_JOURNAL_SEQ_COLUMN_NAME: "INTEGER"}
+
+# Tables saved in the library snapshot, any change to them makes the snapshot stale
+SQL_LIBRARY_SNAPSHOT_TABLES = [SQL_SONGS_TABLE_NAME, SQL_PLAYLISTS_TABLE_NAME, SQL_PLAYLIST_SONGS_TABLE_NAME]
+
+ANALYSIS_RESULTS_BATCH_SIZE = 32
+# Past this many edits since the last save, rewriting the playlist entries is cheaper than replaying the edits
+MAX_INCREMENTAL_PLAYLIST_EDITS = 256
+# Upper bound of the position ranges shifted by the incremental playlist saves
+MAX_PLAYLIST_POSITION = 2 ** 31
+# Keys of the DB writes merged with the same write still waiting in the queue
+PLAYLIST_WRITE_KEY = "playlist"
+ANALYSIS_WRITE_KEY = "analysis"
+CUE_LATENCIES_WRITE_KEY = "cue_latencies"
+PLAY_QUEUE_WRITE_KEY = "play_queue"
+SESSION_STATE_WRITE_KEY = "session_state"
 
 ACCEPTED_MUSIC_EXTENSIONS = [".mp3", ".ogg", ".flac"]
 
+# Readers keep working on the last committed state while the DB writer is writing
+sql_enable_write_ahead_log = "PRAGMA journal_mode=WAL"
+
 # CREATE TABLE requests
 sql_create_playlists_table = f""" CREATE TABLE IF NOT EXISTS {SQL_PLAYLISTS_TABLE_NAME} (
                                         {SQL_ID_COLUMN_NAME} TEXT PRIMARY KEY,
@@ -45,6 +111,11 @@ sql_create_songs_table = f"""CREATE TABLE IF NOT EXISTS {SQL_SONGS_TABLE_NAME} (
                                     {SQL_ARTIST_COLUMN_NAME} TEXT NOT NULL,
                                     {SQL_DURATION_COLUMN_NAME} REAL NOT NULL,
                                     {SQL_FILE_PATH_COLUMN_NAME} TEXT NOT NULL,
+                                    {SQL_GAIN_DB_COLUMN_NAME} REAL,
+                                    {SQL_START_OFFSET_MS_COLUMN_NAME} INTEGER,
+                                    {SQL_END_OFFSET_MS_COLUMN_NAME} INTEGER,
+                                    {SQL_BPM_COLUMN_NAME} REAL,
+                                    {SQL_ENERGY_COLUMN_NAME} REAL,
                                     UNIQUE({SQL_FILE_PATH_COLUMN_NAME})
                                 );"""
 
@@ -58,6 +129,9 @@ sql_create_playlists_songs_table = f"""CREATE TABLE IF NOT EXISTS {SQL_PLAYLIST_
                                         UNIQUE({SQL_PLAYLIST_ID_COLUMN_NAME}, {SQL_SONG_ID_COLUMN_NAME}, {SQL_PLAYLIST_POSITION_COLUMN_NAME})
                                     );"""
 
+sql_create_playlist_songs_song_index = f"""CREATE INDEX IF NOT EXISTS {SQL_PLAYLIST_SONGS_TABLE_NAME}_{SQL_SONG_ID_COLUMN_NAME}
+                                          ON {SQL_PLAYLIST_SONGS_TABLE_NAME}({SQL_SONG_ID_COLUMN_NAME})"""
+
 sql_create_break_musics_table = f"""CREATE TABLE IF NOT EXISTS {SQL_AMBIENT_MUSICS_TABLE_NAME} (
                                     {SQL_ID_COLUMN_NAME} TEXT PRIMARY KEY,
                                     {SQL_TITLE_COLUMN_NAME} TEXT NOT NULL,
@@ -68,9 +142,45 @@ sql_create_break_musics_table = f"""CREATE TABLE IF NOT EXISTS {SQL_AMBIENT_MUSI
                                     UNIQUE({SQL_FILE_PATH_COLUMN_NAME})
                                 );"""
 
+sql_create_sequences_table = f"""CREATE TABLE IF NOT EXISTS {SQL_SEQUENCES_TABLE_NAME} (
+                                    {SQL_ID_COLUMN_NAME} TEXT PRIMARY KEY,
+                                    {SQL_NAME_COLUMN_NAME} TEXT NOT NULL,
+                                    {SQL_DEFINITION_COLUMN_NAME} TEXT NOT NULL,
+                                    {SQL_CREATION_TIME_STAMP_COLUMN_NAME} REAL NOT NULL
+                                );"""
+
+sql_create_cue_latencies_table = f"""CREATE TABLE IF NOT EXISTS {SQL_CUE_LATENCIES_TABLE_NAME} (
+                                    {SQL_DEVICE_ID_COLUMN_NAME} TEXT NOT NULL,
+                                    {SQL_CUE_NAME_COLUMN_NAME} TEXT NOT NULL,
+                                    {SQL_LATENCY_MS_COLUMN_NAME} REAL NOT NULL,
+                                    PRIMARY KEY({SQL_DEVICE_ID_COLUMN_NAME}, {SQL_CUE_NAME_COLUMN_NAME})
+                                );"""
+
+sql_create_play_queue_table = f"""CREATE TABLE IF NOT EXISTS {SQL_PLAY_QUEUE_TABLE_NAME} (
+                                    {SQL_QUEUE_POSITION_COLUMN_NAME} INTEGER PRIMARY KEY,
+                                    {SQL_SONG_ID_COLUMN_NAME} TEXT NOT NULL,
+                                    {SQL_PLAYLIST_ID_COLUMN_NAME} TEXT,
+                                    {SQL_PLAYLIST_POSITION_COLUMN_NAME} INTEGER NOT NULL
+                                );"""
+
+# A single row, the whole session state is kept as one JSON definition
+sql_create_session_state_table = f"""CREATE TABLE IF NOT EXISTS {SQL_SESSION_STATE_TABLE_NAME} (
+                                    {SQL_ID_COLUMN_NAME} INTEGER PRIMARY KEY,
+                                    {SQL_DEFINITION_COLUMN_NAME} TEXT NOT NULL
+                                );"""
+
+sql_create_library_version_table = f"""CREATE TABLE IF NOT EXISTS {SQL_LIBRARY_VERSION_TABLE_NAME} (
+                                    {SQL_CHANGE_COUNTER_COLUMN_NAME} INTEGER NOT NULL
+                                );"""
+
+# The change counter used to be bumped by triggers, once per written row
+sql_drop_change_counter_triggers = [
+    f"DROP TRIGGER IF EXISTS {table}_{operation.lower()}_{SQL_CHANGE_COUNTER_COLUMN_NAME}"
+    for table in SQL_LIBRARY_SNAPSHOT_TABLES for operation in ["INSERT", "UPDATE", "DELETE"]]
+
 # INSERT Requests
-sql_insert_one_song = f"""INSERT OR IGNORE INTO {SQL_SONGS_TABLE_NAME}({SQL_ID_COLUMN_NAME},{SQL_TITLE_COLUMN_NAME},{SQL_ARTIST_COLUMN_NAME},{SQL_DURATION_COLUMN_NAME},{SQL_FILE_PATH_COLUMN_NAME})
-                        VALUES(?,?,?,?,?) """
+sql_insert_one_song = f"""INSERT OR IGNORE INTO {SQL_SONGS_TABLE_NAME}({','.join(SQL_SONGS_COLUMNS)})
+                        VALUES({','.join('?' * len(SQL_SONGS_COLUMNS))}) """
 
 sql_insert_one_ambient_music = f"""INSERT OR IGNORE INTO {SQL_AMBIENT_MUSICS_TABLE_NAME}({SQL_ID_COLUMN_NAME},{SQL_TITLE_COLUMN_NAME},{SQL_ARTIST_COLUMN_NAME},{SQL_DURATION_COLUMN_NAME},{SQL_FILE_PATH_COLUMN_NAME},{SQL_SELECTED_COLUMN_NAME})
                         VALUES(?,?,?,?,?,?) """
@@ -81,17 +191,32 @@ sql_insert_one_playlist = f"""INSERT OR IGNORE INTO {SQL_PLAYLISTS_TABLE_NAME}({
 sql_insert_one_playlist_song_entry = f"""INSERT OR IGNORE INTO playlist_songs({SQL_PLAYLIST_ID_COLUMN_NAME},{SQL_SONG_ID_COLUMN_NAME},{SQL_PLAYLIST_POSITION_COLUMN_NAME})
                                     VALUES(?,?,?) """
 
+sql_insert_or_replace_one_sequence = f"""INSERT OR REPLACE INTO {SQL_SEQUENCES_TABLE_NAME}({SQL_ID_COLUMN_NAME},{SQL_NAME_COLUMN_NAME},{SQL_DEFINITION_COLUMN_NAME},{SQL_CREATION_TIME_STAMP_COLUMN_NAME})
+                            VALUES(?,?,?,?) """
+
+sql_insert_or_replace_one_cue_latency = f"""INSERT OR REPLACE INTO {SQL_CUE_LATENCIES_TABLE_NAME}({SQL_DEVICE_ID_COLUMN_NAME},{SQL_CUE_NAME_COLUMN_NAME},{SQL_LATENCY_MS_COLUMN_NAME})
+                            VALUES(?,?,?) """
+
+sql_insert_one_play_queue_entry = f"""INSERT INTO {SQL_PLAY_QUEUE_TABLE_NAME}({SQL_QUEUE_POSITION_COLUMN_NAME},{SQL_SONG_ID_COLUMN_NAME},{SQL_PLAYLIST_ID_COLUMN_NAME},{SQL_PLAYLIST_POSITION_COLUMN_NAME})
+                            VALUES(?,?,?,?) """
+
+sql_insert_or_replace_session_state = f"""INSERT OR REPLACE INTO {SQL_SESSION_STATE_TABLE_NAME}({SQL_ID_COLUMN_NAME},{SQL_DEFINITION_COLUMN_NAME})
+                            VALUES(0,?) """
+
+sql_insert_library_version_row = f"""INSERT INTO {SQL_LIBRARY_VERSION_TABLE_NAME}({SQL_CHANGE_COUNTER_COLUMN_NAME})
+                                    SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM {SQL_LIBRARY_VERSION_TABLE_NAME})"""
+
 # SELECT Requests
-sql_select_all_songs = f"SELECT * FROM {SQL_SONGS_TABLE_NAME}"
+sql_select_all_songs = f"SELECT {','.join(SQL_SONGS_COLUMNS)} FROM {SQL_SONGS_TABLE_NAME}"
 
 sql_select_a_song_by_id = f"SELECT * FROM {SQL_SONGS_TABLE_NAME} WHERE {SQL_ID_COLUMN_NAME}=?"
 
-sql_select_all_playlists = f"SELECT * FROM {SQL_PLAYLISTS_TABLE_NAME}"
+sql_select_all_playlists = f"SELECT {','.join(SQL_PLAYLISTS_COLUMNS)} FROM {SQL_PLAYLISTS_TABLE_NAME}"
 
 sql_select_one_playlist_by_id = f"SELECT * FROM {SQL_PLAYLISTS_TABLE_NAME} WHERE {SQL_ID_COLUMN_NAME}=?"
 
 sql_select_all_songs_for_playlist = f"""SELECT 
-                                 {SQL_SONG_ID_COLUMN_NAME}
+                                 {SQL_SONG_ID_COLUMN_NAME}, {SQL_PLAYLIST_POSITION_COLUMN_NAME}
                                  FROM {SQL_PLAYLIST_SONGS_TABLE_NAME}
                                  WHERE {SQL_PLAYLIST_ID_COLUMN_NAME}=?
                                  ORDER BY {SQL_PLAYLIST_POSITION_COLUMN_NAME}"""
@@ -100,6 +225,57 @@ sql_select_all_ambient_musics = f"SELECT * FROM {SQL_AMBIENT_MUSICS_TABLE_NAME}"
 
 sql_select_an_ambient_music_by_id = f"SELECT * FROM {SQL_AMBIENT_MUSICS_TABLE_NAME} WHERE {SQL_ID_COLUMN_NAME}=?"
 
+sql_select_all_sequences = f"SELECT * FROM {SQL_SEQUENCES_TABLE_NAME}"
+
+sql_select_play_queue = f"""SELECT {SQL_SONG_ID_COLUMN_NAME}, {SQL_PLAYLIST_ID_COLUMN_NAME}, {SQL_PLAYLIST_POSITION_COLUMN_NAME}
+                            FROM {SQL_PLAY_QUEUE_TABLE_NAME}
+                            ORDER BY {SQL_QUEUE_POSITION_COLUMN_NAME}"""
+
+sql_select_session_state = f"SELECT {SQL_DEFINITION_COLUMN_NAME} FROM {SQL_SESSION_STATE_TABLE_NAME}"
+
+sql_select_change_counter = f"SELECT {SQL_CHANGE_COUNTER_COLUMN_NAME} FROM {SQL_LIBRARY_VERSION_TABLE_NAME}"
+
+sql_select_library_journal_seq = f"SELECT {SQL_JOURNAL_SEQ_COLUMN_NAME} FROM {SQL_LIBRARY_VERSION_TABLE_NAME}"
+
+sql_select_playlists_journal_seqs = f"""SELECT {SQL_ID_COLUMN_NAME}, {SQL_JOURNAL_SEQ_COLUMN_NAME}
+                                      FROM {SQL_PLAYLISTS_TABLE_NAME}
+                                      WHERE {SQL_JOURNAL_SEQ_COLUMN_NAME} IS NOT NULL"""
+
+sql_select_cue_latencies_for_device = f"""SELECT {SQL_CUE_NAME_COLUMN_NAME}, {SQL_LATENCY_MS_COLUMN_NAME}
+                                        FROM {SQL_CUE_LATENCIES_TABLE_NAME}
+                                        WHERE {SQL_DEVICE_ID_COLUMN_NAME}=?"""
+
+# UPDATE Requests
+sql_update_one_playlist_summary = f"""UPDATE {SQL_PLAYLISTS_TABLE_NAME}
+                                    SET {','.join(f'{x}=?' for x in SQL_PLAYLISTS_SUMMARY_COLUMNS)}
+                                    WHERE {SQL_ID_COLUMN_NAME}=?"""
+
+sql_update_one_playlist_journal_seq = f"""UPDATE {SQL_PLAYLISTS_TABLE_NAME}
+                                        SET {SQL_JOURNAL_SEQ_COLUMN_NAME}=?
+                                        WHERE {SQL_ID_COLUMN_NAME}=?"""
+
+# Run by every transaction writing to the snapshot tables, once whatever the number of rows written
+sql_increment_change_counter = f"""UPDATE {SQL_LIBRARY_VERSION_TABLE_NAME}
+                                 SET {SQL_CHANGE_COUNTER_COLUMN_NAME} = {SQL_CHANGE_COUNTER_COLUMN_NAME} + 1"""
+
+sql_update_library_journal_seq = f"""UPDATE {SQL_LIBRARY_VERSION_TABLE_NAME}
+                                   SET {SQL_JOURNAL_SEQ_COLUMN_NAME} = MAX(COALESCE({SQL_JOURNAL_SEQ_COLUMN_NAME}, 0), ?)"""
+
+# Positions are shifted through negative values, so that no row ever collides with another one on the unique
+# (playlist, song, position) constraint while the update runs, then flipped back in one statement
+sql_shift_ps_positions_negated = f"""UPDATE {SQL_PLAYLIST_SONGS_TABLE_NAME}
+                                   SET {SQL_PLAYLIST_POSITION_COLUMN_NAME} = -({SQL_PLAYLIST_POSITION_COLUMN_NAME} + ?) - 1
+                                   WHERE {SQL_PLAYLIST_ID_COLUMN_NAME}=? AND {SQL_PLAYLIST_POSITION_COLUMN_NAME} >= ? 
+                                   AND {SQL_PLAYLIST_POSITION_COLUMN_NAME} < ?"""
+
+sql_restore_negated_ps_positions = f"""UPDATE {SQL_PLAYLIST_SONGS_TABLE_NAME}
+                                     SET {SQL_PLAYLIST_POSITION_COLUMN_NAME} = -{SQL_PLAYLIST_POSITION_COLUMN_NAME} - 1
+                                     WHERE {SQL_PLAYLIST_ID_COLUMN_NAME}=? AND {SQL_PLAYLIST_POSITION_COLUMN_NAME} < 0"""
+
+sql_update_one_song_analysis = f"""UPDATE {SQL_SONGS_TABLE_NAME}
+                                 SET {','.join(f'{x}=?' for x in SQL_SONGS_ANALYSIS_COLUMNS)}
+                                 WHERE {SQL_ID_COLUMN_NAME}=?"""
+
 # DELETE Requests
 sql_delete_one_song = f"""DELETE FROM {SQL_SONGS_TABLE_NAME} WHERE {SQL_ID_COLUMN_NAME}=?"""
 
@@ -113,30 +289,91 @@ sql_delete_ps_entries_for_playlist = f"DELETE FROM {SQL_PLAYLIST_SONGS_TABLE_NAM
 
 sql_delete_ps_entries_for_song = f"DELETE FROM {SQL_PLAYLIST_SONGS_TABLE_NAME} WHERE {SQL_SONG_ID_COLUMN_NAME}=?"
 
+sql_delete_ps_entries_range = f"""DELETE FROM {SQL_PLAYLIST_SONGS_TABLE_NAME}
+                                WHERE {SQL_PLAYLIST_ID_COLUMN_NAME}=? AND {SQL_PLAYLIST_POSITION_COLUMN_NAME} >= ? 
+                                AND {SQL_PLAYLIST_POSITION_COLUMN_NAME} < ?"""
+
+sql_delete_play_queue_entries_for_song = f"DELETE FROM {SQL_PLAY_QUEUE_TABLE_NAME} WHERE {SQL_SONG_ID_COLUMN_NAME}=?"
+
+sql_delete_one_sequence = f"DELETE FROM {SQL_SEQUENCES_TABLE_NAME} WHERE {SQL_ID_COLUMN_NAME}=?"
+
+sql_delete_all_play_queue_entries = f"DELETE FROM {SQL_PLAY_QUEUE_TABLE_NAME}"
+
 
 class MusicAndPlaylistsManager(Singleton):
     _base_dir: Path
     _stored_songs: dict
+    _stored_songs_by_path: dict
+    _pending_analysis_rows: list
     _stored_playlists: dict
+    _playlists_by_song: dict
+    _pending_playlist_edits: dict
+    _playlists_to_rewrite: set
     _stored_ambient_musics: dict
     _selected_ambient_music: uuid.UUID
+    _stored_sequences: dict
+    _stored_cue_latencies: dict
+    _play_queue: PlayQueue
+    _session_state: dict
+    _db_writer: DbWriter = None
+    _edit_journal: EditJournal = None
+    _is_journaling: bool
+    _playlists_journal_seqs: dict
+    _journaled_songs: list
 
     # Start
     def start(self, p_base_dir):
+        if self._db_writer is not None:
+            self._db_writer.stop()
+        if self._edit_journal is not None:
+            self._edit_journal.close()
         self._stored_songs = {}
+        self._stored_songs_by_path = {}
+        self._pending_analysis_rows = []
         self._stored_playlists = {}
         self._stored_ambient_musics = {}
         self._selected_ambient_music = uuid.UUID(int=0)
+        self._stored_sequences = {}
+        self._stored_cue_latencies = {}
+        self._play_queue = PlayQueue()
+        self._session_state = {}
+        self._playlists_by_song = {}
+        self._pending_playlist_edits = {}
+        self._playlists_to_rewrite = set()
+        self._is_journaling = False
+        self._playlists_journal_seqs = {}
+        self._journaled_songs = []
         self.set_base_dir(p_base_dir)
         self.mkdirs()
         self.init_db()
+        self._db_writer = DbWriter()
+        self._db_writer.start()
         self.load_all_available_ambient_music_in_memory()
-        self.load_all_available_songs_in_memory()
-        self.load_all_available_playlists_in_memory()
+        if not self.load_library_snapshot():
+            self.load_all_available_songs_in_memory()
+            self.load_all_available_playlists_in_memory()
+        last_seq = self.replay_edit_journal()
+        self.load_all_available_sequences_in_memory()
+        self.load_play_queue_in_memory()
+        self.load_session_state_in_memory()
+        self._edit_journal = EditJournal(self.get_edit_journal_path())
+        self._edit_journal.open(last_seq)
+        self._is_journaling = True
 
     def stop(self):
-        music_objects_to_keep = self.save_all()
+        self._is_journaling = False
+        music_objects_to_keep, songs_write_futures = self.save_all()
+        # Everything has to be written before the change counter is read for the snapshot
+        self._db_writer.stop()
+        # The journal is only kept if something could not be saved, it is replayed at the next start. The songs table
+        # is emptied before being written again, the journal is all that is left if the insert fails
+        if self.is_db_up_to_date() and \
+                all(x.done() and x.exception() is None and x.result() is True for x in songs_write_futures):
+            self._edit_journal.delete()
+        else:
+            self._edit_journal.close()
         self.clean_music_archive(music_objects_to_keep)
+        self.save_library_snapshot(music_objects_to_keep)
 
     # Files Management
     def set_base_dir(self, p_base_dir):
@@ -149,6 +386,9 @@ class MusicAndPlaylistsManager(Singleton):
         ambient_music_folder_path = self.get_ambient_musics_archive_folder()
         if not ambient_music_folder_path.exists():
             ambient_music_folder_path.mkdir(parents=True)
+        waveforms_cache_folder_path = self.get_waveforms_cache_folder()
+        if not waveforms_cache_folder_path.exists():
+            waveforms_cache_folder_path.mkdir(parents=True)
 
     def get_db_file_path(self):
         return self._base_dir / DATABASE_MUSICS_FILE_NAME
@@ -159,6 +399,22 @@ class MusicAndPlaylistsManager(Singleton):
     def get_ambient_musics_archive_folder(self):
         return self._base_dir / AMBIENT_MUSICS_ARCHIVE_DIR_NAME
 
+    def get_waveforms_cache_folder(self):
+        return self._base_dir / WAVEFORMS_CACHE_DIR_NAME
+
+    def get_waveform_peaks_path(self, p_uid: uuid.UUID):
+        return self.get_waveforms_cache_folder() / f"{p_uid.hex}{WAVEFORM_PEAKS_FILE_EXTENSION}"
+
+    def get_library_snapshot_path(self):
+        return self._base_dir / LIBRARY_SNAPSHOT_FILE_NAME
+
+    def get_edit_journal_path(self):
+        return self._base_dir / LIBRARY_JOURNAL_FILE_NAME
+
+    def get_musics_archive_stamp(self):
+        # Adding or removing a file of the archive changes the modification time of the folder
+        return self.get_musics_archive_folder().stat().st_mtime_ns
+
     def get_preloaded_sounds_folder(self):
         return self._base_dir.parent.parent / RESOURCES_DIR_NAME / PRELOADED_SOUNDS_DIR_NAME
 
@@ -180,9 +436,16 @@ class MusicAndPlaylistsManager(Singleton):
 
     def clean_music_archive(self, music_objects_to_keep: List[MusicObject]):
         music_files_path_from_disk = self.get_all_music_files_in_archive()
-        music_objects_to_keep_paths = [x.path for x in music_objects_to_keep]
+        music_objects_to_keep_paths = {x.path for x in music_objects_to_keep}
         to_delete = [x for x in music_files_path_from_disk if x not in music_objects_to_keep_paths]
         [x.unlink() for x in to_delete]
+        waveform_files_to_keep_paths = {self.get_waveform_peaks_path(x.uid) for x in music_objects_to_keep}
+        for x in self.get_waveforms_cache_folder().iterdir():
+            if x not in waveform_files_to_keep_paths:
+                try:
+                    x.unlink()
+                except OSError as e:
+                    print(e)
 
     # Music Objects management
     def get_music_from_store(self, p_uid: uuid.UUID):
@@ -191,14 +454,32 @@ class MusicAndPlaylistsManager(Singleton):
         else:
             return None
 
+    def get_music_from_store_by_path(self, p_path):
+        # Qt gives local files with forward slashes, the store is keyed by the native form of the path
+        return self._stored_songs_by_path.get(str(Path(p_path)))
+
     def put_music_in_store(self, p_music_object: MusicObject):
         self._stored_songs[p_music_object.uid] = p_music_object
+        self._stored_songs_by_path[str(p_music_object.path)] = p_music_object
+        if self._is_journaling:
+            self._journaled_songs.append(p_music_object)
+            self.journal_edit(SONG_ADDED_RECORD, values=p_music_object.as_tuple() + p_music_object.analysis_as_tuple())
 
     def remove_music_from_store(self, p_music_object_uid: uuid.UUID):
         if p_music_object_uid in self._stored_songs:
+            self._stored_songs_by_path.pop(str(self._stored_songs[p_music_object_uid].path), None)
             del self._stored_songs[p_music_object_uid]
 
+    @instrumented("library")
     def add_music_to_store(self, p_original_path: Path) -> MusicObject:
+        final_music_object = self.copy_music_to_archive(p_original_path)
+        if final_music_object is not None and final_music_object.uid not in self._stored_songs:
+            self.put_music_in_store(final_music_object)
+        return final_music_object
+
+    @instrumented("library")
+    def copy_music_to_archive(self, p_original_path: Path) -> MusicObject:
+        # Reads the tags and copies the file without touching the store, safe to call from an import thread
         if p_original_path.exists() and p_original_path.suffix in ACCEPTED_MUSIC_EXTENSIONS:
             original_music_object = MusicObject(p_original_path)
             if original_music_object.uid not in self._stored_songs:
@@ -206,7 +487,6 @@ class MusicAndPlaylistsManager(Singleton):
                 shutil.copy(p_original_path, target_path)
                 final_music_object = original_music_object
                 final_music_object.path = target_path
-                self.put_music_in_store(final_music_object)
             else:
                 final_music_object = self._stored_songs[original_music_object.uid]
             return final_music_object
@@ -214,14 +494,78 @@ class MusicAndPlaylistsManager(Singleton):
     def load_all_available_songs_in_memory(self):
         songs_rows = self.db_get_all_songs()
         if len(songs_rows) > 0:
-            as_is_songs = [MusicObject(p_definition_tuple=x) for x in songs_rows]
-            music_files_path_from_disk = self.get_all_music_files_in_archive()
+            as_is_songs = [MusicObject(p_definition_tuple=x[:5]) for x in songs_rows]
+            for music_object, songs_row in zip(as_is_songs, songs_rows):
+                for column, value in zip(SQL_SONGS_ANALYSIS_COLUMNS, songs_row[5:]):
+                    setattr(music_object, column, value)
+            music_files_path_from_disk = set(self.get_all_music_files_in_archive())
             if len(music_files_path_from_disk) > 0:
                 songs_to_put_in_store = [x for x in as_is_songs if x.path in music_files_path_from_disk]
                 [self.put_music_in_store(x) for x in songs_to_put_in_store]
 
     def add_music_to_db(self, p_music_object: MusicObject):
-        self.db_insert_one_song(p_music_object)
+        return self._db_writer.submit(self.db_insert_one_song, (p_music_object,))
+
+    # Analysis Management
+    def get_songs_to_analyze(self):
+        return [x for x in self._stored_songs.values() if
+                not x.is_analyzed() or not self.get_waveform_peaks_path(x.uid).exists()]
+
+    def store_analysis_results(self, p_uid: uuid.UUID, p_results: dict):
+        music_object = self.get_music_from_store(p_uid)
+        if music_object is not None:
+            if WAVEFORM_PEAKS_KEY in p_results:
+                from api.audio.waveform import write_peaks_file
+                write_peaks_file(self.get_waveform_peaks_path(p_uid), p_results[WAVEFORM_PEAKS_KEY])
+            for column, value in p_results.items():
+                if column in SQL_SONGS_ANALYSIS_COLUMNS:
+                    setattr(music_object, column, value)
+            # Results reach the DB in batches, so an interrupted analysis resumes where it stopped
+            self._pending_analysis_rows.append(music_object.analysis_as_tuple() + (str(music_object.uid),))
+            if len(self._pending_analysis_rows) >= ANALYSIS_RESULTS_BATCH_SIZE:
+                self.flush_analysis_results()
+
+    def get_songs_by_tempo_and_energy(self, p_min_bpm: float = None, p_max_bpm: float = None,
+                                      p_min_energy: float = None, p_max_energy: float = None) -> List[MusicObject]:
+        # Songs not analyzed yet never match, results are sorted by tempo
+        matching_songs = []
+        for music_object in self._stored_songs.values():
+            bpm, energy = music_object.bpm, music_object.energy
+            if bpm is None or energy is None or bpm <= 0:
+                continue
+            if (p_min_bpm is None or bpm >= p_min_bpm) and (p_max_bpm is None or bpm <= p_max_bpm) and \
+                    (p_min_energy is None or energy >= p_min_energy) and (p_max_energy is None or energy <= p_max_energy):
+                matching_songs.append(music_object)
+        matching_songs.sort(key=lambda x: x.bpm)
+        return matching_songs
+
+    def plan_songs_for_duration(self, p_target_duration_s: float, p_source_playlist_uid: uuid.UUID = None,
+                                p_min_bpm: float = None, p_max_bpm: float = None, p_min_energy: float = None,
+                                p_max_energy: float = None, p_excluded_uids: set = None,
+                                p_tolerance_s: int = DEFAULT_TOLERANCE_S) -> List[MusicObject]:
+        # The pool is a playlist, the songs matching a tempo/energy filter or the whole library
+        source_playlist = self.get_playlist_from_store(p_source_playlist_uid) if p_source_playlist_uid else None
+        if source_playlist is not None:
+            pool = [self.get_music_from_store(x) for x in source_playlist.get_all_songs()]
+        elif p_min_bpm is not None or p_max_bpm is not None or p_min_energy is not None or p_max_energy is not None:
+            pool = self.get_songs_by_tempo_and_energy(p_min_bpm, p_max_bpm, p_min_energy, p_max_energy)
+        else:
+            pool = list(self._stored_songs.values())
+        if p_excluded_uids:
+            pool = [x for x in pool if x is not None and x.uid not in p_excluded_uids]
+        return PlaylistPlanner(p_tolerance_s).plan(p_target_duration_s, pool)
+
+    def load_waveform_peaks(self, p_uid: uuid.UUID):
+        # The waveform module pulls numpy in, it is only loaded once a track has peaks to show
+        from api.audio.waveform import load_peaks_file
+        return load_peaks_file(self.get_waveform_peaks_path(p_uid))
+
+    def flush_analysis_results(self):
+        if len(self._pending_analysis_rows) > 0:
+            analysis_rows = self._pending_analysis_rows
+            self._pending_analysis_rows = []
+            return self._db_writer.submit(self.db_update_songs_analysis, (analysis_rows,), ANALYSIS_WRITE_KEY,
+                                          lambda p_waiting, p_new: (p_waiting[0] + p_new[0],))
 
     # Ambient Musics Management
     def put_ambient_music_in_store(self, p_ambient_music_object: MusicObject):
@@ -257,7 +601,13 @@ class MusicAndPlaylistsManager(Singleton):
                         break
 
     def add_ambient_music_to_db(self, p_ambient_music_object: MusicObject):
-        self.db_insert_one_ambient_music(p_ambient_music_object)
+        return self._db_writer.submit(self.db_insert_one_ambient_music, (p_ambient_music_object,))
+
+    def get_ambient_music_from_store(self, p_uid: uuid.UUID):
+        if p_uid in self._stored_ambient_musics:
+            return self._stored_ambient_musics[p_uid]
+        else:
+            return None
 
     def set_selected_ambient_music(self, p_ambient_music_object: MusicObject):
         self._selected_ambient_music = p_ambient_music_object.uid
@@ -287,50 +637,370 @@ class MusicAndPlaylistsManager(Singleton):
 
     def put_playlist_in_store(self, p_playlist: Playlist):
         self._stored_playlists[p_playlist.uid] = p_playlist
+        if self._is_journaling:
+            # Dirty, so that the next compaction writes its header even while it has no songs
+            p_playlist.is_dirty = True
+            self._playlists_journal_seqs[p_playlist.uid] = self.journal_edit(
+                PLAYLIST_CREATED_RECORD, uid=p_playlist.uid, name=p_playlist.name,
+                creation_time_stamp=p_playlist.creation_date.timestamp())
+        self.index_playlist_songs(p_playlist, p_playlist.get_all_songs(), [])
+        p_playlist.add_edits_listener(self.handle_playlist_edited)
 
     def load_all_available_playlists_in_memory(self):
         playlists_rows = self.db_get_all_playlists()
         if len(playlists_rows) > 0:
-            as_is_playlists = [Playlist(x[0], x[1], x[2]) for x in playlists_rows]
+            as_is_playlists = [Playlist(x[0], x[1], x[2], x[3]) for x in playlists_rows]
             [self.populate_one_playlist(x) for x in as_is_playlists]
+            for playlist, playlists_row in zip(as_is_playlists, playlists_rows):
+                # Headers written before the summary columns existed, or out of sync with the entries, are recomputed
+                if playlists_row[3] is None or playlists_row[4] != playlist.size():
+                    playlist.total_duration = self.get_songs_total_duration(playlist.get_all_songs())
             [self.put_playlist_in_store(x) for x in as_is_playlists]
 
     def populate_one_playlist(self, p_playlist: Playlist):
         songs_for_playlists_rows = self.db_get_one_playlist_songs(p_playlist.uid)
         if len(songs_for_playlists_rows) > 0:
-            [p_playlist.add_song(uuid.UUID(x[0])) for x in songs_for_playlists_rows]
+            p_playlist.insert_songs_uids(0, [uuid.UUID(x[0]) for x in songs_for_playlists_rows])
+        # The incremental save needs the stored positions to be exactly 0 to size - 1
+        if any(x[1] != i for i, x in enumerate(songs_for_playlists_rows)):
+            self._playlists_to_rewrite.add(p_playlist.uid)
+        else:
+            p_playlist.is_dirty = False
 
     def save_one_playlist(self, p_playlist_uid: uuid.UUID):
+        # A copy of the playlist as it is now goes to the DB writer, the returned future tells whether it was written
         p_playlist = self.get_playlist_from_store(p_playlist_uid)
         if p_playlist is not None and p_playlist.is_dirty:
-            self.db_insert_one_playlist(p_playlist)
-            self.db_delete_ps_entries_for_playlist(p_playlist)
-            if not p_playlist.is_empty():
-                [self.db_insert_one_ps_entry_for_playlist(p_playlist.uid, p_playlist.get_song(x), x) for x in
-                 range(p_playlist.size())]
+            is_rewrite = p_playlist_uid in self._playlists_to_rewrite
+            edits = self._pending_playlist_edits.pop(p_playlist_uid, [])
+            self._playlists_to_rewrite.discard(p_playlist_uid)
+            p_playlist.is_dirty = False
+            return self._db_writer.submit(self.write_one_playlist,
+                                          (p_playlist.copy(), is_rewrite, edits,
+                                           self._playlists_journal_seqs.get(p_playlist_uid, 0)),
+                                          (PLAYLIST_WRITE_KEY, p_playlist_uid), self.merge_playlist_writes)
+
+    @staticmethod
+    def merge_playlist_writes(p_waiting_args: tuple, p_new_args: tuple):
+        # The latest copy is written, the edits of both saves are replayed one after the other
+        waiting_playlist, waiting_is_rewrite, waiting_edits, waiting_journal_seq = p_waiting_args
+        playlist, is_rewrite, edits, journal_seq = p_new_args
+        return playlist, waiting_is_rewrite or is_rewrite, waiting_edits + edits, journal_seq
+
+    def write_one_playlist(self, p_playlist: Playlist, p_is_rewrite: bool, p_edits: List[PlaylistEdit],
+                           p_journal_seq: int):
+        # Runs on the DB writer thread
+        if not self.db_write_one_playlist(p_playlist, p_is_rewrite, p_edits, p_journal_seq):
+            # The stored entries can no longer be trusted, the next save rewrites them. Single set and dict operations
+            # are atomic, whatever the GUI thread is editing meanwhile
+            self._playlists_to_rewrite.add(p_playlist.uid)
+            self._pending_playlist_edits.pop(p_playlist.uid, None)
+            stored_playlist = self.get_playlist_from_store(p_playlist.uid)
+            if stored_playlist is not None:
+                stored_playlist.is_dirty = True
+            return False
+        return True
 
     def delete_one_playlist(self, p_playlist_uid: uuid.UUID):
         playlist = self.get_playlist_from_store(p_playlist_uid)
         if playlist is not None:
-            self.db_delete_one_playlist(playlist)
+            self._db_writer.submit(self.db_delete_one_playlist, (playlist,))
             self.delete_playlist_from_store(p_playlist_uid)
 
     def delete_playlist_from_store(self, p_playlist_uid: uuid.UUID):
         if p_playlist_uid in self._stored_playlists:
+            playlist = self._stored_playlists[p_playlist_uid]
+            playlist.remove_edits_listener(self.handle_playlist_edited)
+            self.index_playlist_songs(playlist, [], playlist.get_all_songs())
+            self._pending_playlist_edits.pop(p_playlist_uid, None)
+            self._playlists_to_rewrite.discard(p_playlist_uid)
+            self._playlists_journal_seqs.pop(p_playlist_uid, None)
             del self._stored_playlists[p_playlist_uid]
+            self.journal_edit(PLAYLIST_DELETED_RECORD, uid=p_playlist_uid)
+
+    def handle_playlist_edited(self, p_playlist: Playlist, p_edit: PlaylistEdit):
+        added_uids, removed_uids = added_and_removed_uids(p_edit)
+        self.index_playlist_songs(p_playlist, added_uids, removed_uids)
+        p_playlist.adjust_total_duration(self.get_songs_total_duration(added_uids) -
+                                         self.get_songs_total_duration(removed_uids))
+        if self._is_journaling:
+            self._playlists_journal_seqs[p_playlist.uid] = self.journal_edit(PLAYLIST_EDITED_RECORD,
+                                                                             uid=p_playlist.uid, edit=p_edit)
+        # Edits since the last save, replayed on the playlist_songs table by the next save
+        if p_playlist.uid not in self._playlists_to_rewrite:
+            pending_edits = self._pending_playlist_edits.setdefault(p_playlist.uid, [])
+            # Inserts one behind the other, as the batches of an import, are saved as one
+            last_edit = pending_edits[-1] if len(pending_edits) > 0 else None
+            if last_edit is not None and last_edit.kind == INSERT_EDIT and p_edit.kind == INSERT_EDIT and \
+                    last_edit.index + len(last_edit.uids) == p_edit.index:
+                pending_edits[-1] = PlaylistEdit(INSERT_EDIT, last_edit.index, last_edit.uids + p_edit.uids)
+            else:
+                pending_edits.append(p_edit)
+            if len(pending_edits) > MAX_INCREMENTAL_PLAYLIST_EDITS:
+                self._playlists_to_rewrite.add(p_playlist.uid)
+                del self._pending_playlist_edits[p_playlist.uid]
+
+    def get_songs_total_duration(self, p_song_uids: List[uuid.UUID]):
+        # Songs missing from the store count for nothing
+        total_duration = 0.0
+        for song_uid in p_song_uids:
+            music_object = self._stored_songs.get(song_uid)
+            if music_object is not None and music_object.duration is not None:
+                total_duration += music_object.duration
+        return total_duration
+
+    # Reverse index song uid -> {playlist uid: number of occurrences}, kept up to date by the playlists listeners
+    def index_playlist_songs(self, p_playlist: Playlist, p_added_uids: List[uuid.UUID],
+                             p_removed_uids: List[uuid.UUID]):
+        for song_uid in p_added_uids:
+            occurrences_by_playlist = self._playlists_by_song.setdefault(song_uid, {})
+            occurrences_by_playlist[p_playlist.uid] = occurrences_by_playlist.get(p_playlist.uid, 0) + 1
+        for song_uid in p_removed_uids:
+            occurrences_by_playlist = self._playlists_by_song.get(song_uid)
+            if occurrences_by_playlist is None or p_playlist.uid not in occurrences_by_playlist:
+                continue
+            occurrences_by_playlist[p_playlist.uid] -= 1
+            if occurrences_by_playlist[p_playlist.uid] <= 0:
+                del occurrences_by_playlist[p_playlist.uid]
+                if len(occurrences_by_playlist) == 0:
+                    del self._playlists_by_song[song_uid]
+
+    def playlists_containing(self, p_song_uid: uuid.UUID):
+        # Positions are only looked up in the playlists that hold the song
+        playlists_and_positions = []
+        for playlist_uid in self._playlists_by_song.get(p_song_uid, {}):
+            playlist = self._stored_playlists[playlist_uid]
+            positions = [i for i, x in enumerate(playlist.get_all_songs()) if x == p_song_uid]
+            playlists_and_positions.append((playlist, positions))
+        return playlists_and_positions
+
+    def delete_song_everywhere(self, p_song_uid: uuid.UUID):
+        self.delete_songs_everywhere([p_song_uid])
+
+    def delete_songs_everywhere(self, p_song_uids: List[uuid.UUID], p_journal_seq: int = None):
+        # Removes the songs from every playlist holding them, from the play queue, from the store and from the DB
+        song_uids = set(p_song_uids)
+        playlist_uids = set()
+        [playlist_uids.update(self._playlists_by_song.get(x, {})) for x in song_uids]
+        # One record for the whole deletion, a replayed deletion keeps the number of its record
+        if p_journal_seq is None:
+            p_journal_seq = self.journal_edit(SONGS_DELETED_RECORD, uids=list(song_uids))
+        is_journaling = self._is_journaling
+        self._is_journaling = False
+        for playlist_uid in playlist_uids:
+            self._stored_playlists[playlist_uid].remove_all_instances_of_songs(song_uids)
+        self._is_journaling = is_journaling
+        [self._play_queue.remove_all_instances_of_song(x) for x in song_uids]
+        [self.remove_music_from_store(x) for x in song_uids]
+        self._db_writer.submit(self.db_delete_songs_everywhere, (list(song_uids), p_journal_seq))
+        # Their entries are already gone from the DB, the remaining positions now have holes. The playlists are
+        # rewritten right away, the journal records older than the deletion are then never replayed on them
+        for playlist_uid in playlist_uids:
+            self._playlists_to_rewrite.add(playlist_uid)
+            self._pending_playlist_edits.pop(playlist_uid, None)
+            self.save_one_playlist(playlist_uid)
+
+    # Sequences Management
+    def get_sequence_from_store(self, p_uid: uuid.UUID):
+        if p_uid in self._stored_sequences:
+            return self._stored_sequences[p_uid]
+        else:
+            return None
+
+    def get_all_sequences_from_store(self):
+        all_sequences = list(self._stored_sequences.values())
+        all_sequences.sort(key=lambda x: x.creation_date)
+        return all_sequences
+
+    def put_sequence_in_store(self, p_sequence: Sequence):
+        self._stored_sequences[p_sequence.uid] = p_sequence
+
+    def add_sequence(self, p_sequence: Sequence):
+        self.put_sequence_in_store(p_sequence)
+        self._db_writer.submit(self.db_insert_or_replace_one_sequence, (p_sequence,))
+
+    def delete_one_sequence(self, p_sequence_uid: uuid.UUID):
+        sequence = self.get_sequence_from_store(p_sequence_uid)
+        if sequence is not None:
+            self._db_writer.submit(self.db_delete_one_sequence, (sequence,))
+            del self._stored_sequences[p_sequence_uid]
+
+    def load_all_available_sequences_in_memory(self):
+        sequences_rows = self.db_get_all_sequences()
+        if len(sequences_rows) == 0:
+            self.add_sequence(build_default_sequence())
+        else:
+            for x in sequences_rows:
+                try:
+                    self.put_sequence_in_store(Sequence.from_json(x[0], x[1], x[2], x[3]))
+                except SequenceDefinitionError as e:
+                    print(e)
+
+    # Cue Latencies Management
+    def get_cue_latency_table(self, p_device_id: str) -> CueLatencyTable:
+        if p_device_id not in self._stored_cue_latencies:
+            cue_latencies_rows = self.db_get_cue_latencies_for_device(p_device_id)
+            latencies = {} if cue_latencies_rows is None else {x[0]: x[1] for x in cue_latencies_rows}
+            self._stored_cue_latencies[p_device_id] = CueLatencyTable(latencies)
+        return self._stored_cue_latencies[p_device_id]
+
+    def save_cue_latencies(self):
+        for device_id, cue_latency_table in self._stored_cue_latencies.items():
+            if cue_latency_table.is_dirty:
+                self._db_writer.submit(self.db_insert_or_replace_cue_latencies,
+                                       (device_id, CueLatencyTable(cue_latency_table.all_latencies())),
+                                       (CUE_LATENCIES_WRITE_KEY, device_id))
+                cue_latency_table.is_dirty = False
+
+    # Play Queue Management
+    def get_play_queue(self):
+        return self._play_queue
+
+    def load_play_queue_in_memory(self):
+        play_queue_rows = self.db_get_play_queue()
+        if play_queue_rows is not None and len(play_queue_rows) > 0:
+            # Songs that left the archive since the last run are dropped from the queue
+            entries = [(uuid.UUID(x[0]), None if x[1] is None else uuid.UUID(x[1]), x[2]) for x in play_queue_rows]
+            self._play_queue = PlayQueue([x for x in entries if x[0] in self._stored_songs])
+
+    def save_play_queue(self):
+        if self._play_queue.is_dirty:
+            self._db_writer.submit(self.db_replace_play_queue, (PlayQueue(self._play_queue.get_all_entries()),),
+                                   PLAY_QUEUE_WRITE_KEY)
+            self._play_queue.is_dirty = False
+
+    # Session State Management
+    def get_session_state(self):
+        return dict(self._session_state)
+
+    def load_session_state_in_memory(self):
+        session_state_rows = self.db_get_session_state()
+        if session_state_rows is not None and len(session_state_rows) > 0:
+            try:
+                self._session_state = json.loads(session_state_rows[0][0])
+            except ValueError as e:
+                print(e)
+
+    def save_session_state(self, p_session_state: dict):
+        # Saved on every change of the player or the timers, only the latest state waiting in the queue is written
+        self._session_state = dict(p_session_state)
+        self._db_writer.submit(self.db_replace_session_state, (json.dumps(self._session_state),),
+                               SESSION_STATE_WRITE_KEY)
+
+    # Library Snapshot Management
+    def load_library_snapshot(self):
+        # The snapshot only stands for the DB if nothing was written to the songs and playlists since it was saved
+        change_counter = self.db_get_change_counter()
+        if change_counter is None:
+            return False
+        library = read_library_snapshot(self.get_library_snapshot_path(), change_counter,
+                                        self.get_musics_archive_folder(), self.get_musics_archive_stamp())
+        if library is None:
+            return False
+        music_objects, playlists = library
+        [self.put_music_in_store(x) for x in music_objects]
+        [self.put_playlist_in_store(x) for x in playlists]
+        return True
+
+    def save_library_snapshot(self, p_music_objects: List[MusicObject]):
+        # Playlists that could not be saved differ from the DB, the SQL loader has to be used at the next start
+        snapshot_path = self.get_library_snapshot_path()
+        change_counter = self.db_get_change_counter()
+        all_playlists_in_store = self.get_all_playlists_from_store()
+        if change_counter is None or not self.is_db_up_to_date() or \
+                not write_library_snapshot(snapshot_path, change_counter, self.get_musics_archive_folder(),
+                                           self.get_musics_archive_stamp(),
+                                           [x for x in p_music_objects if x is not None], all_playlists_in_store):
+            snapshot_path.unlink(missing_ok=True)
+
+    # Edit Journal Management
+    def journal_edit(self, p_kind: str, **p_values):
+        # Returns the number of the record, None while nothing is journaled
+        if self._is_journaling:
+            return self._edit_journal.append(p_kind, **p_values)
+
+    def replay_edit_journal(self):
+        # Records left by a run that did not stop cleanly are applied on top of the DB, the playlist edits older than
+        # the last save of their playlist and the song deletions already written are skipped: a deleted file imported
+        # again comes back with the same uid, and may have been saved in a playlist since. Returns the last record
+        # number in use
+        records = read_journal_records(self.get_edit_journal_path())
+        self._playlists_journal_seqs = {uuid.UUID(x[0]): x[1] for x in self.db_get_playlists_journal_seqs() or []}
+        songs_journal_seq = self.db_get_library_journal_seq() or 0
+        last_seq = max(max(self._playlists_journal_seqs.values(), default=0), songs_journal_seq)
+        for record in records:
+            seq = record[JOURNAL_SEQ_KEY]
+            kind = record[JOURNAL_KIND_KEY]
+            last_seq = max(last_seq, seq)
+            if kind == SONG_ADDED_RECORD:
+                values = record["values"]
+                music_object = MusicObject.from_stored_values(uuid.UUID(values[0]), values[1], values[2], values[3],
+                                                              Path(values[4]), tuple(values[5:]))
+                if music_object.uid not in self._stored_songs and music_object.path.exists():
+                    self.put_music_in_store(music_object)
+                    self._journaled_songs.append(music_object)
+            elif kind == SONGS_DELETED_RECORD:
+                if seq > songs_journal_seq:
+                    self.delete_songs_everywhere([uuid.UUID(x) for x in record["uids"]], seq)
+            elif kind == PLAYLIST_CREATED_RECORD:
+                if uuid.UUID(record["uid"]) not in self._stored_playlists:
+                    playlist = Playlist(record["uid"], record["name"], record["creation_time_stamp"])
+                    playlist.is_dirty = True
+                    self.put_playlist_in_store(playlist)
+            elif kind == PLAYLIST_DELETED_RECORD:
+                self.delete_one_playlist(uuid.UUID(record["uid"]))
+            elif kind == PLAYLIST_EDITED_RECORD:
+                playlist = self.get_playlist_from_store(uuid.UUID(record["uid"]))
+                if playlist is not None and seq > self._playlists_journal_seqs.get(playlist.uid, 0):
+                    edit_kind, index, uids, destination = record["edit"]
+                    playlist.apply_edit(PlaylistEdit(edit_kind, index, tuple(uuid.UUID(x) for x in uids), destination))
+                    self._playlists_journal_seqs[playlist.uid] = seq
+        return last_seq
+
+    def compact_edit_journal(self):
+        # Everything journaled so far goes to the DB, then the journal drops it unless one of the writes failed
+        if self._edit_journal is None or not self._edit_journal.is_open():
+            return None
+        up_to_seq = self._edit_journal.last_seq
+        write_futures = [self.save_one_playlist(x) for x in list(self._stored_playlists)]
+        journaled_songs = [x for x in self._journaled_songs if x.uid in self._stored_songs]
+        self._journaled_songs = []
+        if len(journaled_songs) > 0:
+            write_futures.append(self._db_writer.submit(self.db_insert_many_songs, (journaled_songs,)))
+        return self._db_writer.submit(self.truncate_edit_journal,
+                                      (up_to_seq, [x for x in write_futures if x is not None]))
+
+    def truncate_edit_journal(self, p_up_to_seq: int, p_write_futures: list):
+        # Runs on the DB writer thread, after the writes submitted by the compaction. A playlist saved again
+        # meanwhile has its write moved behind this one, the journal is then truncated by the next compaction
+        if all(x.done() and x.exception() is None and x.result() is True for x in p_write_futures):
+            return self._edit_journal.truncate(p_up_to_seq)
+        return False
+
+    def is_db_up_to_date(self):
+        return len(self._playlists_to_rewrite) == 0 and not any(x.is_dirty for x in self._stored_playlists.values())
 
     # Save all
     def save_all(self):
+        # Returns the songs kept and the futures of their writes
         all_music_uuids_to_keep = []
         all_playlists_in_store = self.get_all_playlists_from_store()
         [all_music_uuids_to_keep.extend(x.get_all_songs()) for x in all_playlists_in_store]
+        all_music_uuids_to_keep.extend(x[0] for x in self._play_queue.get_all_entries())
         all_music_uuids_to_keep = set(all_music_uuids_to_keep)
         music_objects_to_keep = [self.get_music_from_store(x) for x in all_music_uuids_to_keep]
         [self.save_one_playlist(x) for x in [y.uid for y in all_playlists_in_store]]
-        self.db_delete_all_songs()
-        self.db_insert_many_songs(music_objects_to_keep)
-        self.db_insert_many_ambient_musics(list(self._stored_ambient_musics.values()))
-        return music_objects_to_keep
+        self.flush_analysis_results()
+        songs_write_futures = [self._db_writer.submit(self.db_delete_all_songs),
+                               self._db_writer.submit(self.db_insert_many_songs, (music_objects_to_keep,))]
+        self._db_writer.submit(self.db_insert_many_ambient_musics, (list(self._stored_ambient_musics.values()),))
+        self.save_cue_latencies()
+        self.save_play_queue()
+        return music_objects_to_keep, songs_write_futures
+
+    def flush_db_writes(self, p_timeout: float = None):
+        # True once every write submitted so far is in the DB
+        return self._db_writer is None or self._db_writer.flush(p_timeout)
 
     # DB Operations
     # GENERAL
@@ -344,10 +1014,23 @@ class MusicAndPlaylistsManager(Singleton):
         return conn
 
     def init_db(self):
+        self.db_enable_write_ahead_log()
         self.db_create_table(sql_create_playlists_table)
+        self.db_add_missing_columns(SQL_PLAYLISTS_TABLE_NAME, SQL_PLAYLISTS_SUMMARY_COLUMNS)
+        self.db_add_missing_columns(SQL_PLAYLISTS_TABLE_NAME, SQL_PLAYLISTS_JOURNAL_COLUMNS)
         self.db_create_table(sql_create_songs_table)
+        self.db_add_missing_columns(SQL_SONGS_TABLE_NAME, SQL_SONGS_ANALYSIS_COLUMNS)
         self.db_create_table(sql_create_playlists_songs_table)
+        self.db_create_table(sql_create_playlist_songs_song_index)
         self.db_create_table(sql_create_break_musics_table)
+        self.db_create_table(sql_create_sequences_table)
+        self.db_create_table(sql_create_cue_latencies_table)
+        self.db_create_table(sql_create_play_queue_table)
+        self.db_create_table(sql_create_session_state_table)
+        self.db_create_table(sql_create_library_version_table)
+        self.db_add_missing_columns(SQL_LIBRARY_VERSION_TABLE_NAME, SQL_LIBRARY_VERSION_JOURNAL_COLUMNS)
+        [self.db_create_table(x) for x in sql_drop_change_counter_triggers]
+        self.db_init_change_counter()
         self.init_ambient_songs_db()
 
     def init_ambient_songs_db(self):
@@ -372,7 +1055,68 @@ class MusicAndPlaylistsManager(Singleton):
             print(inspect.currentframe().f_code.co_name)
             print(e)
 
+    def db_enable_write_ahead_log(self):
+        # Stored in the DB file, every connection opened afterwards uses it
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_enable_write_ahead_log)
+            conn.close()
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    def db_init_change_counter(self):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_insert_library_version_row)
+            conn.commit()
+            conn.close()
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    def db_get_change_counter(self):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_select_change_counter)
+            change_counter_row = c.fetchone()
+            conn.close()
+            return None if change_counter_row is None else change_counter_row[0]
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    def db_get_library_journal_seq(self):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_select_library_journal_seq)
+            journal_seq_row = c.fetchone()
+            conn.close()
+            return None if journal_seq_row is None else journal_seq_row[0]
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
     # SONGS
+    def db_add_missing_columns(self, p_table_name: str, p_columns: dict):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(f"PRAGMA table_info({p_table_name})")
+            existing_columns = [x[1] for x in c.fetchall()]
+            for column, column_type in p_columns.items():
+                if column not in existing_columns:
+                    c.execute(f"ALTER TABLE {p_table_name} ADD COLUMN {column} {column_type}")
+            conn.commit()
+            conn.close()
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
     def db_get_one_song(self, p_music_object: MusicObject):
         try:
             conn = self.connect_to_db()
@@ -401,9 +1145,8 @@ class MusicAndPlaylistsManager(Singleton):
         try:
             conn = self.connect_to_db()
             c = conn.cursor()
-            c.execute(sql_insert_one_song, (
-                str(p_music_object.uid), p_music_object.title, p_music_object.artist, p_music_object.duration,
-                str(p_music_object.path)))
+            c.execute(sql_insert_one_song, p_music_object.as_tuple() + p_music_object.analysis_as_tuple())
+            c.execute(sql_increment_change_counter)
             conn.commit()
             conn.close()
         except Error as e:
@@ -413,9 +1156,24 @@ class MusicAndPlaylistsManager(Singleton):
     def db_insert_many_songs(self, p_music_objects: List[MusicObject]):
         try:
             conn = self.connect_to_db()
-            p_music_objects_tuples = [x.as_tuple() for x in p_music_objects]
+            p_music_objects_tuples = [x.as_tuple() + x.analysis_as_tuple() for x in p_music_objects]
             c = conn.cursor()
             c.executemany(sql_insert_one_song, p_music_objects_tuples)
+            c.execute(sql_increment_change_counter)
+            conn.commit()
+            conn.close()
+            return True
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+            return False
+
+    def db_update_songs_analysis(self, p_analysis_rows: List[tuple]):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.executemany(sql_update_one_song_analysis, p_analysis_rows)
+            c.execute(sql_increment_change_counter)
             conn.commit()
             conn.close()
         except Error as e:
@@ -427,6 +1185,25 @@ class MusicAndPlaylistsManager(Singleton):
             conn = self.connect_to_db()
             c = conn.cursor()
             c.execute(sql_delete_one_song, str(p_music_object.uid))
+            c.execute(sql_increment_change_counter)
+            conn.commit()
+            conn.close()
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    def db_delete_songs_everywhere(self, p_song_uids: List[uuid.UUID], p_journal_seq: int = None):
+        # One transaction whatever the number of songs, with the number of the journal record of the deletion
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            song_ids = [(str(x),) for x in p_song_uids]
+            c.executemany(sql_delete_ps_entries_for_song, song_ids)
+            c.executemany(sql_delete_play_queue_entries_for_song, song_ids)
+            c.executemany(sql_delete_one_song, song_ids)
+            if p_journal_seq is not None:
+                c.execute(sql_update_library_journal_seq, (p_journal_seq,))
+            c.execute(sql_increment_change_counter)
             conn.commit()
             conn.close()
         except Error as e:
@@ -438,11 +1215,14 @@ class MusicAndPlaylistsManager(Singleton):
             conn = self.connect_to_db()
             c = conn.cursor()
             c.execute(sql_delete_all_songs)
+            c.execute(sql_increment_change_counter)
             conn.commit()
             conn.close()
+            return True
         except Error as e:
             print(inspect.currentframe().f_code.co_name)
             print(e)
+            return False
 
     # AMBIENT_MUSICS
     def db_get_all_ambient_musics_rows(self):
@@ -526,17 +1306,89 @@ class MusicAndPlaylistsManager(Singleton):
             conn = self.connect_to_db()
             c = conn.cursor()
             c.execute(sql_insert_one_playlist, (str(p_playlist.uid), p_playlist.name, p_playlist.creation_date.timestamp()))
+            c.execute(sql_increment_change_counter)
             conn.commit()
             conn.close()
         except Error as e:
             print(inspect.currentframe().f_code.co_name)
             print(e)
 
+    def db_update_one_playlist_summary(self, p_playlist: Playlist):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_update_one_playlist_summary, (p_playlist.total_duration, p_playlist.size(), str(p_playlist.uid)))
+            c.execute(sql_increment_change_counter)
+            conn.commit()
+            conn.close()
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    def db_get_playlists_journal_seqs(self):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_select_playlists_journal_seqs)
+            journal_seqs_rows = c.fetchall()
+            conn.close()
+            return journal_seqs_rows
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    def db_write_one_playlist(self, p_playlist: Playlist, p_is_rewrite: bool, p_edits: List[PlaylistEdit],
+                              p_journal_seq: int):
+        # Header, entries and journal record number in one transaction. The entries are either all rewritten or
+        # updated by replaying the edits made since the last save, then only the shifted positions are touched
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            playlist_id = str(p_playlist.uid)
+            c.execute(sql_insert_one_playlist, (playlist_id, p_playlist.name, p_playlist.creation_date.timestamp()))
+            c.execute(sql_update_one_playlist_summary, (p_playlist.total_duration, p_playlist.size(), playlist_id))
+            c.execute(sql_update_one_playlist_journal_seq, (p_journal_seq, playlist_id))
+            if p_is_rewrite:
+                c.execute(sql_delete_ps_entries_for_playlist, (playlist_id,))
+                c.executemany(sql_insert_one_playlist_song_entry,
+                              [(playlist_id, str(x), i) for i, x in enumerate(p_playlist.get_all_songs())])
+                p_edits = []
+            for edit in p_edits:
+                count = len(edit.uids)
+                if edit.kind == INSERT_EDIT:
+                    c.execute(sql_shift_ps_positions_negated, (count, playlist_id, edit.index, MAX_PLAYLIST_POSITION))
+                    c.execute(sql_restore_negated_ps_positions, (playlist_id,))
+                    c.executemany(sql_insert_one_playlist_song_entry,
+                                  [(playlist_id, str(x), edit.index + i) for i, x in enumerate(edit.uids)])
+                elif edit.kind == REMOVE_EDIT:
+                    c.execute(sql_delete_ps_entries_range, (playlist_id, edit.index, edit.index + count))
+                    c.execute(sql_shift_ps_positions_negated,
+                              (-count, playlist_id, edit.index + count, MAX_PLAYLIST_POSITION))
+                    c.execute(sql_restore_negated_ps_positions, (playlist_id,))
+                else:
+                    c.execute(sql_shift_ps_positions_negated,
+                              (edit.destination - edit.index, playlist_id, edit.index, edit.index + count))
+                    if edit.destination > edit.index:
+                        c.execute(sql_shift_ps_positions_negated,
+                                  (-count, playlist_id, edit.index + count, edit.destination + count))
+                    else:
+                        c.execute(sql_shift_ps_positions_negated, (count, playlist_id, edit.destination, edit.index))
+                    c.execute(sql_restore_negated_ps_positions, (playlist_id,))
+            c.execute(sql_increment_change_counter)
+            conn.commit()
+            conn.close()
+            return True
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+            return False
+
     def db_delete_one_playlist(self, p_playlist: Playlist):
         try:
             conn = self.connect_to_db()
             c = conn.cursor()
             c.execute(sql_delete_one_playlist, (str(p_playlist.uid),))
+            c.execute(sql_increment_change_counter)
             conn.commit()
             conn.close()
             self.db_delete_ps_entries_for_playlist(p_playlist)
@@ -562,6 +1414,7 @@ class MusicAndPlaylistsManager(Singleton):
             conn = self.connect_to_db()
             c = conn.cursor()
             c.execute(sql_delete_all_ps_entries)
+            c.execute(sql_increment_change_counter)
             conn.commit()
             conn.close()
         except Error as e:
@@ -573,6 +1426,7 @@ class MusicAndPlaylistsManager(Singleton):
             conn = self.connect_to_db()
             c = conn.cursor()
             c.execute(sql_delete_ps_entries_for_playlist, (str(p_playlist.uid),))
+            c.execute(sql_increment_change_counter)
             conn.commit()
             conn.close()
         except Error as e:
@@ -584,7 +1438,125 @@ class MusicAndPlaylistsManager(Singleton):
             conn = self.connect_to_db()
             c = conn.cursor()
             c.execute(sql_insert_one_playlist_song_entry, (str(p_playlist_uid), str(p_song_uid), p_position))
+            c.execute(sql_increment_change_counter)
+            conn.commit()
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    # SEQUENCES
+    def db_get_all_sequences(self):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_select_all_sequences)
+            sequences_rows = c.fetchall()
+            conn.close()
+            return sequences_rows
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    def db_insert_or_replace_one_sequence(self, p_sequence: Sequence):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_insert_or_replace_one_sequence, (str(p_sequence.uid), p_sequence.name,
+                                                           p_sequence.definition_as_json(),
+                                                           p_sequence.creation_date.timestamp()))
             conn.commit()
+            conn.close()
         except Error as e:
             print(inspect.currentframe().f_code.co_name)
             print(e)
+
+    def db_delete_one_sequence(self, p_sequence: Sequence):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_delete_one_sequence, (str(p_sequence.uid),))
+            conn.commit()
+            conn.close()
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    # CUE_LATENCIES
+    def db_get_cue_latencies_for_device(self, p_device_id: str):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_select_cue_latencies_for_device, (p_device_id,))
+            cue_latencies_rows = c.fetchall()
+            conn.close()
+            return cue_latencies_rows
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    def db_insert_or_replace_cue_latencies(self, p_device_id: str, p_cue_latency_table: CueLatencyTable):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.executemany(sql_insert_or_replace_one_cue_latency,
+                          [(p_device_id, k, v) for k, v in p_cue_latency_table.all_latencies().items()])
+            conn.commit()
+            conn.close()
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    # PLAY_QUEUE
+    def db_get_play_queue(self):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_select_play_queue)
+            play_queue_rows = c.fetchall()
+            conn.close()
+            return play_queue_rows
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    def db_replace_play_queue(self, p_play_queue: PlayQueue):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_delete_all_play_queue_entries)
+            c.executemany(sql_insert_one_play_queue_entry,
+                          [(i, str(x[0]), None if x[1] is None else str(x[1]), x[2]) for i, x in
+                           enumerate(p_play_queue.get_all_entries())])
+            conn.commit()
+            conn.close()
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    # SESSION_STATE
+    def db_get_session_state(self):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_select_session_state)
+            session_state_rows = c.fetchall()
+            conn.close()
+            return session_state_rows
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+    def db_replace_session_state(self, p_definition: str):
+        try:
+            conn = self.connect_to_db()
+            c = conn.cursor()
+            c.execute(sql_insert_or_replace_session_state, (p_definition,))
+            conn.commit()
+            conn.close()
+        except Error as e:
+            print(inspect.currentframe().f_code.co_name)
+            print(e)
+
+
+# Every DB access is timed when the instrumentation is enabled
+instrument_methods(MusicAndPlaylistsManager, "db_", "db")
@@ -0,0 +1,129 @@
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+from PySide6 import QtCore
+from PySide6.QtCore import QObject
+from tinytag import TinyTagException
+
+from api.music.music_and_playlists_manager import MusicAndPlaylistsManager, ACCEPTED_MUSIC_EXTENSIONS
+from api.music.music_exceptions import MusicError
+
+IMPORT_QUEUE_SIZE = 64
+IMPORT_BATCH_SIZE = 16
+IMPORT_BATCH_DELAY_S = 0.25
+
+
+def iter_music_files(p_paths: List[Path], p_should_stop=None):
+    # Depth first walk yielding the music files as they are found, no listing of the whole tree is ever built
+    pending_dirs = []
+    for path in p_paths:
+        path = Path(path)
+        if path.is_dir():
+            pending_dirs.append(path)
+        elif path.suffix in ACCEPTED_MUSIC_EXTENSIONS:
+            yield path
+    while len(pending_dirs) > 0:
+        if p_should_stop is not None and p_should_stop():
+            return
+        try:
+            with os.scandir(pending_dirs.pop()) as entries:
+                sub_dirs = []
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        sub_dirs.append(entry.path)
+                    elif os.path.splitext(entry.name)[1] in ACCEPTED_MUSIC_EXTENSIONS and entry.is_file():
+                        yield Path(entry.path)
+                # Sub directories in reverse so that they are walked in name order
+                pending_dirs.extend(Path(x) for x in sorted(sub_dirs, reverse=True))
+        except OSError as e:
+            print(e)
+
+
+class MusicImporter(QObject):
+    # A walker thread feeds the paths through a bounded queue to an import thread that reads the tags and copies the
+    # files, the imported songs come back to the GUI thread in small batches
+    musics_imported = QtCore.Signal(list)
+    import_finished = QtCore.Signal(int)
+
+    _music_and_playlists_manager: MusicAndPlaylistsManager
+    _paths_queue: queue.Queue
+    _stop_event: threading.Event
+    _walker_thread: threading.Thread
+    _import_thread: threading.Thread
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._music_and_playlists_manager = MusicAndPlaylistsManager()
+        self._paths_queue = queue.Queue(maxsize=IMPORT_QUEUE_SIZE)
+        self._stop_event = threading.Event()
+        self._walker_thread = None
+        self._import_thread = None
+
+    def is_running(self):
+        return self._import_thread is not None and self._import_thread.is_alive()
+
+    def start(self, p_paths: List[Path]):
+        if self.is_running():
+            return False
+        self._stop_event.clear()
+        self._paths_queue = queue.Queue(maxsize=IMPORT_QUEUE_SIZE)
+        self._walker_thread = threading.Thread(target=self.walk, args=(p_paths,), daemon=True)
+        self._import_thread = threading.Thread(target=self.import_files, daemon=True)
+        self._walker_thread.start()
+        self._import_thread.start()
+        return True
+
+    def stop(self):
+        self._stop_event.set()
+        for thread in (self._walker_thread, self._import_thread):
+            if thread is not None:
+                thread.join()
+
+    def put_path(self, p_path):
+        # Blocks while the queue is full, checking regularly that the import has not been stopped
+        while not self._stop_event.is_set():
+            try:
+                self._paths_queue.put(p_path, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def walk(self, p_paths: List[Path]):
+        for path in iter_music_files(p_paths, self._stop_event.is_set):
+            if not self.put_path(path):
+                return
+        self.put_path(None)
+
+    def import_files(self):
+        batch = []
+        nb_of_imported_files = 0
+        last_batch_time = time.perf_counter()
+        while not self._stop_event.is_set():
+            try:
+                path = self._paths_queue.get(timeout=IMPORT_BATCH_DELAY_S)
+            except queue.Empty:
+                path = False
+            if path is None:
+                break
+            if path:
+                try:
+                    music_object = self._music_and_playlists_manager.copy_music_to_archive(path)
+                    if music_object is not None:
+                        batch.append(music_object)
+                except (MusicError, TinyTagException, OSError) as e:
+                    print(e)
+            if len(batch) >= IMPORT_BATCH_SIZE or \
+                    (len(batch) > 0 and time.perf_counter() - last_batch_time >= IMPORT_BATCH_DELAY_S):
+                self.musics_imported.emit(batch)
+                nb_of_imported_files += len(batch)
+                batch = []
+                last_batch_time = time.perf_counter()
+        if len(batch) > 0 and not self._stop_event.is_set():
+            self.musics_imported.emit(batch)
+            nb_of_imported_files += len(batch)
+        self.import_finished.emit(nb_of_imported_files)
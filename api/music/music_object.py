@@ -12,6 +12,11 @@ class MusicObject:
     _duration: float
     _artist: str
     _uid: uuid.UUID
+    _gain_db: float
+    _start_offset_ms: int
+    _end_offset_ms: int
+    _bpm: float
+    _energy: float
 
     def __init__(self, p_path_to_file: Path = None, p_definition_tuple: tuple = None):
         self._uid = uuid.UUID(int=0)
@@ -19,6 +24,11 @@ class MusicObject:
         self._title = ""
         self._artist = ""
         self._duration = -1.0
+        self._gain_db = None
+        self._start_offset_ms = None
+        self._end_offset_ms = None
+        self._bpm = None
+        self._energy = None
         if p_path_to_file is not None and isinstance(p_path_to_file, Path):
             if p_path_to_file.exists():
                 self._path_to_file = p_path_to_file
@@ -40,6 +50,20 @@ class MusicObject:
         else:
             raise MusicNoValidInputsError
 
+    @staticmethod
+    def from_stored_values(p_uid: uuid.UUID, p_title: str, p_artist: str, p_duration: float, p_path: Path,
+                           p_analysis: tuple):
+        # The values were checked when they were stored, the setters and the check of the file are skipped
+        music_object = MusicObject.__new__(MusicObject)
+        music_object._uid = p_uid
+        music_object._title = p_title
+        music_object._artist = p_artist
+        music_object._duration = p_duration
+        music_object._path_to_file = p_path
+        music_object._gain_db, music_object._start_offset_ms, music_object._end_offset_ms, music_object._bpm, \
+            music_object._energy = p_analysis
+        return music_object
+
     @property
     def path(self):
         return self._path_to_file
@@ -95,6 +119,64 @@ class MusicObject:
         else:
             raise ValueError
 
+    @property
+    def gain_db(self):
+        return self._gain_db
+
+    @gain_db.setter
+    def gain_db(self, p_gain_db):
+        if p_gain_db is None or isinstance(p_gain_db, float) or isinstance(p_gain_db, int):
+            self._gain_db = None if p_gain_db is None else float(p_gain_db)
+        else:
+            raise ValueError
+
+    @property
+    def start_offset_ms(self):
+        return self._start_offset_ms
+
+    @start_offset_ms.setter
+    def start_offset_ms(self, p_start_offset_ms):
+        if p_start_offset_ms is None or isinstance(p_start_offset_ms, int):
+            self._start_offset_ms = p_start_offset_ms
+        else:
+            raise ValueError
+
+    @property
+    def end_offset_ms(self):
+        return self._end_offset_ms
+
+    @end_offset_ms.setter
+    def end_offset_ms(self, p_end_offset_ms):
+        if p_end_offset_ms is None or isinstance(p_end_offset_ms, int):
+            self._end_offset_ms = p_end_offset_ms
+        else:
+            raise ValueError
+
+    @property
+    def bpm(self):
+        return self._bpm
+
+    @bpm.setter
+    def bpm(self, p_bpm):
+        if p_bpm is None or isinstance(p_bpm, float) or isinstance(p_bpm, int):
+            self._bpm = None if p_bpm is None else float(p_bpm)
+        else:
+            raise ValueError
+
+    @property
+    def energy(self):
+        return self._energy
+
+    @energy.setter
+    def energy(self, p_energy):
+        if p_energy is None or isinstance(p_energy, float) or isinstance(p_energy, int):
+            self._energy = None if p_energy is None else float(p_energy)
+        else:
+            raise ValueError
+
+    def is_analyzed(self):
+        return None not in self.analysis_as_tuple()
+
     def set_from_metadata(self):
         try:
             tag = TinyTag.get(self._path_to_file)
@@ -152,3 +234,6 @@ class MusicObject:
     def as_tuple(self):
         the_tuple = (str(self.uid), self.title, self.artist, self.duration, str(self.path))
         return the_tuple
+
+    def analysis_as_tuple(self):
+        return self.gain_db, self.start_offset_ms, self.end_offset_ms, self.bpm, self.energy
@@ -0,0 +1,56 @@
+import uuid
+from collections import deque
+from typing import List, Tuple
+
+
+class PlayQueue:
+    # Entries are (song uid, playlist uid, position in that playlist), the position is only a hint
+    _entries: deque
+    _is_dirty: bool
+
+    def __init__(self, p_entries: List[Tuple[uuid.UUID, uuid.UUID, int]] = None):
+        self._entries = deque() if p_entries is None else deque(p_entries)
+        self._is_dirty = False
+
+    @property
+    def is_dirty(self):
+        return self._is_dirty
+
+    @is_dirty.setter
+    def is_dirty(self, p_is_dirty):
+        if isinstance(p_is_dirty, bool):
+            self._is_dirty = p_is_dirty
+
+    def size(self):
+        return len(self._entries)
+
+    def is_empty(self):
+        return len(self._entries) == 0
+
+    def get_all_entries(self):
+        return list(self._entries)
+
+    def play_next(self, p_song_uid: uuid.UUID, p_playlist_uid: uuid.UUID = None, p_position: int = -1):
+        self._entries.appendleft((p_song_uid, p_playlist_uid, p_position))
+        self.is_dirty = True
+
+    def add_to_queue(self, p_song_uid: uuid.UUID, p_playlist_uid: uuid.UUID = None, p_position: int = -1):
+        self._entries.append((p_song_uid, p_playlist_uid, p_position))
+        self.is_dirty = True
+
+    def pop_next(self):
+        if len(self._entries) == 0:
+            return None
+        self.is_dirty = True
+        return self._entries.popleft()
+
+    def remove_all_instances_of_song(self, p_song_uid: uuid.UUID):
+        nb_of_entries_before = len(self._entries)
+        self._entries = deque(x for x in self._entries if x[0] != p_song_uid)
+        if len(self._entries) != nb_of_entries_before:
+            self.is_dirty = True
+
+    def clear(self):
+        if len(self._entries) > 0:
+            self._entries.clear()
+            self.is_dirty = True
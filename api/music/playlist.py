@@ -3,6 +3,7 @@ from typing import List
 from datetime import datetime
 
 from api.music.music_object import MusicObject
+from api.music.playlist_edit import PlaylistEdit, INSERT_EDIT, REMOVE_EDIT, MOVE_EDIT
 
 
 class Playlist:
@@ -11,8 +12,10 @@ class Playlist:
     _songs: List[uuid.UUID]
     _creation_time_stamp: datetime
     _is_dirty: bool
+    _edits_listeners: list
+    _total_duration: float
 
-    def __init__(self, p_uid: str = None, p_name: str = None, p_creation_time_stamp = None):
+    def __init__(self, p_uid: str = None, p_name: str = None, p_creation_time_stamp = None, p_total_duration: float = 0.0):
         if p_uid is None:
             self.uid = uuid.uuid4()
         else:
@@ -27,6 +30,8 @@ class Playlist:
             self.creation_date = p_creation_time_stamp
         self.is_dirty = False
         self._songs = []
+        self._edits_listeners = []
+        self.total_duration = p_total_duration
 
     @property
     def uid(self):
@@ -64,6 +69,41 @@ class Playlist:
         if isinstance(p_is_dirty, bool):
             self._is_dirty = p_is_dirty
 
+    @property
+    def total_duration(self):
+        return self._total_duration
+
+    @total_duration.setter
+    def total_duration(self, p_total_duration):
+        if isinstance(p_total_duration, (int, float)) and p_total_duration >= 0:
+            self._total_duration = float(p_total_duration)
+        else:
+            self._total_duration = 0.0
+
+    def copy(self):
+        # Same playlist without the listeners, it can be read from another thread while this one keeps being edited
+        playlist = Playlist(str(self.uid), self.name, self.creation_date, self.total_duration)
+        playlist._songs = list(self._songs)
+        playlist.is_dirty = self.is_dirty
+        return playlist
+
+    def adjust_total_duration(self, p_delta: float):
+        self._total_duration = max(0.0, self._total_duration + p_delta)
+
+    def add_edits_listener(self, p_listener):
+        # Listeners are called with (playlist, edit) after every change of the songs
+        if p_listener not in self._edits_listeners:
+            self._edits_listeners.append(p_listener)
+
+    def remove_edits_listener(self, p_listener):
+        if p_listener in self._edits_listeners:
+            self._edits_listeners.remove(p_listener)
+
+    def notify_edit(self, p_edit: PlaylistEdit):
+        self.is_dirty = True
+        [x(self, p_edit) for x in self._edits_listeners]
+        return p_edit
+
     def size(self):
         return len(self._songs)
 
@@ -81,40 +121,73 @@ class Playlist:
 
     def add_song(self, p_uid: uuid.UUID, p_index: int = None):
         if p_index is None or p_index > len(self._songs):
-            self._songs.append(p_uid)
-        else:
-            self._songs.insert(p_index, p_uid)
-        self.is_dirty = True
+            p_index = len(self._songs)
+        return self.insert_songs_uids(p_index, [p_uid])
 
     def add_songs(self, p_songs: List[MusicObject]):
-        if len(p_songs) > 0:
-            [self.add_song(x.uid) for x in p_songs]
-            self.is_dirty = True
+        return self.insert_songs_uids(len(self._songs), [x.uid for x in p_songs])
 
     def add_songs_at_index(self, p_songs: List[MusicObject], p_start_index: int):
-        if len(p_songs) > 0:
-            for i in range(len(p_songs)):
-                self.add_song(p_songs[i].uid, p_start_index + i)
+        return self.insert_songs_uids(p_start_index, [x.uid for x in p_songs])
+
+    def insert_songs_uids(self, p_index: int, p_uids: List[uuid.UUID]):
+        if len(p_uids) > 0 and 0 <= p_index <= len(self._songs):
+            self._songs[p_index:p_index] = p_uids
+            return self.notify_edit(PlaylistEdit(INSERT_EDIT, p_index, tuple(p_uids)))
 
     def remove_song_by_index(self, p_index):
-        if p_index < len(self._songs):
-            del self._songs[p_index]
-            self.is_dirty = True
+        return self.remove_songs_range(p_index, 1)
+
+    def remove_songs_range(self, p_index: int, p_count: int):
+        if p_count > 0 and 0 <= p_index and p_index + p_count <= len(self._songs):
+            removed_uids = tuple(self._songs[p_index:p_index + p_count])
+            del self._songs[p_index:p_index + p_count]
+            return self.notify_edit(PlaylistEdit(REMOVE_EDIT, p_index, removed_uids))
+
+    def move_songs_range(self, p_index: int, p_count: int, p_destination: int):
+        # The destination is counted in the playlist without the moved songs
+        if p_count > 0 and 0 <= p_index and p_index + p_count <= len(self._songs) and p_index != p_destination and \
+                0 <= p_destination <= len(self._songs) - p_count:
+            moved_uids = self._songs[p_index:p_index + p_count]
+            del self._songs[p_index:p_index + p_count]
+            self._songs[p_destination:p_destination] = moved_uids
+            return self.notify_edit(PlaylistEdit(MOVE_EDIT, p_index, tuple(moved_uids), p_destination))
+
+    def apply_edit(self, p_edit: PlaylistEdit):
+        if p_edit.kind == INSERT_EDIT:
+            return self.insert_songs_uids(p_edit.index, list(p_edit.uids))
+        elif p_edit.kind == REMOVE_EDIT:
+            return self.remove_songs_range(p_edit.index, len(p_edit.uids))
+        elif p_edit.kind == MOVE_EDIT:
+            return self.move_songs_range(p_edit.index, len(p_edit.uids), p_edit.destination)
 
     def remove_all_instances_of_song(self, p_uid: uuid.UUID):
         if p_uid is not None:
-            nb_of_songs_before = self.size()
-            self._songs = [x for x in self._songs if x != p_uid]
-            nb_of_songs_after = self.size()
-            if nb_of_songs_before != nb_of_songs_after:
-                self.is_dirty = True
+            return self.remove_all_instances_of_songs({p_uid})
+        return []
+
+    def remove_all_instances_of_songs(self, p_uids: set):
+        # One pass over the playlist whatever the number of songs to remove, one edit per run of removed songs, last
+        # run first so that the edits stay valid when applied in order
+        runs = []
+        kept_uids = []
+        for i, song_uid in enumerate(self._songs):
+            if song_uid in p_uids:
+                if len(runs) > 0 and runs[-1][0] + len(runs[-1][1]) == i:
+                    runs[-1][1].append(song_uid)
+                else:
+                    runs.append((i, [song_uid]))
+            else:
+                kept_uids.append(song_uid)
+        if len(runs) == 0:
+            return []
+        self._songs = kept_uids
+        return [self.notify_edit(PlaylistEdit(REMOVE_EDIT, x[0], tuple(x[1]))) for x in reversed(runs)]
 
     def shift_one_song_up(self, p_index: int):
-        if p_index > 0 and len(self._songs) >= 2:
-            self._songs[p_index], self._songs[p_index - 1] = self._songs[p_index - 1], self._songs[p_index]
-            self.is_dirty = True
+        if p_index > 0:
+            return self.move_songs_range(p_index, 1, p_index - 1)
 
     def shift_one_song_down(self, p_index: int):
-        if p_index < len(self._songs) and len(self._songs) >= 2:
-            self._songs[p_index], self._songs[p_index + 1] = self._songs[p_index + 1], self._songs[p_index]
-            self.is_dirty = True
+        if p_index + 1 < len(self._songs):
+            return self.move_songs_range(p_index, 1, p_index + 1)
@@ -0,0 +1,27 @@
+from collections import namedtuple
+
+INSERT_EDIT = "insert"
+REMOVE_EDIT = "remove"
+MOVE_EDIT = "move"
+
+# One range operation on the songs of a playlist. The uids are the inserted, removed or moved songs, a move takes them
+# out at index and puts them back at destination, counted in the playlist without them
+PlaylistEdit = namedtuple("PlaylistEdit", ["kind", "index", "uids", "destination"], defaults=[None])
+
+
+def invert_edit(p_edit: PlaylistEdit) -> PlaylistEdit:
+    if p_edit.kind == INSERT_EDIT:
+        return PlaylistEdit(REMOVE_EDIT, p_edit.index, p_edit.uids)
+    elif p_edit.kind == REMOVE_EDIT:
+        return PlaylistEdit(INSERT_EDIT, p_edit.index, p_edit.uids)
+    else:
+        return PlaylistEdit(MOVE_EDIT, p_edit.destination, p_edit.uids, p_edit.index)
+
+
+def added_and_removed_uids(p_edit: PlaylistEdit):
+    if p_edit.kind == INSERT_EDIT:
+        return p_edit.uids, ()
+    elif p_edit.kind == REMOVE_EDIT:
+        return (), p_edit.uids
+    else:
+        return (), ()
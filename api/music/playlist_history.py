@@ -0,0 +1,58 @@
+from collections import deque
+from typing import List
+
+from api.music.playlist_edit import PlaylistEdit, INSERT_EDIT
+
+DEFAULT_MAX_UNDO_STEPS = 200
+
+
+class PlaylistHistory:
+    # A step is the list of edits made by one user action, the oldest steps fall off the ring
+    _undo_steps: deque
+    _redo_steps: list
+
+    def __init__(self, p_max_steps: int = DEFAULT_MAX_UNDO_STEPS):
+        self._undo_steps = deque(maxlen=p_max_steps)
+        self._redo_steps = []
+
+    def can_undo(self):
+        return len(self._undo_steps) > 0
+
+    def can_redo(self):
+        return len(self._redo_steps) > 0
+
+    def record(self, p_edits: List[PlaylistEdit]):
+        edits = [x for x in p_edits if x is not None]
+        if len(edits) > 0:
+            self._undo_steps.append(edits)
+            self._redo_steps.clear()
+
+    def merge_insert(self, p_edit: PlaylistEdit):
+        # An insert right behind the one of the last step joins that step, a long import is undone at once. Returns
+        # False when the edit has to be recorded as a step of its own
+        if p_edit is None or p_edit.kind != INSERT_EDIT or len(self._redo_steps) > 0 or len(self._undo_steps) == 0:
+            return False
+        last_step = self._undo_steps[-1]
+        if len(last_step) != 1 or last_step[0].kind != INSERT_EDIT or \
+                last_step[0].index + len(last_step[0].uids) != p_edit.index:
+            return False
+        self._undo_steps[-1] = [PlaylistEdit(INSERT_EDIT, last_step[0].index, last_step[0].uids + p_edit.uids)]
+        return True
+
+    def pop_undo(self):
+        if len(self._undo_steps) == 0:
+            return None
+        step = self._undo_steps.pop()
+        self._redo_steps.append(step)
+        return step
+
+    def pop_redo(self):
+        if len(self._redo_steps) == 0:
+            return None
+        step = self._redo_steps.pop()
+        self._undo_steps.append(step)
+        return step
+
+    def clear(self):
+        self._undo_steps.clear()
+        self._redo_steps.clear()
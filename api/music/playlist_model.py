@@ -1,23 +1,45 @@
 from PySide6 import QtCore
-from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex
+from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex, QMimeData, QByteArray
+from pathlib import Path
 from typing import List
 
 import api.music.playlist
 from api.music.music_and_playlists_manager import MusicAndPlaylistsManager
 from api.music.music_object import MusicObject
 from api.music.playlist import Playlist
+from api.music.playlist_edit import PlaylistEdit, INSERT_EDIT, REMOVE_EDIT, MOVE_EDIT, invert_edit
+from api.music.playlist_history import PlaylistHistory
+
+PLAYLIST_ROWS_MIME_TYPE = "application/x-playlist-rows"
+URI_LIST_MIME_TYPE = "text/uri-list"
+
+
+def split_in_runs(p_rows: List[int]):
+    # Sorted rows to [(first row, count)] of consecutive rows
+    runs = []
+    for row in p_rows:
+        if len(runs) > 0 and runs[-1][0] + runs[-1][1] == row:
+            runs[-1][1] += 1
+        else:
+            runs.append([row, 1])
+    return runs
 
 
 class PlaylistModel(QAbstractTableModel):
     signal_no_playlist_selected = QtCore.Signal()
     playlist_switched = QtCore.Signal()
+    files_dropped = QtCore.Signal(list, int)
 
     _headers = ["Numéro", "Titre", "Durée", "Artiste", "Path"]
     _current_playlist: Playlist
     _music_and_playlist_manager: MusicAndPlaylistsManager
+    _histories: dict
+    _is_applying_edit: bool
 
     def __init__(self):
         super().__init__()
+        self._histories = {}
+        self._is_applying_edit = False
         self.set_playlist(None)
         self._music_and_playlist_manager = MusicAndPlaylistsManager()
         available_playlists = self._music_and_playlist_manager.get_all_playlists_from_store()
@@ -59,38 +81,216 @@ class PlaylistModel(QAbstractTableModel):
             music = self._music_and_playlist_manager.get_music_from_store(music_uid)
             return str(music.path)
 
+    def flags(self, index: QModelIndex):
+        if index.isValid():
+            return super().flags(index) | Qt.ItemFlag.ItemIsDragEnabled
+        return super().flags(index) | Qt.ItemFlag.ItemIsDropEnabled
+
+    def supportedDropActions(self):
+        # Copy is what the file managers offer when dropping files
+        return Qt.DropAction.MoveAction | Qt.DropAction.CopyAction
+
+    def mimeTypes(self):
+        return [PLAYLIST_ROWS_MIME_TYPE, URI_LIST_MIME_TYPE]
+
+    def mimeData(self, indexes: List[QModelIndex]):
+        mime_data = QMimeData()
+        if self._current_playlist is not None:
+            rows = sorted({x.row() for x in indexes if x.isValid()})
+            encoded_rows = f"{self._current_playlist.uid};{','.join(str(x) for x in rows)}"
+            mime_data.setData(PLAYLIST_ROWS_MIME_TYPE, QByteArray(encoded_rows.encode()))
+        return mime_data
+
+    def dropMimeData(self, data: QMimeData, action: Qt.DropAction, row: int, column: int, parent: QModelIndex):
+        if self._current_playlist is None:
+            return False
+        if row == -1:
+            row = parent.row() if parent.isValid() else self.rowCount()
+        if data.hasFormat(PLAYLIST_ROWS_MIME_TYPE) and action == Qt.DropAction.MoveAction:
+            playlist_id, encoded_rows = bytes(data.data(PLAYLIST_ROWS_MIME_TYPE)).decode().split(";")
+            if playlist_id != str(self._current_playlist.uid) or len(encoded_rows) == 0:
+                return False
+            return self.move_songs_rows([int(x) for x in encoded_rows.split(",")], row)
+        elif data.hasUrls():
+            # The import runs in the background, nothing is inserted yet
+            paths = [Path(x.toLocalFile()) for x in data.urls() if x.isLocalFile()]
+            if len(paths) > 0:
+                self.files_dropped.emit(paths, row)
+            return False
+        return False
+
+    def moveRows(self, sourceParent: QModelIndex, sourceRow: int, count: int, destinationParent: QModelIndex,
+                 destinationChild: int):
+        return self.move_songs_rows(list(range(sourceRow, sourceRow + count)), destinationChild)
+
+    def move_songs_rows(self, p_rows: List[int], p_destination_row: int):
+        # Gathers the rows, in their order, in front of the destination row, counted before the move. Consecutive rows
+        # move as one range, so one drag and drop costs one edit per run of selected rows, whatever their number
+        rows = sorted({x for x in p_rows if 0 <= x < self.rowCount()})
+        if len(rows) == 0 or not 0 <= p_destination_row <= self.rowCount():
+            return False
+        moved_rows = set(rows)
+        # The first row that stays in place after the destination, the moved rows end up just before it
+        anchor_row = next((x for x in range(p_destination_row, self.rowCount()) if x not in moved_rows), None)
+        current_rows = list(range(self.rowCount()))
+        previous_run_last_row = None
+        edits = []
+        for first_row, count in split_in_runs(rows):
+            index = current_rows.index(first_row)
+            run_rows = current_rows[index:index + count]
+            del current_rows[index:index + count]
+            if previous_run_last_row is not None:
+                destination = current_rows.index(previous_run_last_row) + 1
+            elif anchor_row is not None:
+                destination = current_rows.index(anchor_row)
+            else:
+                destination = len(current_rows)
+            current_rows[destination:destination] = run_rows
+            if destination != index:
+                edits.append(self.apply_edit_rows(PlaylistEdit(MOVE_EDIT, index,
+                                                               tuple(self._current_playlist.get_all_songs()[
+                                                                     index:index + count]), destination)))
+            previous_run_last_row = run_rows[-1]
+        self.get_history().record(edits)
+        return len(edits) > 0
+
     def headerData(self, section: int, orientation: Qt.Orientation, role=Qt.DisplayRole):
         if role == Qt.DisplayRole and orientation == Qt.Horizontal:
             return self._headers[section]
         else:
             return None
 
-    def insert_songs_rows(self, songs: List[MusicObject], index_start: int = 0, modify_current_playlist: bool = False):
-        if self.get_playlist() is not None and (self.get_playlist().is_empty() or 0 <= index_start <= self.get_playlist().size()):
-            super().beginInsertRows(QModelIndex(), index_start, index_start + len(songs))
+    def insert_songs_rows(self, songs: List[MusicObject], index_start: int = 0, modify_current_playlist: bool = False,
+                          merge_with_last_step: bool = False):
+        if self.get_playlist() is not None and len(songs) > 0 and 0 <= index_start <= self.get_playlist().size():
             if modify_current_playlist:
-                self.insertRows(index_start, len(songs))
-                self._current_playlist.add_songs_at_index(songs, index_start)
-            super().endInsertRows()
+                edit = PlaylistEdit(INSERT_EDIT, index_start, tuple(x.uid for x in songs))
+                applied_edit = self.apply_edit_rows(edit)
+                if not merge_with_last_step or not self.get_history().merge_insert(applied_edit):
+                    self.get_history().record([applied_edit])
+            else:
+                super().beginInsertRows(QModelIndex(), index_start, index_start + len(songs) - 1)
+                super().endInsertRows()
 
     def remove_songs_rows(self, count: int, row: int = 0, modify_current_playlist: bool = False):
-        if 0 <= row <= self.rowCount() and count <= self.rowCount() - row:
-            super().beginRemoveRows(QModelIndex(), row, row + count)
+        if count > 0 and 0 <= row and count <= self.rowCount() - row:
             if modify_current_playlist:
-                self.removeRows(row, count)
-                for _ in range(count):
-                    self._current_playlist.remove_song_by_index(row)
+                edit = PlaylistEdit(REMOVE_EDIT, row, tuple(self._current_playlist.get_all_songs()[row:row + count]))
+                self.get_history().record([self.apply_edit_rows(edit)])
+            else:
+                super().beginRemoveRows(QModelIndex(), row, row + count - 1)
+                super().endRemoveRows()
+
+    def apply_edit_rows(self, p_edit: PlaylistEdit):
+        # The views only get the rows that actually change
+        count = len(p_edit.uids)
+        if p_edit.kind != INSERT_EDIT and \
+                tuple(self._current_playlist.get_all_songs()[p_edit.index:p_edit.index + count]) != p_edit.uids:
+            return None
+        if p_edit.kind == INSERT_EDIT:
+            super().beginInsertRows(QModelIndex(), p_edit.index, p_edit.index + count - 1)
+            applied_edit = self.apply_edit_to_playlist(p_edit)
+            super().endInsertRows()
+        elif p_edit.kind == REMOVE_EDIT:
+            super().beginRemoveRows(QModelIndex(), p_edit.index, p_edit.index + count - 1)
+            applied_edit = self.apply_edit_to_playlist(p_edit)
             super().endRemoveRows()
+        else:
+            # Qt counts the destination row in the playlist before the move
+            destination_row = p_edit.destination + count if p_edit.destination > p_edit.index else p_edit.destination
+            if not super().beginMoveRows(QModelIndex(), p_edit.index, p_edit.index + count - 1, QModelIndex(),
+                                         destination_row):
+                return None
+            applied_edit = self.apply_edit_to_playlist(p_edit)
+            super().endMoveRows()
+        return applied_edit
+
+    def apply_edit_to_playlist(self, p_edit: PlaylistEdit):
+        self._is_applying_edit = True
+        try:
+            return self._current_playlist.apply_edit(p_edit)
+        finally:
+            self._is_applying_edit = False
+
+    def get_history(self):
+        if self._current_playlist.uid not in self._histories:
+            self._histories[self._current_playlist.uid] = PlaylistHistory()
+            self._current_playlist.add_edits_listener(self.handle_playlist_edited)
+        return self._histories[self._current_playlist.uid]
+
+    def handle_playlist_edited(self, p_playlist: Playlist, p_edit: PlaylistEdit):
+        # The steps are replayed by index, an edit made without the model, such as a background import into a
+        # playlist not shown, shifts the songs under them
+        if not self._is_applying_edit and p_playlist.uid in self._histories:
+            self._histories[p_playlist.uid].clear()
+        # The playlist shown was already changed, as by a song deleted everywhere, the views read it again
+        if not self._is_applying_edit and p_playlist is self._current_playlist:
+            super().beginResetModel()
+            super().endResetModel()
+
+    def undo(self):
+        if self._current_playlist is None:
+            return False
+        history = self.get_history()
+        step = history.pop_undo()
+        if step is None:
+            return False
+        inverted_step = [invert_edit(x) for x in reversed(step)]
+        if self.inserts_deleted_songs(inverted_step) or not self.edits_match_songs(inverted_step):
+            history.clear()
+            return False
+        [self.apply_edit_rows(x) for x in inverted_step]
+        return True
+
+    def redo(self):
+        if self._current_playlist is None:
+            return False
+        history = self.get_history()
+        step = history.pop_redo()
+        if step is None:
+            return False
+        if self.inserts_deleted_songs(step) or not self.edits_match_songs(step):
+            history.clear()
+            return False
+        [self.apply_edit_rows(x) for x in step]
+        return True
+
+    def edits_match_songs(self, p_edits: List[PlaylistEdit]):
+        # Replayed on a copy of the songs first, the removed and moved songs must still be at the recorded rows so that
+        # a stale step is dropped as a whole instead of being half applied
+        songs = list(self._current_playlist.get_all_songs())
+        for edit in p_edits:
+            count = len(edit.uids)
+            if edit.kind == INSERT_EDIT:
+                if not 0 <= edit.index <= len(songs):
+                    return False
+                songs[edit.index:edit.index] = edit.uids
+            else:
+                if tuple(songs[edit.index:edit.index + count]) != edit.uids:
+                    return False
+                del songs[edit.index:edit.index + count]
+                if edit.kind == MOVE_EDIT:
+                    if not 0 <= edit.destination <= len(songs):
+                        return False
+                    songs[edit.destination:edit.destination] = edit.uids
+        return True
+
+    def inserts_deleted_songs(self, p_edits: List[PlaylistEdit]):
+        # Songs deleted from the library since the step was recorded cannot come back
+        return any(x.kind == INSERT_EDIT and any(self._music_and_playlist_manager.get_music_from_store(y) is None
+                                                 for y in x.uids) for x in p_edits)
 
     def get_playlist(self):
         return self._current_playlist
 
     def set_playlist(self, p_playlist):
+        # The views drop the rows of the previous playlist and read the new one from scratch
+        super().beginResetModel()
         self._current_playlist = p_playlist
+        super().endResetModel()
         if isinstance(p_playlist, api.music.playlist.Playlist):
-            self.populate_model()
-        else:
-            self.removeRows(0, self.rowCount())
+            p_playlist.add_edits_listener(self.handle_playlist_edited)
+        if not isinstance(p_playlist, api.music.playlist.Playlist):
             self.signal_no_playlist_selected.emit()
 
     def switch_playlist(self, index):
@@ -99,8 +299,3 @@ class PlaylistModel(QAbstractTableModel):
             new_playlist = available_playlists[index]
             self.set_playlist(new_playlist)
             self.playlist_switched.emit()
-
-    def populate_model(self):
-        if self.rowCount() > 0:
-            self.remove_songs_rows(self.rowCount())
-        self.insert_songs_rows(self._current_playlist.get_all_songs())
@@ -0,0 +1,138 @@
+import random
+from collections import defaultdict, deque
+from typing import List
+
+from api.music.music_object import MusicObject
+
+DEFAULT_TOLERANCE_S = 10
+DEFAULT_MIN_ARTIST_GAP = 2
+# The subset sum works on rounded durations, the plans whose real total misses the tolerance are searched again
+MAX_PLANNING_ATTEMPTS = 4
+
+
+def split_in_binary_chunks(p_count: int):
+    # 1, 2, 4, ... and the rest: any count from 0 to p_count is a sum of a subset of the chunks
+    chunks = []
+    chunk = 1
+    while p_count > 0:
+        chunks.append(min(chunk, p_count))
+        p_count -= chunks[-1]
+        chunk *= 2
+    return chunks
+
+
+class PlaylistPlanner:
+    _tolerance_s: int
+    _min_artist_gap: int
+    _random: random.Random
+
+    def __init__(self, p_tolerance_s: int = DEFAULT_TOLERANCE_S, p_min_artist_gap: int = DEFAULT_MIN_ARTIST_GAP,
+                 p_seed=None):
+        self._tolerance_s = p_tolerance_s
+        self._min_artist_gap = p_min_artist_gap
+        self._random = random.Random(p_seed)
+
+    def plan(self, p_target_duration_s: float, p_pool: List[MusicObject]) -> List[MusicObject]:
+        # Returns an ordered subset of the pool whose total duration is within the tolerance of the target,
+        # an empty list when no subset fits
+        songs_by_duration = defaultdict(list)
+        seen_uids = set()
+        for music_object in p_pool:
+            if music_object is None or music_object.uid in seen_uids or music_object.duration <= 0:
+                continue
+            seen_uids.add(music_object.uid)
+            songs_by_duration[int(round(music_object.duration))].append(music_object)
+
+        target = int(round(p_target_duration_s))
+        for _ in range(MAX_PLANNING_ATTEMPTS):
+            counts = self.solve_subset_sum(songs_by_duration, target, target + self._tolerance_s)
+            if counts is None:
+                return []
+            planned_songs = self.pick_songs(songs_by_duration, counts, p_target_duration_s)
+            # Up to half a second of rounding per song: the real total is the one held to the tolerance
+            error = sum(x.duration for x in planned_songs) - p_target_duration_s
+            if abs(error) <= self._tolerance_s:
+                return self.spread_artists(planned_songs)
+            target -= int(round(error))
+        return []
+
+    def pick_songs(self, p_songs_by_duration: dict, p_counts: dict, p_target_duration_s: float):
+        # Random songs of each rounded duration, then swaps between songs of the same rounded duration bring the
+        # real total as close to the target as they can
+        picked_songs = {}
+        other_songs = {}
+        for duration, count in p_counts.items():
+            songs = list(p_songs_by_duration[duration])
+            self._random.shuffle(songs)
+            picked_songs[duration] = songs[:count]
+            other_songs[duration] = songs[count:]
+        error = sum(x.duration for songs in picked_songs.values() for x in songs) - p_target_duration_s
+        for _ in range(sum(p_counts.values())):
+            best_swap = None
+            for duration, songs in picked_songs.items():
+                if len(other_songs[duration]) == 0:
+                    continue
+                removed_index = max(range(len(songs)), key=lambda x: songs[x].duration * (1, -1)[error < 0])
+                added_index = min(range(len(other_songs[duration])),
+                                  key=lambda x: other_songs[duration][x].duration * (1, -1)[error < 0])
+                new_error = error - songs[removed_index].duration + other_songs[duration][added_index].duration
+                if abs(new_error) < abs(error) and (best_swap is None or abs(new_error) < abs(best_swap[0])):
+                    best_swap = (new_error, duration, removed_index, added_index)
+            if best_swap is None:
+                break
+            error, duration, removed_index, added_index = best_swap
+            picked_songs[duration][removed_index], other_songs[duration][added_index] = \
+                other_songs[duration][added_index], picked_songs[duration][removed_index]
+        return [x for songs in picked_songs.values() for x in songs]
+
+    def solve_subset_sum(self, p_songs_by_duration: dict, p_target: int, p_upper_bound: int):
+        # Bounded subset sum on integer seconds. Reachable sums are the bits of a Python int, each chunk of equal
+        # durations is one shift, so the cost depends on the number of distinct durations, not on the pool size
+        mask = (1 << (p_upper_bound + 1)) - 1
+        chunks = []
+        for duration, songs in p_songs_by_duration.items():
+            if duration <= p_upper_bound:
+                chunks.extend((duration, x) for x in split_in_binary_chunks(len(songs)))
+        # Shuffled so that equally good plans do not always pick the same durations
+        self._random.shuffle(chunks)
+        layers = [1]
+        for duration, count in chunks:
+            layers.append((layers[-1] | (layers[-1] << (duration * count))) & mask)
+
+        reachable = layers[-1]
+        best_sum = None
+        for delta in range(self._tolerance_s + 1):
+            for candidate in (p_target - delta, p_target + delta):
+                if 0 < candidate <= p_upper_bound and (reachable >> candidate) & 1:
+                    best_sum = candidate
+                    break
+            if best_sum is not None:
+                break
+        if best_sum is None:
+            return None
+
+        counts = defaultdict(int)
+        remaining = best_sum
+        for i in range(len(chunks), 0, -1):
+            if (layers[i - 1] >> remaining) & 1:
+                continue
+            duration, count = chunks[i - 1]
+            counts[duration] += count
+            remaining -= duration * count
+        return counts
+
+    def spread_artists(self, p_songs: List[MusicObject]) -> List[MusicObject]:
+        # Greedy ordering: the artist with the most songs left plays next, unless heard in the last gap songs
+        songs_by_artist = defaultdict(deque)
+        for music_object in p_songs:
+            songs_by_artist[music_object.artist].append(music_object)
+        ordered_songs = []
+        recent_artists = deque(maxlen=max(1, self._min_artist_gap))
+        while len(ordered_songs) < len(p_songs):
+            candidates = sorted(songs_by_artist, key=lambda x: len(songs_by_artist[x]), reverse=True)
+            artist = next((x for x in candidates if x not in recent_artists), candidates[0])
+            ordered_songs.append(songs_by_artist[artist].popleft())
+            if len(songs_by_artist[artist]) == 0:
+                del songs_by_artist[artist]
+            recent_artists.append(artist)
+        return ordered_songs
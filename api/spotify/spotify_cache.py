@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from api.spotify.spotify_web_api import HTTP_NOT_MODIFIED
+from api.util.instrumentation import Instrumentation
+
+
+class CachedResponse:
+    _payload: object
+    _etag: str
+    _expires_at: float
+
+    def __init__(self, p_payload, p_etag: str, p_expires_at: float):
+        self._payload = p_payload
+        self._etag = p_etag
+        self._expires_at = p_expires_at
+
+    @property
+    def payload(self):
+        return self._payload
+
+    @property
+    def etag(self):
+        return self._etag
+
+    @property
+    def expires_at(self):
+        return self._expires_at
+
+
+class SpotifyResponseCache:
+    # Responses kept p_ttl_s by key, the least recently used ones are dropped past p_max_entries. An expired response
+    # is revalidated with its ETag, a 304 keeps it for another p_ttl_s. Callers asking for a key already being fetched
+    # wait for that request and share its result instead of making another one. Every caller gets the same payload
+    # object, it must not be modified
+    _max_entries: int
+    _entries: OrderedDict
+    _requests_in_flight: dict
+    _lock: threading.Lock
+
+    def __init__(self, p_max_entries: int):
+        self._max_entries = p_max_entries
+        self._entries = OrderedDict()
+        self._requests_in_flight = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, p_key, p_ttl_s: float, p_fetch):
+        # p_fetch(ETag or None) gives (status, payload, ETag), as SpotifyWebApi.get
+        instrumentation = Instrumentation()
+        with self._lock:
+            entry = self._entries.get(p_key)
+            if entry is not None:
+                self._entries.move_to_end(p_key)
+                if entry.expires_at > time.monotonic():
+                    instrumentation.count("spotify.cache_hits")
+                    return entry.payload
+            future = self._requests_in_flight.get(p_key)
+            is_fetching = future is None
+            if is_fetching:
+                future = Future()
+                self._requests_in_flight[p_key] = future
+        if not is_fetching:
+            instrumentation.count("spotify.coalesced_requests")
+            return future.result()
+        try:
+            status, payload, etag = p_fetch(None if entry is None else entry.etag)
+            if status == HTTP_NOT_MODIFIED and entry is not None:
+                instrumentation.count("spotify.revalidated_responses")
+                payload = entry.payload
+            with self._lock:
+                self._entries[p_key] = CachedResponse(payload, etag, time.monotonic() + p_ttl_s)
+                self._entries.move_to_end(p_key)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+            future.set_result(payload)
+            return payload
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._requests_in_flight[p_key]
@@ -0,0 +1,14 @@
+class SpotifyError(Exception):
+
+    def __init__(self, p_message):
+        self.message = p_message
+        super().__init__(self.message)
+
+
+class SpotifyRequestError(SpotifyError):
+
+    def __init__(self, p_url, p_status, p_reason):
+        self.url = p_url
+        self.status = p_status
+        self.message = f"Spotify request {self.url} failed: {self.status} {p_reason}"
+        super().__init__(self.message)
@@ -1,7 +1,8 @@
-import spotipy
-import spotipy.util as sputil
-from spotipy.oauth2 import SpotifyClientCredentials, SpotifyOAuth
+from functools import partial
 
+from api.spotify.spotify_cache import SpotifyResponseCache
+from api.spotify.spotify_web_api import SpotifyWebApi, SPOTIFY_API_BASE_URL, CURRENTLY_PLAYING_PATH, DEVICES_PATH, \
+    PLAYLIST_PATH
 from api.util.singleton import Singleton
 
 CLIENT_ID = "768db570dfb248d886aef6a02a5fe4b3"
@@ -9,27 +10,58 @@ CLIENT_SECRET = "b3ba00983c9a41ab87708dff3da3a5fe"
 SCOPE = 'user-read-private user-read-playback-state user-modify-playback-state user-top-read playlist-modify-private playlist-modify-public user-library-read'
 REDIRECT_URI = "http://localhost:8888/"
 
+# How long each response is used before asking Spotify again, the playlists are revalidated with their ETag
+CURRENTLY_PLAYING_TTL_S = 1.0
+DEVICES_TTL_S = 10.0
+PLAYLIST_TTL_S = 300.0
+MAX_CACHED_PLAYER_RESPONSES = 8
+MAX_CACHED_PLAYLISTS = 16
+# By path, PLAYLIST_PATH stands for every playlist
+DEFAULT_TTLS_S = {CURRENTLY_PLAYING_PATH: CURRENTLY_PLAYING_TTL_S, DEVICES_PATH: DEVICES_TTL_S,
+                  PLAYLIST_PATH: PLAYLIST_TTL_S}
+
 
 class SpotifyManager(Singleton):
-    _client: spotipy.Spotify
+    # The responses are shared by every caller from the cache, they must be read only
+    _web_api: SpotifyWebApi = None
+    _player_cache: SpotifyResponseCache = None
+    _playlists_cache: SpotifyResponseCache = None
+    _ttls_s: dict = None
 
-    def initialize(self):
-        auth_manager = SpotifyOAuth(scope=SCOPE, client_id=CLIENT_ID, client_secret=CLIENT_SECRET, redirect_uri=REDIRECT_URI)
-        self._client = spotipy.Spotify(auth_manager=auth_manager)
+    def initialize(self, p_base_url: str = SPOTIFY_API_BASE_URL, p_access_token_provider=None, p_ttls_s: dict = None):
+        # Without a token provider the user signs in through OAuth, a stub server and a fixed token work offline.
+        # p_ttls_s replaces some of DEFAULT_TTLS_S
+        if p_access_token_provider is None:
+            # spotipy and requests are only imported when Spotify is actually used
+            from spotipy.oauth2 import SpotifyOAuth
+            auth_manager = SpotifyOAuth(scope=SCOPE, client_id=CLIENT_ID, client_secret=CLIENT_SECRET, redirect_uri=REDIRECT_URI)
+            p_access_token_provider = partial(auth_manager.get_access_token, as_dict=False)
+        self._web_api = SpotifyWebApi(p_base_url, p_access_token_provider)
+        self._player_cache = SpotifyResponseCache(MAX_CACHED_PLAYER_RESPONSES)
+        self._playlists_cache = SpotifyResponseCache(MAX_CACHED_PLAYLISTS)
+        self._ttls_s = dict(DEFAULT_TTLS_S)
+        if p_ttls_s is not None:
+            self._ttls_s.update(p_ttls_s)
 
     def get_currently_playing_track(self):
-        return self._client.currently_playing()
+        return self._player_cache.get(CURRENTLY_PLAYING_PATH, self._ttls_s[CURRENTLY_PLAYING_PATH],
+                                      partial(self._web_api.get, CURRENTLY_PLAYING_PATH))
 
     def get_devices(self):
-        return self._client.devices()
+        return self._player_cache.get(DEVICES_PATH, self._ttls_s[DEVICES_PATH],
+                                      partial(self._web_api.get, DEVICES_PATH))
+
+    def get_playlist(self, p_playlist_id: str):
+        return self._playlists_cache.get(p_playlist_id, self._ttls_s[PLAYLIST_PATH],
+                                         partial(self._web_api.get, PLAYLIST_PATH.format(p_playlist_id)))
 
     def get_current_playlist(self):
-        currently_playing = self._client.currently_playing()
+        currently_playing = self.get_currently_playing_track()
         if currently_playing is not None:
             context = currently_playing["context"]
-            if context is None:
+            if context is None or context["type"] != "playlist":
                 return None
             else:
                 uri = context["uri"]
-                playlist_id = uri.split(";")[-1]
-                return self._client.playlist(playlist_id)
\ No newline at end of file
+                playlist_id = uri.split(":")[-1]
+                return self.get_playlist(playlist_id)
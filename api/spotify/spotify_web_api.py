@@ -0,0 +1,50 @@
+import json
+import urllib.error
+import urllib.request
+from urllib.parse import urljoin
+
+from api.spotify.spotify_exceptions import SpotifyRequestError
+from api.util.instrumentation import Instrumentation
+
+SPOTIFY_API_BASE_URL = "https://api.spotify.com/v1/"
+CURRENTLY_PLAYING_PATH = "me/player/currently-playing"
+DEVICES_PATH = "me/player/devices"
+PLAYLIST_PATH = "playlists/{}"
+HTTP_NO_CONTENT = 204
+HTTP_NOT_MODIFIED = 304
+REQUEST_TIMEOUT_S = 5.0
+
+
+class SpotifyWebApi:
+    # Bare GET requests to the Web API, for the responses kept in cache: spotipy gives neither the ETag nor the 304.
+    # The base URL can point to a local stub server, with a fixed token, to work offline
+    _base_url: str
+    _access_token_provider: object
+
+    def __init__(self, p_base_url: str, p_access_token_provider):
+        self._base_url = p_base_url.rstrip("/") + "/"
+        self._access_token_provider = p_access_token_provider
+
+    @property
+    def base_url(self):
+        return self._base_url
+
+    def get(self, p_path: str, p_etag: str = None):
+        # Gives (status, payload, ETag). A 304 keeps the ETag sent, a 204 has no payload
+        url = urljoin(self._base_url, p_path)
+        request = urllib.request.Request(url, headers={"Authorization": f"Bearer {self._access_token_provider()}",
+                                                       "Accept": "application/json"})
+        if p_etag is not None:
+            request.add_header("If-None-Match", p_etag)
+        Instrumentation().count("spotify.requests")
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT_S) as response:
+                body = response.read()
+                payload = json.loads(body) if response.status != HTTP_NO_CONTENT and len(body) > 0 else None
+                return response.status, payload, response.headers.get("ETag")
+        except urllib.error.HTTPError as e:
+            if e.code == HTTP_NOT_MODIFIED:
+                return e.code, None, p_etag
+            raise SpotifyRequestError(url, e.code, e.reason)
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise SpotifyRequestError(url, None, e)
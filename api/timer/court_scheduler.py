@@ -0,0 +1,260 @@
+import heapq
+import itertools
+from enum import Enum
+from typing import List, Tuple, Dict
+
+DEFAULT_CUE_THRESHOLDS = (60, 5)
+MATCH_PHASE_IDENTIFIER = 1
+BREAK_PHASE_IDENTIFIER = 2
+
+
+class CourtEventType(Enum):
+    TRANSITION = 1
+    THRESHOLD = 2
+    END = 3
+
+
+class CourtPhase:
+    _identifier: int
+    _duration: int
+    _thresholds: Tuple[int, ...]
+    _offsets: List[Tuple[int, CourtEventType, int]]
+
+    def __init__(self, p_identifier: int, p_duration: int, p_thresholds: Tuple[int, ...] = DEFAULT_CUE_THRESHOLDS):
+        self._identifier = p_identifier
+        self._duration = p_duration
+        self._thresholds = tuple(sorted(set(x for x in p_thresholds if 0 < x < p_duration), reverse=True))
+        # Events of a phase are precomputed once, relative to the phase start
+        self._offsets = [(0, CourtEventType.TRANSITION, 0)]
+        self._offsets.extend((self._duration - x, CourtEventType.THRESHOLD, x) for x in self._thresholds)
+        self._offsets.append((self._duration, CourtEventType.END, 0))
+
+    @property
+    def identifier(self):
+        return self._identifier
+
+    @property
+    def duration(self):
+        return self._duration
+
+    @property
+    def thresholds(self):
+        return self._thresholds
+
+    @property
+    def offsets(self):
+        return self._offsets
+
+
+class CourtEvent:
+    __slots__ = ("time", "court_id", "event_type", "phase_identifier", "threshold")
+
+    def __init__(self, p_time: float, p_court_id: int, p_event_type: CourtEventType, p_phase_identifier: int,
+                 p_threshold: int):
+        self.time = p_time
+        self.court_id = p_court_id
+        self.event_type = p_event_type
+        self.phase_identifier = p_phase_identifier
+        self.threshold = p_threshold
+
+    def cue_key(self):
+        return self.event_type, self.phase_identifier, self.threshold
+
+
+class CourtTimeline:
+    _court_id: int
+    _name: str
+    _phases: List[CourtPhase]
+    _cycling: bool
+    _phase_index: int
+    _cursor: int
+    _phase_start: float
+    _paused_at: float
+    _generation: int
+    _finished: bool
+
+    def __init__(self, p_court_id: int, p_name: str, p_phases: List[CourtPhase], p_cycling: bool = True):
+        self._court_id = p_court_id
+        self._name = p_name
+        self._phases = p_phases
+        self._cycling = p_cycling
+        self._phase_index = 0
+        self._cursor = 0
+        self._phase_start = -1.0
+        self._paused_at = -1.0
+        self._generation = 0
+        self._finished = False
+
+    @property
+    def court_id(self):
+        return self._court_id
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def generation(self):
+        return self._generation
+
+    @property
+    def is_started(self):
+        return self._phase_start >= 0
+
+    @property
+    def is_paused(self):
+        return self._paused_at >= 0
+
+    @property
+    def is_finished(self):
+        return self._finished
+
+    def current_phase(self):
+        return self._phases[self._phase_index]
+
+    def time_left(self, p_now: float):
+        if not self.is_started or self._finished:
+            return self.current_phase().duration
+        reference = self._paused_at if self.is_paused else p_now
+        elapsed = max(0.0, reference - self._phase_start)
+        return max(0, self.current_phase().duration - int(elapsed))
+
+    def start(self, p_now: float):
+        self._phase_index = 0
+        self._cursor = 0
+        self._phase_start = p_now
+        self._paused_at = -1.0
+        self._finished = False
+        self._generation += 1
+
+    def pause(self, p_now: float):
+        if self.is_started and not self.is_paused and not self._finished:
+            self._paused_at = p_now
+            self._generation += 1
+
+    def resume(self, p_now: float):
+        if self.is_paused:
+            self._phase_start += p_now - self._paused_at
+            self._paused_at = -1.0
+            self._generation += 1
+
+    def stop(self):
+        self._phase_index = 0
+        self._cursor = 0
+        self._phase_start = -1.0
+        self._paused_at = -1.0
+        self._finished = False
+        self._generation += 1
+
+    def next_event_time(self):
+        if not self.is_started or self.is_paused or self._finished:
+            return None
+        return self._phase_start + self.current_phase().offsets[self._cursor][0]
+
+    def consume_event(self) -> CourtEvent:
+        phase = self.current_phase()
+        offset, event_type, threshold = phase.offsets[self._cursor]
+        event = CourtEvent(self._phase_start + offset, self._court_id, event_type, phase.identifier, threshold)
+        self._cursor += 1
+        if self._cursor == len(phase.offsets):
+            # The next phase starts exactly when the current one ends
+            self._phase_start += phase.duration
+            self._cursor = 0
+            self._phase_index += 1
+            if self._phase_index == len(self._phases):
+                self._phase_index = 0
+                self._finished = not self._cycling
+        return event
+
+
+class CourtScheduler:
+    _courts: Dict[int, CourtTimeline]
+    _heap: List[Tuple[float, int, int, int]]
+    _now: float
+
+    def __init__(self):
+        self._courts = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._now = 0.0
+
+    @property
+    def now(self):
+        return self._now
+
+    def add_court(self, p_timeline: CourtTimeline):
+        self._courts[p_timeline.court_id] = p_timeline
+
+    def remove_court(self, p_court_id: int):
+        if p_court_id in self._courts:
+            # Pending heap entries become stale and are skipped lazily
+            del self._courts[p_court_id]
+
+    def get_court(self, p_court_id: int):
+        if p_court_id in self._courts:
+            return self._courts[p_court_id]
+        else:
+            return None
+
+    def get_all_courts(self):
+        return list(self._courts.values())
+
+    def number_of_pending_events(self):
+        return len(self._heap)
+
+    def start_court(self, p_court_id: int, p_at: float = None):
+        timeline = self.get_court(p_court_id)
+        if timeline is not None:
+            timeline.start(self._now if p_at is None else p_at)
+            self._schedule(timeline)
+
+    def pause_court(self, p_court_id: int):
+        timeline = self.get_court(p_court_id)
+        if timeline is not None:
+            timeline.pause(self._now)
+
+    def resume_court(self, p_court_id: int):
+        timeline = self.get_court(p_court_id)
+        if timeline is not None and timeline.is_paused:
+            timeline.resume(self._now)
+            self._schedule(timeline)
+
+    def stop_court(self, p_court_id: int):
+        timeline = self.get_court(p_court_id)
+        if timeline is not None:
+            timeline.stop()
+
+    def advance(self, p_now: float) -> List[CourtEvent]:
+        self._now = p_now
+        due_events = []
+        heap = self._heap
+        while len(heap) > 0 and heap[0][0] <= p_now:
+            _, _, court_id, generation = heapq.heappop(heap)
+            timeline = self._courts.get(court_id)
+            if timeline is None or timeline.generation != generation:
+                continue
+            due_events.append(timeline.consume_event())
+            self._schedule(timeline)
+        return due_events
+
+    def _schedule(self, p_timeline: CourtTimeline):
+        next_time = p_timeline.next_event_time()
+        if next_time is not None:
+            heapq.heappush(self._heap, (next_time, next(self._sequence), p_timeline.court_id, p_timeline.generation))
+
+
+def deduplicate_cues(p_events: List[CourtEvent]) -> Dict[tuple, List[int]]:
+    cues = {}
+    for event in p_events:
+        cue_key = event.cue_key()
+        if cue_key in cues:
+            cues[cue_key].append(event.court_id)
+        else:
+            cues[cue_key] = [event.court_id]
+    return cues
+
+
+def build_match_and_break_phases(p_match_duration: int, p_break_duration: int,
+                                 p_thresholds: Tuple[int, ...] = DEFAULT_CUE_THRESHOLDS) -> List[CourtPhase]:
+    return [CourtPhase(MATCH_PHASE_IDENTIFIER, p_match_duration, p_thresholds),
+            CourtPhase(BREAK_PHASE_IDENTIFIER, p_break_duration, p_thresholds)]
@@ -0,0 +1,163 @@
+import json
+import uuid
+from datetime import datetime
+from enum import Enum
+from typing import List, Dict
+
+from api.timer.timer_exceptions import SequenceDefinitionError
+from config.config import CUE_BUZZER_MATCH_START, CUE_BUZZER_MATCH_END, CUE_FIVE_SECONDS_COUNTDOWN, \
+    CUE_ONE_MINUTE_LEFT_FOR_MATCH, CUE_ONE_MINUTE_LEFT_FOR_BREAK
+
+DEFAULT_SEQUENCE_NAME = "Match / Pause"
+
+
+class MusicSource(Enum):
+    PLAYLIST = 1
+    AMBIENT = 2
+    SILENCE = 3
+
+
+class SequencePhase:
+    _name: str
+    _duration: int
+    _music_source: MusicSource
+    _cues: Dict[int, str]
+    _start_cue: str
+    _end_cue: str
+
+    def __init__(self, p_name: str, p_duration: int, p_music_source=MusicSource.PLAYLIST, p_cues: Dict[int, str] = None,
+                 p_start_cue: str = None, p_end_cue: str = None):
+        self.name = p_name
+        self.duration = p_duration
+        self.music_source = p_music_source
+        # Cue table: seconds left in the phase -> cue name
+        self._cues = {} if p_cues is None else {int(k): v for k, v in p_cues.items()}
+        self._start_cue = p_start_cue
+        self._end_cue = p_end_cue
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, p_name):
+        if isinstance(p_name, str):
+            self._name = p_name
+        else:
+            raise SequenceDefinitionError(p_name)
+
+    @property
+    def duration(self):
+        return self._duration
+
+    @duration.setter
+    def duration(self, p_duration):
+        if isinstance(p_duration, int) and p_duration > 0:
+            self._duration = p_duration
+        else:
+            raise SequenceDefinitionError(p_duration)
+
+    @property
+    def music_source(self):
+        return self._music_source
+
+    @music_source.setter
+    def music_source(self, p_music_source):
+        if isinstance(p_music_source, MusicSource):
+            self._music_source = p_music_source
+        elif isinstance(p_music_source, int) and p_music_source in [x.value for x in MusicSource]:
+            self._music_source = MusicSource(p_music_source)
+        elif isinstance(p_music_source, str) and p_music_source.upper() in MusicSource.__members__:
+            self._music_source = MusicSource[p_music_source.upper()]
+        else:
+            raise SequenceDefinitionError(p_music_source)
+
+    @property
+    def cues(self):
+        return self._cues
+
+    @property
+    def start_cue(self):
+        return self._start_cue
+
+    @property
+    def end_cue(self):
+        return self._end_cue
+
+    def as_dict(self):
+        return {"name": self.name, "duration": self.duration, "music_source": self.music_source.name.lower(),
+                "cues": {str(k): v for k, v in self.cues.items()}, "start_cue": self.start_cue,
+                "end_cue": self.end_cue}
+
+    @staticmethod
+    def from_dict(p_dict: dict):
+        try:
+            return SequencePhase(p_dict["name"], p_dict["duration"], p_dict.get("music_source", "playlist"),
+                                 p_dict.get("cues"), p_dict.get("start_cue"), p_dict.get("end_cue"))
+        except (KeyError, AttributeError, ValueError):
+            raise SequenceDefinitionError(p_dict)
+
+
+class Sequence:
+    _uid: uuid.UUID
+    _name: str
+    _phases: List[SequencePhase]
+    _loop: bool
+    _creation_time_stamp: datetime
+
+    def __init__(self, p_uid: str = None, p_name: str = None, p_phases: List[SequencePhase] = None,
+                 p_loop: bool = True, p_creation_time_stamp=None):
+        self._uid = uuid.uuid4() if p_uid is None else uuid.UUID(p_uid)
+        self._name = "Nouvelle séquence" if p_name is None else p_name
+        self._phases = [] if p_phases is None else p_phases
+        self._loop = p_loop
+        if p_creation_time_stamp is None:
+            self._creation_time_stamp = datetime.now()
+        else:
+            self._creation_time_stamp = datetime.fromtimestamp(p_creation_time_stamp)
+
+    @property
+    def uid(self):
+        return self._uid
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def phases(self):
+        return self._phases
+
+    @property
+    def loop(self):
+        return self._loop
+
+    @property
+    def creation_date(self):
+        return self._creation_time_stamp
+
+    def total_duration(self):
+        return sum(x.duration for x in self._phases)
+
+    def definition_as_json(self):
+        return json.dumps({"loop": self.loop, "phases": [x.as_dict() for x in self._phases]})
+
+    @staticmethod
+    def from_json(p_uid: str, p_name: str, p_definition: str, p_creation_time_stamp: float = None):
+        try:
+            definition = json.loads(p_definition)
+            phases = [SequencePhase.from_dict(x) for x in definition["phases"]]
+        except (ValueError, KeyError, TypeError):
+            raise SequenceDefinitionError(p_definition)
+        if len(phases) == 0:
+            raise SequenceDefinitionError(p_definition)
+        return Sequence(p_uid, p_name, phases, bool(definition.get("loop", True)), p_creation_time_stamp)
+
+
+def build_default_sequence(p_match_duration: int = 300, p_break_duration: int = 300):
+    match_phase = SequencePhase("Match", p_match_duration, MusicSource.PLAYLIST,
+                                {60: CUE_ONE_MINUTE_LEFT_FOR_MATCH, 5: CUE_FIVE_SECONDS_COUNTDOWN},
+                                p_start_cue=CUE_BUZZER_MATCH_START, p_end_cue=CUE_BUZZER_MATCH_END)
+    break_phase = SequencePhase("Pause", p_break_duration, MusicSource.AMBIENT,
+                                {60: CUE_ONE_MINUTE_LEFT_FOR_BREAK, 5: CUE_FIVE_SECONDS_COUNTDOWN})
+    return Sequence(p_name=DEFAULT_SEQUENCE_NAME, p_phases=[match_phase, break_phase], p_loop=True)
@@ -0,0 +1,177 @@
+from enum import Enum
+from typing import List
+
+from api.timer.sequence import Sequence
+
+
+class SequenceEventType(Enum):
+    PHASE_START = 1
+    CUE = 2
+    PHASE_END = 3
+    SEQUENCE_END = 4
+
+
+class SequenceEvent:
+    __slots__ = ("time", "event_type", "phase_index", "cue")
+
+    def __init__(self, p_time: int, p_event_type: SequenceEventType, p_phase_index: int, p_cue: str = None):
+        self.time = p_time
+        self.event_type = p_event_type
+        self.phase_index = p_phase_index
+        self.cue = p_cue
+
+
+def build_timeline(p_sequence: Sequence) -> List[SequenceEvent]:
+    timeline = []
+    phase_start = 0
+    for phase_index, phase in enumerate(p_sequence.phases):
+        timeline.append(SequenceEvent(phase_start, SequenceEventType.PHASE_START, phase_index))
+        if phase.start_cue is not None:
+            timeline.append(SequenceEvent(phase_start, SequenceEventType.CUE, phase_index, phase.start_cue))
+        for seconds_left in sorted(phase.cues, reverse=True):
+            if 0 < seconds_left < phase.duration:
+                timeline.append(SequenceEvent(phase_start + phase.duration - seconds_left, SequenceEventType.CUE,
+                                              phase_index, phase.cues[seconds_left]))
+        phase_start += phase.duration
+        if phase.end_cue is not None:
+            timeline.append(SequenceEvent(phase_start, SequenceEventType.CUE, phase_index, phase.end_cue))
+        timeline.append(SequenceEvent(phase_start, SequenceEventType.PHASE_END, phase_index))
+    if not p_sequence.loop:
+        timeline.append(SequenceEvent(phase_start, SequenceEventType.SEQUENCE_END, len(p_sequence.phases) - 1))
+    return timeline
+
+
+class SequenceEngine:
+    _sequence: Sequence
+    _timeline: List[SequenceEvent]
+    _phase_starts: List[int]
+    _pointer: int
+    _cycle: int
+    _origin: float
+    _paused_at: float
+    _is_started: bool
+    _current_phase_index: int
+
+    def __init__(self, p_sequence: Sequence):
+        self._sequence = p_sequence
+        # The whole timeline is computed once, ticking only compares against the next event
+        self._timeline = build_timeline(p_sequence)
+        self._phase_starts = [x.time for x in self._timeline if x.event_type == SequenceEventType.PHASE_START]
+        self.stop()
+
+    @property
+    def sequence(self):
+        return self._sequence
+
+    @property
+    def timeline(self):
+        return self._timeline
+
+    @property
+    def is_running(self):
+        return self._is_started and self._paused_at < 0
+
+    @property
+    def is_paused(self):
+        return self._paused_at >= 0
+
+    def current_phase_index(self):
+        return self._current_phase_index
+
+    def current_phase(self):
+        return self._sequence.phases[self._current_phase_index]
+
+    def start(self, p_now: float, p_elapsed: float = 0.0):
+        # Started p_elapsed seconds in, the events already past are skipped without being reported
+        self._pointer = 0
+        self._cycle = 0
+        # Far enough in, the origin is before the clock started, it can be negative
+        self._origin = p_now - p_elapsed
+        self._paused_at = -1.0
+        self._is_started = True
+        self._current_phase_index = 0
+        if p_elapsed > 0:
+            self.tick(p_now)
+
+    def pause(self, p_now: float):
+        if self.is_running:
+            self._paused_at = p_now
+
+    def resume(self, p_now: float):
+        if self.is_paused:
+            self._origin += p_now - self._paused_at
+            self._paused_at = -1.0
+
+    def stop(self):
+        self._pointer = 0
+        self._cycle = 0
+        self._origin = -1.0
+        self._paused_at = -1.0
+        self._is_started = False
+        self._current_phase_index = 0
+
+    def elapsed(self, p_now: float):
+        # Since the start of the current cycle, pauses left out
+        if not self._is_started:
+            return 0.0
+        reference = self._paused_at if self.is_paused else p_now
+        return reference - self._origin
+
+    def time_left(self, p_now: float):
+        phase_duration = self.current_phase().duration
+        if not self._is_started:
+            return phase_duration
+        reference = self._paused_at if self.is_paused else p_now
+        elapsed_in_phase = reference - self._origin - self._phase_starts[self._current_phase_index]
+        return max(0, min(phase_duration, phase_duration - int(elapsed_in_phase)))
+
+    def tick(self, p_now: float) -> List[SequenceEvent]:
+        due_events = []
+        if not self.is_running:
+            return due_events
+        elapsed = p_now - self._origin
+        timeline = self._timeline
+        while self._pointer < len(timeline) and timeline[self._pointer].time <= elapsed:
+            event = timeline[self._pointer]
+            due_events.append(event)
+            self._pointer += 1
+            if event.event_type == SequenceEventType.PHASE_START:
+                self._current_phase_index = event.phase_index
+            elif event.event_type == SequenceEventType.SEQUENCE_END:
+                self.stop()
+                break
+            if self._pointer == len(timeline) and self._sequence.loop:
+                # Looping only rebases the origin, the timeline itself is reused
+                self._origin += self._sequence.total_duration()
+                self._pointer = 0
+                self._cycle += 1
+                elapsed = p_now - self._origin
+        return due_events
+
+    def position_key(self):
+        return self._cycle, self._pointer
+
+    def upcoming_cues(self, p_now: float, p_horizon: float):
+        # Cues due within the horizon, as (key, absolute due time, cue name), without consuming them
+        upcoming_cues = []
+        if not self.is_running:
+            return upcoming_cues
+        timeline = self._timeline
+        index = self._pointer
+        cycle = self._cycle
+        origin = self._origin
+        limit = p_now + p_horizon
+        while True:
+            if index == len(timeline):
+                if not self._sequence.loop or self._sequence.total_duration() <= 0:
+                    break
+                index = 0
+                cycle += 1
+                origin += self._sequence.total_duration()
+            event = timeline[index]
+            if origin + event.time > limit:
+                break
+            if event.event_type == SequenceEventType.CUE:
+                upcoming_cues.append(((cycle, index), origin + event.time, event.cue))
+            index += 1
+        return upcoming_cues
@@ -0,0 +1,13 @@
+class TimerError(Exception):
+
+    def __init__(self, p_message):
+        self.message = p_message
+        super().__init__(self.message)
+
+
+class SequenceDefinitionError(TimerError):
+
+    def __init__(self, p_definition):
+        self.invalid_definition = p_definition
+        self.message = f"Sequence definition {self.invalid_definition} is not valid"
+        super().__init__(self.message)
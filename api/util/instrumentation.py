@@ -0,0 +1,161 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from api.util.singleton import Singleton
+
+MAX_TRACE_EVENTS = 200000
+# Bucket i holds the values in [2^(i-1), 2^i[, bucket 0 the values below 1
+NB_OF_HISTOGRAM_BUCKETS = 40
+
+
+class Histogram:
+    _count: int
+    _total: float
+    _min: float
+    _max: float
+    _buckets: list
+
+    def __init__(self):
+        self._count = 0
+        self._total = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+        self._buckets = [0] * NB_OF_HISTOGRAM_BUCKETS
+
+    def add(self, p_value: float):
+        self._count += 1
+        self._total += p_value
+        self._min = min(self._min, p_value)
+        self._max = max(self._max, p_value)
+        bucket = 0 if p_value < 1 else min(NB_OF_HISTOGRAM_BUCKETS - 1, int(math.log2(p_value)) + 1)
+        self._buckets[bucket] += 1
+
+    def percentile(self, p_percentile: float):
+        # Upper bound of the bucket holding the percentile, never above the largest value seen
+        rank = p_percentile * self._count
+        seen = 0
+        for bucket, count in enumerate(self._buckets):
+            seen += count
+            if count > 0 and seen >= rank:
+                return min(self._max, 2.0 ** bucket)
+        return self._max
+
+    def as_dict(self):
+        if self._count == 0:
+            return {"count": 0}
+        return {
+            "count": self._count,
+            "total": round(self._total, 3),
+            "mean": round(self._total / self._count, 3),
+            "min": round(self._min, 3),
+            "max": round(self._max, 3),
+            "p50": round(self.percentile(0.5), 3),
+            "p90": round(self.percentile(0.9), 3),
+            "p99": round(self.percentile(0.99), 3),
+        }
+
+
+class Instrumentation(Singleton):
+    # Timers, counters and histograms, recorded only once enabled. Timer durations are in microseconds, every timed
+    # call and every counter change is also kept as a Chrome trace event
+    _is_enabled: bool = False
+    _lock: threading.Lock = threading.Lock()
+    _start_time: float = 0.0
+    _timers: dict = {}
+    _counters: dict = {}
+    _histograms: dict = {}
+    _trace_events: deque = deque(maxlen=MAX_TRACE_EVENTS)
+
+    def enable(self):
+        self._is_enabled = True
+        self._start_time = time.perf_counter()
+        self._timers = {}
+        self._counters = {}
+        self._histograms = {}
+        self._trace_events = deque(maxlen=MAX_TRACE_EVENTS)
+
+    @property
+    def is_enabled(self):
+        return self._is_enabled
+
+    def record_duration(self, p_name: str, p_category: str, p_start: float, p_end: float):
+        if not self._is_enabled:
+            return
+        duration_us = 1e6 * (p_end - p_start)
+        with self._lock:
+            self._timers.setdefault(p_name, Histogram()).add(duration_us)
+            self._trace_events.append({"name": p_name, "cat": p_category, "ph": "X",
+                                       "ts": round(1e6 * (p_start - self._start_time), 1),
+                                       "dur": round(duration_us, 1), "pid": os.getpid(),
+                                       "tid": threading.get_ident()})
+
+    def count(self, p_name: str, p_increment: int = 1):
+        if not self._is_enabled:
+            return
+        with self._lock:
+            value = self._counters.get(p_name, 0) + p_increment
+            self._counters[p_name] = value
+            self._trace_events.append({"name": p_name, "ph": "C",
+                                       "ts": round(1e6 * (time.perf_counter() - self._start_time), 1),
+                                       "pid": os.getpid(), "args": {"value": value}})
+
+    def observe(self, p_name: str, p_value: float):
+        if not self._is_enabled:
+            return
+        with self._lock:
+            self._histograms.setdefault(p_name, Histogram()).add(p_value)
+
+    def report(self):
+        with self._lock:
+            return {
+                "timers_us": {k: v.as_dict() for k, v in sorted(self._timers.items())},
+                "counters": dict(sorted(self._counters.items())),
+                "histograms": {k: v.as_dict() for k, v in sorted(self._histograms.items())},
+            }
+
+    def export(self, p_path: Path):
+        # Chrome trace object format, opened as is by chrome://tracing or Perfetto, the summary rides along
+        if not self._is_enabled:
+            return
+        report = self.report()
+        with self._lock:
+            trace_events = list(self._trace_events)
+        try:
+            with open(p_path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms", "otherData": report}, f)
+        except OSError as e:
+            print(e)
+
+
+def instrumented(p_category: str):
+    # Decided when the decorated module is imported: unless the instrumentation is already enabled at that time,
+    # the function is returned untouched and its calls cost nothing more
+    def decorator(p_function):
+        instrumentation = Instrumentation()
+        if not instrumentation.is_enabled:
+            return p_function
+        name = p_function.__qualname__
+
+        @functools.wraps(p_function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return p_function(*args, **kwargs)
+            finally:
+                instrumentation.record_duration(name, p_category, start, time.perf_counter())
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_methods(p_class, p_prefix: str, p_category: str):
+    for name, value in list(vars(p_class).items()):
+        if name.startswith(p_prefix) and callable(value):
+            setattr(p_class, name, instrumented(p_category)(value))
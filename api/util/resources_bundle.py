@@ -0,0 +1,51 @@
+from pathlib import Path
+
+from PySide6.QtCore import QResource, QUrl
+from PySide6.QtGui import QIcon
+
+from api.util.singleton import Singleton
+from config.config import RESOURCES_DIR_NAME, RESOURCES_BUNDLE_FILE_NAME
+
+RESOURCES_BUNDLE_PATH_PREFIX = ":/"
+RESOURCES_BUNDLE_URL_PREFIX = "qrc:/"
+
+
+class ResourcesBundle(Singleton):
+    # Qt maps the compiled bundle in memory once, the files are then read from it without being opened one by one.
+    # Without a bundle the loose files of the resources directory are used instead
+    _resources_dir: Path = Path(__file__).parent.parent.parent / RESOURCES_DIR_NAME
+    _is_registered: bool = False
+    _icons: dict = {}
+
+    def register(self, p_base_dir: Path):
+        self._resources_dir = Path(p_base_dir) / RESOURCES_DIR_NAME
+        if not self._is_registered:
+            bundle_path = self._resources_dir / RESOURCES_BUNDLE_FILE_NAME
+            if bundle_path.exists():
+                self._is_registered = QResource.registerResource(str(bundle_path))
+                if not self._is_registered:
+                    print(f"Impossible de charger {bundle_path}, les fichiers de {self._resources_dir} sont utilisés")
+        return self._is_registered
+
+    @property
+    def is_registered(self):
+        return self._is_registered
+
+    def path(self, *p_parts: str) -> str:
+        if self._is_registered:
+            return RESOURCES_BUNDLE_PATH_PREFIX + "/".join(p_parts)
+        return str(self._resources_dir.joinpath(*p_parts))
+
+    def url(self, *p_parts: str) -> QUrl:
+        if self._is_registered:
+            return QUrl(RESOURCES_BUNDLE_URL_PREFIX + "/".join(p_parts))
+        return QUrl.fromLocalFile(self.path(*p_parts))
+
+    def icon(self, *p_parts: str) -> QIcon:
+        # Every widget asking for the same icon shares one QIcon, so its pixmaps are decoded only once
+        key = "/".join(p_parts)
+        icon = self._icons.get(key)
+        if icon is None:
+            icon = QIcon(self.path(*p_parts))
+            self._icons[key] = icon
+        return icon
@@ -0,0 +1,117 @@
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from PySide6 import QtCore
+from PySide6.QtCore import QObject
+
+from api.util.instrumentation import Instrumentation
+
+HEARTBEAT_INTERVAL_S = 0.02
+STALL_THRESHOLD_S = 0.1
+MAX_RECORDED_STALLS = 100
+
+
+class StallDetector(QObject):
+    # A watchdog thread sends heartbeats to the main thread and times how long the event loop takes to answer. When it
+    # does not answer in time, the stack of the main thread is captured while it is still stuck
+    heartbeat_sent = QtCore.Signal(float)
+    stall_recorded = QtCore.Signal(int, float)
+
+    _watchdog_thread: threading.Thread
+    _stop_event: threading.Event
+    _acknowledged: threading.Event
+    _acknowledged_at: float
+    _lock: threading.Lock
+    _nb_of_stalls: int
+    _worst_stall_s: float
+    _stalls: deque
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._watchdog_thread = None
+        self._stop_event = threading.Event()
+        self._acknowledged = threading.Event()
+        self._acknowledged_at = 0.0
+        self._lock = threading.Lock()
+        self._nb_of_stalls = 0
+        self._worst_stall_s = 0.0
+        self._stalls = deque(maxlen=MAX_RECORDED_STALLS)
+        self.heartbeat_sent.connect(self.handle_heartbeat)
+
+    @property
+    def nb_of_stalls(self):
+        return self._nb_of_stalls
+
+    def start(self):
+        if self._watchdog_thread is not None and self._watchdog_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._watchdog_thread = threading.Thread(target=self.watch, daemon=True)
+        self._watchdog_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._acknowledged.set()
+        if self._watchdog_thread is not None:
+            self._watchdog_thread.join()
+            self._watchdog_thread = None
+
+    def handle_heartbeat(self, p_sent_at: float):
+        # Runs on the main thread, as soon as the event loop gets to the queued heartbeat
+        self._acknowledged_at = time.perf_counter()
+        self._acknowledged.set()
+
+    def capture_main_thread_stack(self):
+        frame = sys._current_frames().get(threading.main_thread().ident)
+        return "" if frame is None else "".join(traceback.format_stack(frame))
+
+    def watch(self):
+        instrumentation = Instrumentation()
+        while not self._stop_event.is_set():
+            self._acknowledged.clear()
+            sent_at = time.perf_counter()
+            self.heartbeat_sent.emit(sent_at)
+            stack = None
+            if not self._acknowledged.wait(STALL_THRESHOLD_S):
+                stack = self.capture_main_thread_stack()
+                self._acknowledged.wait()
+            if self._stop_event.is_set():
+                return
+            latency = self._acknowledged_at - sent_at
+            instrumentation.observe("main_loop.latency_ms", 1000 * latency)
+            if stack is not None:
+                self.record_stall(latency, stack)
+            self._stop_event.wait(HEARTBEAT_INTERVAL_S)
+
+    def record_stall(self, p_duration_s: float, p_stack: str):
+        with self._lock:
+            self._nb_of_stalls += 1
+            self._worst_stall_s = max(self._worst_stall_s, p_duration_s)
+            self._stalls.append((datetime.now() - timedelta(seconds=p_duration_s), p_duration_s, p_stack))
+            nb_of_stalls = self._nb_of_stalls
+        Instrumentation().count("main_loop.stalls")
+        self.stall_recorded.emit(nb_of_stalls, 1000 * p_duration_s)
+
+    def report(self):
+        with self._lock:
+            stalls = list(self._stalls)
+            lines = [f"Blocages de la boucle principale au-delà de {1000 * STALL_THRESHOLD_S:.0f} ms : "
+                     f"{self._nb_of_stalls}, le plus long {1000 * self._worst_stall_s:.0f} ms"]
+        if len(stalls) < self._nb_of_stalls:
+            lines.append(f"Seuls les {len(stalls)} derniers sont détaillés")
+        for started_at, duration_s, stack in stalls:
+            lines.append("")
+            lines.append(f"{started_at:%Y-%m-%d %H:%M:%S} - {1000 * duration_s:.0f} ms")
+            lines.append(stack.rstrip())
+        return "\n".join(lines)
+
+    def dump_report(self, p_path: Path):
+        try:
+            p_path.write_text(self.report() + "\n", encoding="utf-8")
+        except OSError as e:
+            print(e)
@@ -0,0 +1,35 @@
+import time
+
+from api.util.singleton import Singleton
+
+
+class StartupProfiler(Singleton):
+    # Phases are timed from one mark to the next, marking costs nothing until the profiler is enabled
+    _is_enabled: bool = False
+    _start_time: float = 0.0
+    _last_time: float = 0.0
+    _phases: list = []
+
+    def enable(self, p_start_time: float = None):
+        self._is_enabled = True
+        self._start_time = time.perf_counter() if p_start_time is None else p_start_time
+        self._last_time = self._start_time
+        self._phases = []
+
+    @property
+    def is_enabled(self):
+        return self._is_enabled
+
+    def mark(self, p_phase: str):
+        if self._is_enabled:
+            now = time.perf_counter()
+            self._phases.append((p_phase, now - self._last_time, now - self._start_time))
+            self._last_time = now
+
+    def report(self):
+        if not self._is_enabled:
+            return ""
+        width = max([len(x[0]) for x in self._phases] + [5])
+        lines = [f"{'Phase':<{width}}  {'Durée (ms)':>10}  {'Cumul (ms)':>10}"]
+        lines.extend(f"{x[0]:<{width}}  {1000 * x[1]:>10.1f}  {1000 * x[2]:>10.1f}" for x in self._phases)
+        return "\n".join(lines)
@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.timer.court_scheduler import CourtScheduler, CourtTimeline, build_match_and_break_phases, deduplicate_cues
+
+TICK_SECONDS = 0.1
+
+
+def simulate(p_number_of_courts: int, p_simulated_hours: float, p_stagger: int):
+    scheduler = CourtScheduler()
+    for court_id in range(p_number_of_courts):
+        scheduler.add_court(CourtTimeline(court_id, f"Court {court_id}", build_match_and_break_phases(300, 300)))
+        scheduler.start_court(court_id, court_id * p_stagger)
+
+    number_of_ticks = int(p_simulated_hours * 3600 / TICK_SECONDS)
+    number_of_events = 0
+    number_of_cues = 0
+    start = time.perf_counter()
+    for tick in range(number_of_ticks):
+        events = scheduler.advance(tick * TICK_SECONDS)
+        if len(events) > 0:
+            number_of_events += len(events)
+            number_of_cues += len(deduplicate_cues(events))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "courts": p_number_of_courts,
+        "simulated_hours": p_simulated_hours,
+        "ticks": number_of_ticks,
+        "events": number_of_events,
+        "cues_after_deduplication": number_of_cues,
+        "elapsed_s": round(elapsed, 4),
+        "us_per_event": round(1e6 * elapsed / max(1, number_of_events), 3),
+        "us_per_tick": round(1e6 * elapsed / number_of_ticks, 3),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless multi-court scheduler simulation")
+    parser.add_argument("--courts", type=int, default=64)
+    parser.add_argument("--hours", type=float, default=8)
+    parser.add_argument("--stagger", type=int, default=0)
+    args = parser.parse_args()
+
+    for result in [simulate(x, args.hours, args.stagger) for x in sorted({8, args.courts})]:
+        print(result)
@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+# Set before anything imports Qt, the model is driven without any window
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api.music.music_and_playlists_manager as manager_module
+from api.music.music_and_playlists_manager import MusicAndPlaylistsManager
+
+DEFAULT_LIBRARY_SIZES = [1000, 10000, 100000]
+SONGS_PER_PLAYLIST_RATIO = 0.1
+MAX_SONGS_PER_PLAYLIST = 2000
+MIN_NB_OF_PLAYLISTS = 20
+VISIBLE_ROWS = 40
+SCROLLED_ROWS = 20000
+EDITED_SONGS = 10
+JOURNALED_EDITS = 200
+
+
+def generate_library(p_user_data_dir: Path, p_nb_of_songs: int, p_nb_of_playlists: int, p_rng: random.Random):
+    # Rows are written straight to the DB and the archive holds empty files, no tag is ever read
+    manager = MusicAndPlaylistsManager()
+    manager.set_base_dir(p_user_data_dir)
+    manager.mkdirs()
+    archive_folder = manager.get_musics_archive_folder()
+    ambient_path = manager.get_ambient_musics_archive_folder() / "ambient.mp3"
+    ambient_path.touch()
+    # With an ambient music already in the DB, the preloaded ones are not imported
+    manager.db_create_table(manager_module.sql_create_break_musics_table)
+    conn = sqlite3.connect(manager.get_db_file_path())
+    conn.execute(manager_module.sql_insert_one_ambient_music,
+                 (str(uuid.uuid4()), "Ambiance", "Inconnu", 60.0, str(ambient_path), 1))
+    conn.commit()
+    conn.close()
+    manager.init_db()
+
+    songs_rows = []
+    for i in range(p_nb_of_songs):
+        song_path = archive_folder / f"{i:016x}.mp3"
+        song_path.touch()
+        analysis = (p_rng.uniform(-12, 0), p_rng.randrange(2000), p_rng.randrange(2000), p_rng.uniform(80, 180),
+                    p_rng.random()) if p_rng.random() < 0.5 else (None,) * 5
+        songs_rows.append((str(uuid.UUID(int=p_rng.getrandbits(128))), f"Titre {i}", f"Artiste {i % 997}",
+                           p_rng.uniform(90, 420), str(song_path)) + analysis)
+
+    songs_per_playlist = max(1, min(MAX_SONGS_PER_PLAYLIST, int(p_nb_of_songs * SONGS_PER_PLAYLIST_RATIO)))
+    playlists_rows = []
+    playlist_songs_rows = []
+    for i in range(p_nb_of_playlists):
+        playlist_id = str(uuid.UUID(int=p_rng.getrandbits(128)))
+        playlists_rows.append((playlist_id, f"Playlist {i}", 1_600_000_000.0 + i))
+        playlist_songs_rows.extend((playlist_id, x[0], position) for position, x in
+                                   enumerate(p_rng.choices(songs_rows, k=songs_per_playlist)))
+
+    conn = sqlite3.connect(manager.get_db_file_path())
+    conn.executemany(manager_module.sql_insert_one_song, songs_rows)
+    conn.executemany(manager_module.sql_insert_one_playlist, playlists_rows)
+    conn.executemany(manager_module.sql_insert_one_playlist_song_entry, playlist_songs_rows)
+    conn.commit()
+    conn.close()
+
+
+def timed(p_function, *p_args):
+    start = time.perf_counter()
+    p_function(*p_args)
+    return 1000 * (time.perf_counter() - start)
+
+
+def edit_one_playlist(p_manager: MusicAndPlaylistsManager, p_rng: random.Random):
+    playlists = p_manager.get_all_playlists_from_store()
+    playlist = p_rng.choice(playlists)
+    song_uids = p_rng.choices(p_rng.choice(playlists).get_all_songs(), k=EDITED_SONGS)
+    playlist.insert_songs_uids(p_rng.randrange(playlist.size() + 1), song_uids)
+    return playlist
+
+
+def measure_manager(p_nb_of_songs: int, p_nb_of_playlists: int, p_runs: int):
+    # save_all and clean_music_archive drop the songs no playlist holds, every run starts from the same library
+    # generated again, so that the medians are all taken on the library size asked for
+    manager = MusicAndPlaylistsManager()
+    timings = {"start_ms": [], "start_from_snapshot_ms": [], "save_one_playlist_ms": [],
+               "save_one_playlist_written_ms": [], "journaled_edit_us": [], "save_all_ms": [],
+               "clean_music_archive_ms": []}
+    for _ in range(p_runs):
+        with tempfile.TemporaryDirectory() as user_data_dir:
+            user_data_dir = Path(user_data_dir)
+            rng = random.Random(p_nb_of_songs)
+            generate_library(user_data_dir, p_nb_of_songs, p_nb_of_playlists, rng)
+            timings["start_ms"].append(timed(manager.start, user_data_dir))
+
+            # The GUI thread only waits for the submission, the write itself runs on the DB writer thread
+            playlist = edit_one_playlist(manager, rng)
+            start = time.perf_counter()
+            save_future = manager.save_one_playlist(playlist.uid)
+            timings["save_one_playlist_ms"].append(1000 * (time.perf_counter() - start))
+            save_future.result()
+            timings["save_one_playlist_written_ms"].append(1000 * (time.perf_counter() - start))
+
+            # One song moved at a time, the edit and its journal record, the disk sync runs on the journal thread
+            playlist = rng.choice(manager.get_all_playlists_from_store())
+            edit_timings = [1000 * timed(playlist.shift_one_song_down, rng.randrange(playlist.size()))
+                            for _ in range(JOURNALED_EDITS)]
+            timings["journaled_edit_us"].append(statistics.median(edit_timings))
+
+            [edit_one_playlist(manager, rng) for _ in range(3)]
+            start = time.perf_counter()
+            music_objects_to_keep, _ = manager.save_all()
+            manager.flush_db_writes()
+            timings["save_all_ms"].append(1000 * (time.perf_counter() - start))
+            timings["clean_music_archive_ms"].append(timed(manager.clean_music_archive, music_objects_to_keep))
+
+            manager.save_library_snapshot(music_objects_to_keep)
+            timings["start_from_snapshot_ms"].append(timed(manager.start, user_data_dir))
+            manager.stop()
+    return {k: round(statistics.median(v), 3) for k, v in timings.items()}
+
+
+def measure_model(p_runs: int):
+    from PySide6.QtCore import Qt
+    from api.music.playlist_model import PlaylistModel
+
+    model = PlaylistModel()
+    nb_of_playlists = MusicAndPlaylistsManager().get_number_of_playlists_in_store()
+    switch_timings = []
+    for _ in range(p_runs):
+        start = time.perf_counter()
+        [model.switch_playlist(x) for x in range(nb_of_playlists)]
+        switch_timings.append(1000 * (time.perf_counter() - start) / nb_of_playlists)
+
+    # A view asks for every visible cell of each page it scrolls through
+    scrolled_rows = min(SCROLLED_ROWS, model.rowCount())
+    nb_of_cells = 0
+    start = time.perf_counter()
+    for first_row in range(0, scrolled_rows, VISIBLE_ROWS):
+        for row in range(first_row, min(first_row + VISIBLE_ROWS, scrolled_rows)):
+            for column in range(model.columnCount()):
+                model.data(model.index(row, column), Qt.DisplayRole)
+                nb_of_cells += 1
+    data_elapsed = time.perf_counter() - start
+    return {
+        "switch_playlist_ms": round(statistics.median(switch_timings), 3),
+        "data_us_per_cell": round(1e6 * data_elapsed / max(1, nb_of_cells), 3),
+    }
+
+
+def run_benchmarks(p_sizes, p_runs: int):
+    from PySide6.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+
+    results = {}
+    for nb_of_songs in p_sizes:
+        nb_of_playlists = max(MIN_NB_OF_PLAYLISTS, nb_of_songs // 1000)
+        size_results = {"songs": nb_of_songs, "playlists": nb_of_playlists}
+        size_results.update(measure_manager(nb_of_songs, nb_of_playlists, p_runs))
+        with tempfile.TemporaryDirectory() as user_data_dir:
+            user_data_dir = Path(user_data_dir)
+            start = time.perf_counter()
+            generate_library(user_data_dir, nb_of_songs, nb_of_playlists, random.Random(nb_of_songs))
+            print(f"{nb_of_songs} songs, {nb_of_playlists} playlists generated in "
+                  f"{time.perf_counter() - start:.1f} s", file=sys.stderr)
+            manager = MusicAndPlaylistsManager()
+            manager.start(user_data_dir)
+            size_results.update(measure_model(p_runs))
+            manager.stop()
+        results[str(nb_of_songs)] = size_results
+    del app
+    return results
+
+
+def compare_to_baseline(p_results: dict, p_baseline: dict, p_threshold: float):
+    # Every timing slower than the baseline by more than the threshold is a regression
+    regressions = []
+    for size, size_results in p_results.items():
+        for metric, value in size_results.items():
+            baseline_value = p_baseline.get(size, {}).get(metric)
+            if not metric.endswith(("_ms", "_us", "_us_per_cell")) or not baseline_value:
+                continue
+            ratio = value / baseline_value
+            print(f"{size:>7} {metric:<28} {baseline_value:>12.3f} {value:>12.3f} {ratio:>7.2f}x", file=sys.stderr)
+            if ratio > 1 + p_threshold:
+                regressions.append({"songs": size, "metric": metric, "baseline": baseline_value, "value": value,
+                                    "ratio": round(ratio, 3)})
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Manager and playlist model timings on synthetic libraries")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_LIBRARY_SIZES)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="JSON file the results are written to")
+    parser.add_argument("--baseline", type=Path, help="JSON file of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="tolerated slowdown, 0.2 for 20%%")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time_stamp": time.time(),
+        "results": run_benchmarks(args.sizes, args.runs),
+    }
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare_to_baseline(report["results"], json.load(f)["results"], args.threshold)
+
+    report_json = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(report_json, encoding="utf-8")
+    print(report_json)
+    if len(report.get("regressions", [])) > 0:
+        sys.exit(1)
@@ -0,0 +1,51 @@
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.music.playlist_planner import PlaylistPlanner
+
+
+class SyntheticSong:
+    # Only what the planner reads from a MusicObject
+    def __init__(self, p_duration: float, p_artist: str):
+        self.uid = uuid.uuid4()
+        self.duration = p_duration
+        self.artist = p_artist
+
+
+def simulate(p_pool_size: int, p_target_duration_s: int, p_runs: int):
+    rng = random.Random(0)
+    pool = [SyntheticSong(rng.uniform(90, 420), f"Artist {rng.randrange(p_pool_size // 20 + 1)}") for _ in
+            range(p_pool_size)]
+    planner = PlaylistPlanner(p_seed=0)
+    timings = []
+    planned_durations = []
+    for _ in range(p_runs):
+        start = time.perf_counter()
+        planned_songs = planner.plan(p_target_duration_s, pool)
+        timings.append(time.perf_counter() - start)
+        planned_durations.append(sum(x.duration for x in planned_songs))
+    timings.sort()
+
+    return {
+        "pool": p_pool_size,
+        "target_s": p_target_duration_s,
+        "median_ms": round(1000 * timings[len(timings) // 2], 3),
+        "max_ms": round(1000 * timings[-1], 3),
+        "worst_error_s": round(max(abs(x - p_target_duration_s) for x in planned_durations), 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Duration-fitting planner on synthetic libraries")
+    parser.add_argument("--pool", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    for target in [300, 600, 3600, 8 * 3600]:
+        print(simulate(args.pool, target, args.runs))
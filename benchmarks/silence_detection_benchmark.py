@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.audio.loudness import LoudnessMeter
+from api.audio.silence import SilenceDetector
+
+ANALYSIS_SAMPLE_RATE = 22050
+CHUNK_SIZE = 4096
+
+
+def synthetic_chunks(p_rng: np.random.Generator, p_track_seconds: float, p_head_seconds: float,
+                     p_tail_seconds: float):
+    # Yields the track chunk by chunk like the decoder does, the whole track never exists in memory
+    nb_of_samples = int(p_track_seconds * ANALYSIS_SAMPLE_RATE)
+    head = int(p_head_seconds * ANALYSIS_SAMPLE_RATE)
+    tail = nb_of_samples - int(p_tail_seconds * ANALYSIS_SAMPLE_RATE)
+    for chunk_start in range(0, nb_of_samples, CHUNK_SIZE):
+        chunk_size = min(CHUNK_SIZE, nb_of_samples - chunk_start)
+        chunk = p_rng.standard_normal(chunk_size, dtype=np.float32) * 0.1
+        positions = np.arange(chunk_start, chunk_start + chunk_size)
+        chunk[(positions < head) | (positions >= tail)] *= 1e-4
+        yield chunk
+
+
+def simulate(p_number_of_tracks: int, p_track_seconds: float):
+    rng = np.random.default_rng(0)
+    nb_of_exact_detections = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(p_number_of_tracks):
+        head_seconds, tail_seconds = rng.uniform(0, 4, 2)
+        stages = [LoudnessMeter(), SilenceDetector()]
+        for chunk in synthetic_chunks(rng, p_track_seconds, head_seconds, tail_seconds):
+            for stage in stages:
+                stage.feed(chunk, ANALYSIS_SAMPLE_RATE)
+        results = stages[1].result()
+        expected_end_ms = (p_track_seconds - tail_seconds) * 1000
+        if abs(results["start_offset_ms"] - head_seconds * 1000) <= 40 and \
+                abs(results["end_offset_ms"] - expected_end_ms) <= 40:
+            nb_of_exact_detections += 1
+    elapsed = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "tracks": p_number_of_tracks,
+        "track_seconds": p_track_seconds,
+        "exact_detections": nb_of_exact_detections,
+        "elapsed_s": round(elapsed, 3),
+        "ms_per_track": round(1000 * elapsed / p_number_of_tracks, 3),
+        "peak_memory_kb": round(peak_memory / 1024, 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Streaming loudness and silence analysis on synthetic tracks")
+    parser.add_argument("--tracks", type=int, default=10000)
+    parser.add_argument("--seconds", type=float, default=30)
+    args = parser.parse_args()
+
+    print(simulate(args.tracks, args.seconds))
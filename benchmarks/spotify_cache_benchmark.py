@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.spotify.spotify_functions import SpotifyManager, MAX_CACHED_PLAYLISTS, CURRENTLY_PLAYING_TTL_S
+from api.spotify.spotify_web_api import CURRENTLY_PLAYING_PATH, DEVICES_PATH, PLAYLIST_PATH
+from api.util.instrumentation import Instrumentation
+
+STUB_PLAYLIST_ID = "stubplaylist"
+STUB_ACCESS_TOKEN = "stub-token"
+
+
+class StubSpotifyHandler(BaseHTTPRequestHandler):
+    # Stands in for the Web API, every request waits latency_s as a real round trip would. The playlists carry an
+    # ETag and are answered with a 304 when it still matches
+    latency_s = 0.05
+    requests_by_path = {}
+    not_modified_responses = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        path = self.path.split("?")[0].removeprefix("/v1/")
+        with self.lock:
+            StubSpotifyHandler.requests_by_path[path] = self.requests_by_path.get(path, 0) + 1
+        time.sleep(self.latency_s)
+        if self.headers.get("Authorization") != f"Bearer {STUB_ACCESS_TOKEN}":
+            self.send_answer(401, {"error": {"status": 401, "message": "Invalid access token"}})
+        elif path == CURRENTLY_PLAYING_PATH:
+            self.send_answer(200, {"is_playing": True, "progress_ms": 1000, "item": {"name": "Titre"},
+                                   "context": {"type": "playlist", "uri": f"spotify:playlist:{STUB_PLAYLIST_ID}"}})
+        elif path == DEVICES_PATH:
+            self.send_answer(200, {"devices": [{"id": "stub", "name": "Enceinte", "is_active": True}]})
+        elif path.startswith(PLAYLIST_PATH.format("")):
+            playlist_id = path.split("/")[-1]
+            etag = f'"{playlist_id}-1"'
+            if self.headers.get("If-None-Match") == etag:
+                with self.lock:
+                    StubSpotifyHandler.not_modified_responses += 1
+                self.send_answer(304, None, etag)
+            else:
+                self.send_answer(200, {"id": playlist_id, "name": playlist_id,
+                                       "tracks": {"items": [{"track": {"name": f"Titre {i}"}} for i in range(100)]}},
+                                 etag)
+        else:
+            self.send_answer(404, {"error": {"status": 404, "message": "Not found"}})
+
+    def send_answer(self, p_status: int, p_payload, p_etag: str = None):
+        body = b"" if p_payload is None else json.dumps(p_payload).encode("utf-8")
+        self.send_response(p_status)
+        if p_etag is not None:
+            self.send_header("ETag", p_etag)
+        if len(body) > 0:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def count_requests(p_path: str = None):
+    with StubSpotifyHandler.lock:
+        if p_path is None:
+            return sum(StubSpotifyHandler.requests_by_path.values())
+        return StubSpotifyHandler.requests_by_path.get(p_path, 0)
+
+
+def measure(p_base_url: str, p_callers: int, p_poll_s: float, p_poll_interval_s: float):
+    spotify_manager = SpotifyManager()
+    spotify_manager.initialize(p_base_url, lambda: STUB_ACCESS_TOKEN)
+    results = {}
+
+    # Every caller asks for the current playlist at once, only one request per endpoint reaches the server
+    requests_before = count_requests()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(p_callers) as executor:
+        playlists = list(executor.map(lambda x: spotify_manager.get_current_playlist(), range(p_callers)))
+    results["concurrent_callers"] = p_callers
+    results["concurrent_requests"] = count_requests() - requests_before
+    results["concurrent_ms"] = round(1000 * (time.perf_counter() - start), 2)
+    results["concurrent_payloads_shared"] = all(x is playlists[0] for x in playlists)
+
+    # A widget polling the player only reaches the server once per TTL
+    requests_before = count_requests(CURRENTLY_PLAYING_PATH)
+    nb_of_polls = 0
+    end = time.perf_counter() + p_poll_s
+    while time.perf_counter() < end:
+        spotify_manager.get_currently_playing_track()
+        spotify_manager.get_devices()
+        nb_of_polls += 1
+        time.sleep(p_poll_interval_s)
+    results["polls"] = nb_of_polls
+    results["polling_currently_playing_requests"] = count_requests(CURRENTLY_PLAYING_PATH) - requests_before
+
+    # Once expired, the playlist is revalidated with its ETag and the payload kept. Playlists expire at once here
+    spotify_manager.initialize(p_base_url, lambda: STUB_ACCESS_TOKEN, {PLAYLIST_PATH: 0.0})
+    playlist = spotify_manager.get_playlist("revalidated")
+    start = time.perf_counter()
+    revalidated_playlist = spotify_manager.get_playlist("revalidated")
+    results["revalidation_ms"] = round(1000 * (time.perf_counter() - start), 2)
+    results["not_modified_responses"] = StubSpotifyHandler.not_modified_responses
+    results["revalidated_payload_kept"] = revalidated_playlist is playlist
+
+    # Past MAX_CACHED_PLAYLISTS, the least recently used playlist has to be fetched again
+    spotify_manager.initialize(p_base_url, lambda: STUB_ACCESS_TOKEN)
+    [spotify_manager.get_playlist(f"playlist{i}") for i in range(MAX_CACHED_PLAYLISTS + 1)]
+    requests_before = count_requests(PLAYLIST_PATH.format("playlist0"))
+    start = time.perf_counter()
+    spotify_manager.get_playlist("playlist0")
+    results["evicted_playlist_ms"] = round(1000 * (time.perf_counter() - start), 2)
+    results["evicted_playlist_requests"] = count_requests(PLAYLIST_PATH.format("playlist0")) - requests_before
+    requests_before = count_requests(PLAYLIST_PATH.format("playlist0"))
+    start = time.perf_counter()
+    spotify_manager.get_playlist("playlist0")
+    results["cached_playlist_us"] = round(1e6 * (time.perf_counter() - start), 2)
+    results["cached_playlist_requests"] = count_requests(PLAYLIST_PATH.format("playlist0")) - requests_before
+    results["counters"] = Instrumentation().report()["counters"]
+    return results
+
+
+def check(p_results: dict, p_poll_s: float):
+    # What the stub must have seen, gives the failed checks
+    expected = {
+        "one request per endpoint for the concurrent callers": p_results["concurrent_requests"] == 2,
+        "one payload shared by the concurrent callers": p_results["concurrent_payloads_shared"],
+        "polling bounded by the TTL": p_results["polling_currently_playing_requests"] <=
+                                      p_poll_s / CURRENTLY_PLAYING_TTL_S + 2,
+        "expired playlist revalidated with a 304": p_results["not_modified_responses"] >= 1,
+        "payload kept on a 304": p_results["revalidated_payload_kept"],
+        "evicted playlist fetched again": p_results["evicted_playlist_requests"] == 1,
+        "cached playlist served without request": p_results["cached_playlist_requests"] == 0,
+    }
+    return [k for k, v in expected.items() if not v]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Spotify response cache against a local stub of the Web API, "
+                                                 "no network access or account needed")
+    parser.add_argument("--callers", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--poll-seconds", type=float, default=3)
+    parser.add_argument("--poll-interval-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    StubSpotifyHandler.latency_s = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSpotifyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    Instrumentation().enable()
+    try:
+        results = measure(f"http://127.0.0.1:{server.server_port}/v1/", args.callers, args.poll_seconds,
+                          args.poll_interval_ms / 1000)
+    finally:
+        server.shutdown()
+    print(json.dumps(results, indent=2))
+    failed_checks = check(results, args.poll_seconds)
+    if len(failed_checks) > 0:
+        sys.exit("Failed: " + ", ".join(failed_checks))
@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import RESOURCES_DIR_NAME, RESOURCES_BUNDLE_FILE_NAME, MUSIC_CONTROLS_DIR_NAME, \
+    CURRENT_MUSIC_CONTROLS_VERSION, APPICON_DIR_NAME, APP_ICON_FILE_NAME, PRELOADED_SOUNDS_DIR_NAME, \
+    CUE_SOUND_FILE_NAMES
+
+base_dir = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ICON_SIZE = 32
+CUES_LOADING_TIMEOUT_S = 10.0
+
+# Icons asked for while the main window is built, in the order the widgets ask for them
+STARTUP_ICONS = [(APPICON_DIR_NAME, APP_ICON_FILE_NAME)] + \
+                [(MUSIC_CONTROLS_DIR_NAME, CURRENT_MUSIC_CONTROLS_VERSION, f"{x}_icon_small.png") for x in
+                 ["play", "pause", "stop", "next", "previous", "shuffle_on", "shuffle_off", "no_repeat", "repeat_all",
+                  "repeat_one"]] + \
+                [("disquette.png",), ("plus.ico",), ("bin.png",)]
+
+
+def run_scenario(p_scenario: str):
+    # The application's own loading: the bundle registered as main does, the icons built through ResourcesBundle as
+    # the widgets build them, and one preloaded player per cue as MusicPlayer.init_cue_players sets them up. Without
+    # the bundle, ResourcesBundle falls back on the loose files
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtGui import QGuiApplication
+    from PySide6.QtMultimedia import QAudioOutput, QMediaPlayer
+    from api.util.resources_bundle import ResourcesBundle
+
+    app = QGuiApplication(sys.argv[:1])
+    resources_bundle = ResourcesBundle()
+    timings = {}
+
+    start = time.perf_counter()
+    if p_scenario == "bundle" and not resources_bundle.register(base_dir):
+        raise RuntimeError(f"{RESOURCES_BUNDLE_FILE_NAME} could not be registered")
+    timings["register_ms"] = 1000 * (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    # The window icon is asked for again by the message boxes
+    icons = [resources_bundle.icon(*x) for x in STARTUP_ICONS + [STARTUP_ICONS[0]]]
+    for icon in icons:
+        icon.pixmap(ICON_SIZE, ICON_SIZE)
+    timings["icons_ms"] = 1000 * (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    cue_players = []
+    for cue_file_name in CUE_SOUND_FILE_NAMES.values():
+        cue_audio_output = QAudioOutput()
+        cue_audio_output.setVolume(0.5)
+        cue_qmedia_player = QMediaPlayer()
+        cue_qmedia_player.setAudioOutput(cue_audio_output)
+        cue_qmedia_player.setSource(resources_bundle.url(PRELOADED_SOUNDS_DIR_NAME, cue_file_name))
+        cue_players.append((cue_audio_output, cue_qmedia_player))
+    # The cues are ready once the backend has loaded them
+    loaded_statuses = (QMediaPlayer.MediaStatus.LoadedMedia, QMediaPlayer.MediaStatus.InvalidMedia)
+    deadline = time.perf_counter() + CUES_LOADING_TIMEOUT_S
+    while not all(x[1].mediaStatus() in loaded_statuses for x in cue_players) and time.perf_counter() < deadline:
+        app.processEvents()
+    timings["cues_ms"] = 1000 * (time.perf_counter() - start)
+    nb_of_loaded_cues = sum(x[1].mediaStatus() == QMediaPlayer.MediaStatus.LoadedMedia for x in cue_players)
+
+    del cue_players
+    del app
+    return {"scenario": p_scenario, "loaded_cues": nb_of_loaded_cues,
+            "total_ms": round(sum(timings.values()), 3), **{k: round(v, 3) for k, v in timings.items()}}
+
+
+def measure(p_scenario: str, p_runs: int):
+    # One process per run, Qt would otherwise serve the pixmaps of the later runs from its caches
+    results = []
+    for _ in range(p_runs):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--scenario", p_scenario],
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    summary = {"scenario": p_scenario, "runs": p_runs, "loaded_cues": min(x["loaded_cues"] for x in results)}
+    for key in ["register_ms", "icons_ms", "cues_ms", "total_ms"]:
+        summary[f"median_{key}"] = round(statistics.median(x[key] for x in results), 3)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time spent loading the startup icons and cue sounds, from the "
+                                                 "loose files and from the resources bundle")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scenario", choices=["loose", "bundle"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario is not None:
+        print(json.dumps(run_scenario(args.scenario)))
+        sys.exit(0)
+
+    if not (base_dir / RESOURCES_DIR_NAME / RESOURCES_BUNDLE_FILE_NAME).exists():
+        print(f"{RESOURCES_BUNDLE_FILE_NAME} est introuvable, lancer d'abord build_resources.py")
+        sys.exit(1)
+
+    loose = measure("loose", args.runs)
+    bundle = measure("bundle", args.runs)
+    print(loose)
+    print(bundle)
+    print({"ms_saved": round(loose["median_total_ms"] - bundle["median_total_ms"], 3)})
@@ -0,0 +1,54 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from config.config import RESOURCES_DIR_NAME, RESOURCES_COLLECTION_FILE_NAME, RESOURCES_BUNDLE_FILE_NAME
+
+basedir = Path(os.path.dirname(__file__))
+resources_dir = basedir / RESOURCES_DIR_NAME
+GENERATED_FILE_NAMES = {RESOURCES_COLLECTION_FILE_NAME, RESOURCES_BUNDLE_FILE_NAME}
+
+
+def list_resources_files():
+    return sorted(x.relative_to(resources_dir).as_posix() for x in resources_dir.rglob("*")
+                  if x.is_file() and x.name not in GENERATED_FILE_NAMES)
+
+
+def write_collection_file():
+    # Paths are relative to the collection file, so that ":/appIcon/beach_volley_icon.ico" is
+    # resources/appIcon/beach_volley_icon.ico
+    lines = ['<!DOCTYPE RCC>', '<RCC version="1.0">', '<qresource prefix="/">']
+    lines.extend(f'    <file>{escape(x)}</file>' for x in list_resources_files())
+    lines.extend(['</qresource>', '</RCC>', ''])
+    collection_path = resources_dir / RESOURCES_COLLECTION_FILE_NAME
+    collection_path.write_text("\n".join(lines), encoding="utf-8")
+    return collection_path
+
+
+def compile_bundle(p_collection_path: Path):
+    rcc = shutil.which("pyside6-rcc")
+    if rcc is None:
+        print("pyside6-rcc est introuvable, installer PySide6 pour compiler les ressources")
+        return False
+    bundle_path = resources_dir / RESOURCES_BUNDLE_FILE_NAME
+    # Sounds are already compressed, compressing them again would only slow down every read
+    result = subprocess.run([rcc, "--binary", "--no-compress", str(p_collection_path), "-o", str(bundle_path)])
+    if result.returncode != 0:
+        return False
+    print(f"{bundle_path} : {bundle_path.stat().st_size // 1024} Ko")
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compile the resources directory into a binary Qt resource bundle")
+    parser.add_argument("--collection-only", action="store_true", help="only regenerate the .qrc file")
+    args = parser.parse_args()
+
+    collection_path = write_collection_file()
+    print(f"{collection_path} : {len(list_resources_files())} fichiers")
+    if not args.collection_only and not compile_bundle(collection_path):
+        sys.exit(1)
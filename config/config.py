@@ -9,6 +9,15 @@ APPICON_DIR_NAME = "appIcon"
 DATABASE_MUSICS_FILE_NAME = "musics_and_playlists.db"
 PRELOADED_SOUNDS_DIR_NAME = "preloaded_sounds"
 AMBIENT_MUSICS_ARCHIVE_DIR_NAME = "ambientMusicsArchive"
+WAVEFORMS_CACHE_DIR_NAME = "waveformsCache"
+WAVEFORM_PEAKS_KEY = "waveform_peaks"
+WAVEFORM_PEAKS_FILE_EXTENSION = ".peaks"
+LIBRARY_SNAPSHOT_FILE_NAME = "library.snapshot"
+LIBRARY_JOURNAL_FILE_NAME = "library.journal"
+STALLS_REPORT_FILE_NAME = "stalls_report.txt"
+RESOURCES_COLLECTION_FILE_NAME = "resources.qrc"
+RESOURCES_BUNDLE_FILE_NAME = "resources.rcc"
+APP_ICON_FILE_NAME = "beach_volley_icon.ico"
 
 # Preloaded sounds files
 BUZZER_MATCH_START_FILE_NAME = "buzzer_debut_de_match.mp3"
@@ -20,3 +29,17 @@ ONE_MINUTE_LEFT_FOR_BREAK_FILE_NAME = "une_minute_restant_pause.mp3"
 AMBIENT_RAIN_FILE_NAME = "rain-falling.ogg"
 AMBIENT_SHREKSOPHONE_FILE_NAME = "shreksophone.mp3"
 
+# Cues usable in match/break sequences
+CUE_BUZZER_MATCH_START = "buzzer_match_start"
+CUE_BUZZER_MATCH_END = "buzzer_match_end"
+CUE_FIVE_SECONDS_COUNTDOWN = "five_seconds_countdown"
+CUE_ONE_MINUTE_LEFT_FOR_MATCH = "one_minute_left_match"
+CUE_ONE_MINUTE_LEFT_FOR_BREAK = "one_minute_left_break"
+CUE_SOUND_FILE_NAMES = {
+    CUE_BUZZER_MATCH_START: BUZZER_MATCH_START_FILE_NAME,
+    CUE_BUZZER_MATCH_END: BUZZER_MATCH_END_FILE_NAME,
+    CUE_FIVE_SECONDS_COUNTDOWN: FIVE_SECONDS_COUNTDOWN_FILE_NAME,
+    CUE_ONE_MINUTE_LEFT_FOR_MATCH: ONE_MINUTE_LEFT_FOR_MATCH_FILE_NAME,
+    CUE_ONE_MINUTE_LEFT_FOR_BREAK: ONE_MINUTE_LEFT_FOR_BREAK_FILE_NAME,
+}
+
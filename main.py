@@ -1,18 +1,53 @@
+import time
+
+startup_time = time.perf_counter()
+
+import argparse
 import os
 import sys
 from pathlib import Path
 
-from PySide6 import QtWidgets
+from PySide6 import QtWidgets, QtCore
 
-from widgets.main_window import MainWindow
 from config.config import USER_DATA_FOLDER, MUSICS_AND_PLAYLISTS_DIR_NAME
-from api.music.music_and_playlists_manager import MusicAndPlaylistsManager
+from api.util.instrumentation import Instrumentation
+from api.util.resources_bundle import ResourcesBundle
+from api.util.startup_profiler import StartupProfiler
 
 basedir = Path(os.path.dirname(__file__))
 
 
+def report_startup():
+    print(StartupProfiler().report())
+
+
 if __name__ == '__main__':
-    app = QtWidgets.QApplication([])
+    parser = argparse.ArgumentParser(description="Music Player - Volleyball NG")
+    parser.add_argument("--profile-startup", action="store_true", help="print the time spent in each startup phase")
+    parser.add_argument("--trace", type=Path, help="time the DB calls, imports, track changes and cues, and write "
+                                                   "them to this Chrome trace file on exit")
+    args, qt_args = parser.parse_known_args()
+
+    startup_profiler = StartupProfiler()
+    if args.profile_startup:
+        startup_profiler.enable(startup_time)
+    startup_profiler.mark("Imports Qt")
+
+    # Enabled before the application modules are imported, their instrumented functions are wrapped at import time
+    instrumentation = Instrumentation()
+    if args.trace is not None:
+        instrumentation.enable()
+
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
+    startup_profiler.mark("QApplication")
+
+    ResourcesBundle().register(basedir)
+    startup_profiler.mark("Resources bundle")
+
+    # Everything else is imported once the application exists, so that the profile shows where the time goes
+    from api.music.music_and_playlists_manager import MusicAndPlaylistsManager
+    from widgets.main_window import MainWindow
+    startup_profiler.mark("Imports application")
 
     user_data_dir = basedir / USER_DATA_FOLDER
     music_and_playlists_dir = user_data_dir / MUSICS_AND_PLAYLISTS_DIR_NAME
@@ -25,11 +60,20 @@ if __name__ == '__main__':
 
     musics_and_playlists_manager = MusicAndPlaylistsManager()
     musics_and_playlists_manager.start(user_data_dir)
+    startup_profiler.mark("Library loading")
 
     widget = MainWindow(basedir)
+    startup_profiler.mark("Main window")
     widget.showMaximized()
     widget.show()
+    startup_profiler.mark("Show")
 
-    sys.exit(app.exec())
-
+    if startup_profiler.is_enabled:
+        # Runs once the first events are processed, the deferred initializations queued before it included
+        QtCore.QTimer.singleShot(0, lambda: startup_profiler.mark("First events (interactive)"))
+        QtCore.QTimer.singleShot(0, report_startup)
 
+    exit_code = app.exec()
+    if args.trace is not None:
+        instrumentation.export(args.trace)
+    sys.exit(exit_code)
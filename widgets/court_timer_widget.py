@@ -0,0 +1,94 @@
+from PySide6 import QtCore
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import QWidget, QLabel, QPushButton, QGridLayout
+
+from api.timer.court_scheduler import MATCH_PHASE_IDENTIFIER
+from widgets.timer_widget import secs_to_hoursminsec, START_BUTTON_TEXT, PAUSE_BUTTON_TEXT, RESUME_BUTTON_TEXT, \
+    STOP_BUTTON_TEXT
+
+MATCH_PHASE_TEXT = "Match"
+BREAK_PHASE_TEXT = "Pause"
+IDLE_PHASE_TEXT = "--"
+
+
+class CourtTimerWidget(QWidget):
+    start_pause_clicked = QtCore.Signal(int)
+    stop_clicked = QtCore.Signal(int)
+
+    _court_id: int
+    _displayed_time_left: int
+    _name_label: QLabel
+    _phase_label: QLabel
+    _time_label: QLabel
+    _start_pause_button: QPushButton
+    _stop_button: QPushButton
+    _grid_layout: QGridLayout
+
+    def __init__(self, p_parent, p_court_id: int, p_name: str):
+        super().__init__(p_parent)
+        self._court_id = p_court_id
+        self._displayed_time_left = -1
+        self.setup_ui(p_name)
+
+    @property
+    def court_id(self):
+        return self._court_id
+
+    def setup_ui(self, p_name: str):
+        self.create_widgets(p_name)
+        self.create_layout()
+        self.add_widgets_layout()
+        self.setup_connections()
+
+    def create_widgets(self, p_name: str):
+        self._name_label = QLabel(self)
+        self._name_label.setText(p_name)
+
+        self._phase_label = QLabel(self)
+        self._phase_label.setText(IDLE_PHASE_TEXT)
+
+        self._time_label = QLabel(self)
+        custom_font = QFont()
+        custom_font.setPointSize(18)
+        self._time_label.setFont(custom_font)
+
+        self._start_pause_button = QPushButton(self)
+        self._start_pause_button.setText(START_BUTTON_TEXT)
+
+        self._stop_button = QPushButton(self)
+        self._stop_button.setText(STOP_BUTTON_TEXT)
+        self._stop_button.setEnabled(False)
+
+    def create_layout(self):
+        self._grid_layout = QGridLayout(self)
+        self._grid_layout.setContentsMargins(2, 2, 2, 2)
+
+    def add_widgets_layout(self):
+        self._grid_layout.addWidget(self._name_label, 0, 0)
+        self._grid_layout.addWidget(self._phase_label, 0, 1)
+        self._grid_layout.addWidget(self._time_label, 1, 0, 1, -1)
+        self._grid_layout.addWidget(self._start_pause_button, 2, 0)
+        self._grid_layout.addWidget(self._stop_button, 2, 1)
+
+    def setup_connections(self):
+        self._start_pause_button.clicked.connect(lambda: self.start_pause_clicked.emit(self._court_id))
+        self._stop_button.clicked.connect(lambda: self.stop_clicked.emit(self._court_id))
+
+    def update_time_left(self, p_time_left: int):
+        # Labels are only touched when the displayed second actually changes
+        if p_time_left != self._displayed_time_left:
+            self._displayed_time_left = p_time_left
+            self._time_label.setText(secs_to_hoursminsec(p_time_left))
+
+    def update_phase(self, p_phase_identifier: int):
+        self._phase_label.setText((BREAK_PHASE_TEXT, MATCH_PHASE_TEXT)[p_phase_identifier == MATCH_PHASE_IDENTIFIER])
+
+    def update_state(self, p_started: bool, p_paused: bool):
+        if not p_started:
+            self._start_pause_button.setText(START_BUTTON_TEXT)
+            self._phase_label.setText(IDLE_PHASE_TEXT)
+        elif p_paused:
+            self._start_pause_button.setText(RESUME_BUTTON_TEXT)
+        else:
+            self._start_pause_button.setText(PAUSE_BUTTON_TEXT)
+        self._stop_button.setEnabled(p_started)
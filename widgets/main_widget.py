@@ -1,13 +1,23 @@
+import time
+import uuid
 from enum import Enum
 
 from PySide6 import QtWidgets, QtCore
 from PySide6.QtWidgets import QGridLayout, QLabel, QCheckBox, QPushButton, QWidget
 
+from api.audio.library_analyzer import LibraryAnalyzer
+from api.music.edit_journal import JOURNAL_COMPACTION_INTERVAL_S
 from api.music.music_and_playlists_manager import MusicAndPlaylistsManager
+from widgets.multi_court_widget import MultiCourtWidget
 from widgets.music_player import MusicPlayer
 from widgets.playlist_widget import PlayListWidget
+from widgets.sequence_widget import SequenceWidget
 from widgets.timer_widget import MyTimerWidget
 
+SESSION_STATE_SAVE_DELAY_MS = 500
+# An older session, left the day before for instance, is shown back but nothing plays or runs again
+SESSION_RESUME_MAX_AGE_S = 900
+
 
 class TimerChainingMode(Enum):
     NO_CYCLING = 1
@@ -18,9 +28,7 @@ class MainWidget(QtWidgets.QWidget):
     toggle_mode_signal = QtCore.Signal(int)
     signal_ambient_music = QtCore.Signal(str)
     match_timer_ends = QtCore.Signal()
-    break_timer_ends = QtCore.Signal(int)
     match_timer_stops = QtCore.Signal(int)
-    break_timer_stops = QtCore.Signal(int)
 
     _mode: TimerChainingMode
     _grid_main_layout: QGridLayout
@@ -29,11 +37,16 @@ class MainWidget(QtWidgets.QWidget):
     _music_player: MusicPlayer
     _check_box_enable_match_and_break_transition: QCheckBox
     _check_box_enable_break_music: QCheckBox
+    _check_box_enable_multi_court: QCheckBox
     _start_cycling_button: QPushButton
     _stop_cycling_button: QPushButton
     _empty_widget: QWidget
     _match_timer_widget: MyTimerWidget
-    _break_timer_widget: MyTimerWidget
+    _sequence_widget: SequenceWidget
+    _multi_court_widget: MultiCourtWidget
+    _library_analyzer: LibraryAnalyzer
+    _journal_compaction_timer: QtCore.QTimer
+    _session_state_timer: QtCore.QTimer
     _base_dir: str
     _music_and_playlists_manager: MusicAndPlaylistsManager
 
@@ -43,6 +56,11 @@ class MainWidget(QtWidgets.QWidget):
         self._mode = TimerChainingMode.NO_CYCLING
         self._music_and_playlists_manager = MusicAndPlaylistsManager()
         self.setup_ui()
+        # Playback comes back as soon as the event loop runs, before the analysis starts
+        QtCore.QTimer.singleShot(0, self.restore_session_state)
+        # Analysis only starts once the event loop runs, the window shows up first
+        QtCore.QTimer.singleShot(0, self.start_library_analysis)
+        self._journal_compaction_timer.start()
 
     @property
     def mode(self):
@@ -67,11 +85,16 @@ class MainWidget(QtWidgets.QWidget):
         self._music_player = MusicPlayer(self)
         self._check_box_enable_match_and_break_transition = QCheckBox(self)
         self._check_box_enable_break_music = QCheckBox(self)
+        self._check_box_enable_multi_court = QCheckBox(self)
         self._start_cycling_button = QPushButton(self)
         self._stop_cycling_button = QPushButton(self)
         self._empty_widget = QWidget(self)
         self._match_timer_widget = MyTimerWidget(self, 300, 1)
-        self._break_timer_widget = MyTimerWidget(self, 300, 2)
+        self._sequence_widget = SequenceWidget(self)
+        self._multi_court_widget = MultiCourtWidget(self)
+        self._library_analyzer = LibraryAnalyzer(self)
+        self._journal_compaction_timer = QtCore.QTimer(self)
+        self._session_state_timer = QtCore.QTimer(self)
 
     def modify_widgets(self):
         # self._photo.setGeometry(QtCore.QRect(0, 0, 1769, 1324))
@@ -83,12 +106,17 @@ class MainWidget(QtWidgets.QWidget):
         self._check_box_enable_match_and_break_transition.setText("Transition match/pause automatique")
         self._check_box_enable_break_music.setText("Musique d'ambiance en dehors des matchs")
         self._check_box_enable_break_music.setEnabled(False)
-        self._break_timer_widget.setVisible(False)
+        self._check_box_enable_multi_court.setText("Mode multi-terrains")
+        self._sequence_widget.setVisible(False)
+        self._multi_court_widget.setVisible(False)
         self._start_cycling_button.setText("Démarrer cycle match/pause")
         self._start_cycling_button.setVisible(False)
         self._stop_cycling_button.setText("Arrêter cycle")
         self._stop_cycling_button.setVisible(False)
         self._stop_cycling_button.setEnabled(False)
+        self._journal_compaction_timer.setInterval(1000 * JOURNAL_COMPACTION_INTERVAL_S)
+        self._session_state_timer.setSingleShot(True)
+        self._session_state_timer.setInterval(SESSION_STATE_SAVE_DELAY_MS)
 
     def create_layout(self):
         self._grid_main_layout = QGridLayout(self)
@@ -102,24 +130,29 @@ class MainWidget(QtWidgets.QWidget):
         self._grid_main_layout.addWidget(self._playlist_widget, 0, 0, -1, 2)
         self._grid_main_layout.addWidget(self._check_box_enable_match_and_break_transition, 3, 3, 1, 2)
         self._grid_main_layout.addWidget(self._check_box_enable_break_music, 3, 4, 1, 2)
+        self._grid_main_layout.addWidget(self._check_box_enable_multi_court, 3, 2, 1, 1)
         self._grid_main_layout.addWidget(self._empty_widget, 1, 2, 1, 1)
         self._grid_main_layout.addWidget(self._start_cycling_button, 1, 3, 1, 1)
         self._grid_main_layout.addWidget(self._stop_cycling_button, 1, 4, 1, 1)
         self._grid_main_layout.addWidget(self._match_timer_widget, 2, 2, 1, 2)
-        self._grid_main_layout.addWidget(self._break_timer_widget, 2, 4, 1, 2)
+        self._grid_main_layout.addWidget(self._sequence_widget, 2, 2, 1, 4)
+        self._grid_main_layout.addWidget(self._multi_court_widget, 2, 2, 1, 4)
 
     def setup_connections(self):
         # Connect Cycling Buttons Signals
-        self._start_cycling_button.clicked.connect(self._match_timer_widget.start_timer)
         self._start_cycling_button.clicked.connect(self.start_cycling_button_clicked)
+        self._start_cycling_button.clicked.connect(self._sequence_widget.start_sequence)
         self._stop_cycling_button.clicked.connect(self.stop_cycling_button_clicked)
-        self._stop_cycling_button.clicked.connect(self._match_timer_widget.stop_timer)
-        self._stop_cycling_button.clicked.connect(self._break_timer_widget.stop_timer)
+        self._stop_cycling_button.clicked.connect(self._sequence_widget.stop_sequence)
         self._stop_cycling_button.clicked.connect(self._music_player.handle_stop_cycling)
 
         # Connect CheckBoxes Signals
         self._check_box_enable_match_and_break_transition.stateChanged.connect(self.toggle_mode)
         self._check_box_enable_break_music.stateChanged.connect(self._music_player.toggle_mode)
+        self._check_box_enable_multi_court.stateChanged.connect(self.toggle_multi_court_mode)
+
+        # Connect Multi Court Signals
+        self._multi_court_widget.court_cue.connect(self._music_player.handle_court_cue)
 
         # Connect Match Timer Signals
         self._match_timer_widget.timer_starts.connect(self._music_player.handle_timer_starts)
@@ -128,14 +161,33 @@ class MainWidget(QtWidgets.QWidget):
         self._match_timer_widget.timer_ends.connect(self.handle_timer_ends)
         self._match_timer_widget.timer_stops.connect(self.handle_timer_stops)
 
-        # Connect Break Timer Signals
-        self._break_timer_widget.timer_starts.connect(self._music_player.handle_timer_starts)
-        self._break_timer_widget.timer_specific_threshold.connect(self._music_player.handle_break_timer_threshold)
-        self._break_timer_widget.timer_ends.connect(self.handle_timer_ends)
-        self._break_timer_widget.timer_stops.connect(self.handle_timer_stops)
+        # Connect Sequence Signals
+        self._sequence_widget.set_cue_lead_time_provider(self._music_player.get_cue_lead_time)
+        self._match_timer_widget.set_cue_lead_time_provider(
+            lambda x: self._music_player.get_cue_lead_time(self._music_player.cue_for_match_threshold(x)))
+        self._sequence_widget.phase_started.connect(self._music_player.handle_sequence_phase_started)
+        self._sequence_widget.cue_triggered.connect(self._music_player.play_cue)
+        self._sequence_widget.sequence_ended.connect(self.stop_cycling_button_clicked)
+        self._sequence_widget.sequence_ended.connect(self._music_player.handle_stop_cycling)
 
         self._playlist_widget.signal_file_to_play.connect(self._music_player.handle_music_to_play_received)
         self._playlist_widget.signal_playlist_switched.connect(self._music_player.handle_playlist_switched)
+        self._playlist_widget.songs_added.connect(self._library_analyzer.enqueue_songs)
+
+        # Connect Library Analyzer Signals
+        self._library_analyzer.track_analyzed.connect(self._music_and_playlists_manager.store_analysis_results)
+        self._library_analyzer.analysis_finished.connect(self._music_and_playlists_manager.flush_analysis_results)
+
+        self._journal_compaction_timer.timeout.connect(self._music_and_playlists_manager.compact_edit_journal)
+
+        # Connect Session State Signals
+        self._session_state_timer.timeout.connect(self.save_session_state)
+        self._music_player.session_state_changed.connect(self.schedule_session_state_save)
+        self._match_timer_widget.session_state_changed.connect(self.schedule_session_state_save)
+        self._sequence_widget.session_state_changed.connect(self.schedule_session_state_save)
+        self._playlist_widget.signal_playlist_switched.connect(self.schedule_session_state_save)
+        self._check_box_enable_match_and_break_transition.stateChanged.connect(self.schedule_session_state_save)
+        self._check_box_enable_break_music.stateChanged.connect(self.schedule_session_state_save)
 
         self._music_player.request_ambient_music_track.connect(self.handle_ambient_music_requested)
         self._music_player.music_started_or_resumed.connect(self._playlist_widget.handle_music_started_or_resumed)
@@ -144,45 +196,107 @@ class MainWidget(QtWidgets.QWidget):
         self._music_player.play_button_clicked.connect(self._playlist_widget.handle_first_click_on_play)
 
         # Connect own signals
-        self.toggle_mode_signal.connect(self._match_timer_widget.switch_mode)
-
         self.match_timer_ends.connect(self._music_player.handle_match_timer_ends)
         self.match_timer_stops.connect(self._music_player.handle_match_timer_stops)
 
-        self.break_timer_ends.connect(self._music_player.handle_break_timer_ends)
-        self.break_timer_stops.connect(self._music_player.handle_break_timer_stops)
-
         self.signal_ambient_music.connect(self._music_player.handle_receive_ambient_music)
 
+    def start_library_analysis(self):
+        self._library_analyzer.enqueue_songs(self._music_and_playlists_manager.get_songs_to_analyze())
+
+    def stop_background_tasks(self):
+        self._session_state_timer.stop()
+        self.save_session_state()
+        self._playlist_widget.stop_background_tasks()
+        self._music_player.stop_background_tasks()
+        self._library_analyzer.stop()
+        self._journal_compaction_timer.stop()
+
+    def schedule_session_state_save(self):
+        # The changes coming in until the timer fires are saved together
+        if not self._session_state_timer.isActive():
+            self._session_state_timer.start()
+
+    def session_state(self):
+        playlist_uid = self._playlist_widget.get_current_playlist_uid()
+        ambient_music = self._music_and_playlists_manager.get_selected_ambient_music()
+        return {"saved_at": time.time(),
+                "playlist_uid": None if playlist_uid is None else str(playlist_uid),
+                "player": self._music_player.session_state(),
+                "match_timer": self._match_timer_widget.session_state(),
+                "is_cycling": self._check_box_enable_match_and_break_transition.isChecked(),
+                "is_break_music": self._check_box_enable_break_music.isChecked(),
+                "sequence": self._sequence_widget.session_state(),
+                "ambient_music_uid": None if ambient_music is None else str(ambient_music.uid)}
+
+    def save_session_state(self):
+        self._music_and_playlists_manager.save_session_state(self.session_state())
+
+    def restore_session_state(self):
+        # A recent session, left by a crash or a restart during the tournament, carries on: the music plays again and
+        # the running timers catch up with the time spent since the last save
+        session_state = self._music_and_playlists_manager.get_session_state()
+        if len(session_state) == 0:
+            return
+        catch_up_s = max(0, int(time.time() - session_state.get("saved_at", 0)))
+        is_resuming = catch_up_s <= SESSION_RESUME_MAX_AGE_S
+        match_timer_state = session_state.get("match_timer", {})
+        sequence_state = session_state.get("sequence", {})
+        if not is_resuming:
+            match_timer_state = dict(match_timer_state, is_running=False)
+            sequence_state = dict(sequence_state, is_started=False)
+        if session_state.get("ambient_music_uid") is not None:
+            ambient_music = self._music_and_playlists_manager.get_ambient_music_from_store(
+                uuid.UUID(session_state["ambient_music_uid"]))
+            if ambient_music is not None:
+                self._music_and_playlists_manager.set_selected_ambient_music(ambient_music)
+        if session_state.get("playlist_uid") is not None:
+            self._playlist_widget.select_playlist(session_state["playlist_uid"])
+        self._music_player.restore_session_state(session_state.get("player", {}), is_resuming)
+        self._check_box_enable_match_and_break_transition.setChecked(session_state.get("is_cycling") is True)
+        self._check_box_enable_break_music.setChecked(session_state.get("is_break_music") is True)
+        if self._match_timer_widget.restore_session_state(match_timer_state, catch_up_s):
+            self.handle_timer_starts(1)
+        if self._sequence_widget.restore_session_state(sequence_state, catch_up_s):
+            self.start_cycling_button_clicked()
+
     def toggle_mode(self, state):
-        if state == 2:
-            self._break_timer_widget.setVisible(True)
-            self._start_cycling_button.setVisible(True)
-            self._stop_cycling_button.setVisible(True)
-            self._match_timer_widget.timer_ends.connect(self._break_timer_widget.start_timer)
-            self._break_timer_widget.timer_ends.connect(self._match_timer_widget.start_timer)
-            self._check_box_enable_break_music.setEnabled(True)
-            self.mode = 2
-        else:
-            self._break_timer_widget.setVisible(False)
-            self._start_cycling_button.setVisible(False)
-            self._stop_cycling_button.setVisible(False)
-            self._match_timer_widget.timer_ends.disconnect(self._break_timer_widget.start_timer)
-            self._break_timer_widget.timer_ends.disconnect(self._match_timer_widget.start_timer)
-            self._check_box_enable_break_music.setEnabled(False)
-            self.mode = 1
+        # Match/break cycling is driven by the sequence engine instead of chaining the timers' signals
+        is_cycling = state == 2
+        if not is_cycling:
+            self._sequence_widget.stop_sequence()
+        self._sequence_widget.setVisible(is_cycling)
+        self._match_timer_widget.setVisible(not is_cycling)
+        self._start_cycling_button.setVisible(is_cycling)
+        self._stop_cycling_button.setVisible(is_cycling)
+        self._check_box_enable_break_music.setEnabled(is_cycling)
+        self.mode = (1, 2)[is_cycling]
+
+    def toggle_multi_court_mode(self, state):
+        is_multi_court = state == 2
+        is_cycling = self.mode == TimerChainingMode.CYCLING
+        if not is_multi_court:
+            self._multi_court_widget.stop_all_courts()
+        self._start_cycling_button.setVisible(is_cycling and not is_multi_court)
+        self._stop_cycling_button.setVisible(is_cycling and not is_multi_court)
+        self._sequence_widget.setVisible(is_cycling and not is_multi_court)
+        self._multi_court_widget.setVisible(is_multi_court)
+        self._match_timer_widget.setVisible(not is_cycling and not is_multi_court)
+        self._check_box_enable_match_and_break_transition.setEnabled(not is_multi_court)
 
     def start_cycling_button_clicked(self):
         self._start_cycling_button.setEnabled(False)
         self._stop_cycling_button.setEnabled(True)
         self._check_box_enable_match_and_break_transition.setEnabled(False)
         self._check_box_enable_break_music.setEnabled(False)
+        self._check_box_enable_multi_court.setEnabled(False)
 
     def stop_cycling_button_clicked(self):
         self._start_cycling_button.setEnabled(True)
         self._stop_cycling_button.setEnabled(False)
         self._check_box_enable_match_and_break_transition.setEnabled(True)
         self._check_box_enable_break_music.setEnabled(True)
+        self._check_box_enable_multi_court.setEnabled(True)
 
     def handle_ambient_music_requested(self):
         ambient_music = self._music_and_playlists_manager.get_selected_ambient_music()
@@ -193,15 +307,13 @@ class MainWidget(QtWidgets.QWidget):
         if p_id == 1:
             self._check_box_enable_match_and_break_transition.setEnabled(False)
             self._check_box_enable_break_music.setEnabled(False)
+            self._check_box_enable_multi_court.setEnabled(False)
 
     def handle_timer_ends(self, p_id: int):
         if p_id == 1:
             self.match_timer_ends.emit()
-        else:
-            self.break_timer_ends.emit(self.mode.value)
 
     def handle_timer_stops(self, p_id: int, p_slave_mode: int):
         if p_id == 1:
+            self._check_box_enable_multi_court.setEnabled(True)
             self.match_timer_stops.emit(p_slave_mode)
-        else:
-            self.break_timer_stops.emit(p_slave_mode)
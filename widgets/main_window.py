@@ -1,10 +1,10 @@
-import os
-
-from PySide6 import QtWidgets, QtGui, QtCore
+from PySide6 import QtWidgets, QtCore
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QBoxLayout
 
 from api.music.music_and_playlists_manager import MusicAndPlaylistsManager
+from api.util.resources_bundle import ResourcesBundle
+from config.config import APPICON_DIR_NAME, APP_ICON_FILE_NAME
 from widgets.main_widget import MainWidget
 
 
@@ -17,9 +17,7 @@ class MainWindow(QtWidgets.QMainWindow):
         super().__init__()
         self._base_dir = p_base_dir
         self.setWindowTitle("Music Player - Volleyball NG")
-        self.setWindowIcon(
-            QtGui.QIcon(os.path.join(self._base_dir, 'resources', 'appIcon', 'beach_volley_icon.ico')))
-        QtGui.QImage(os.path.join(self._base_dir, 'resources', 'background', 'beach_volley_match_affiche.png'))
+        self.setWindowIcon(ResourcesBundle().icon(APPICON_DIR_NAME, APP_ICON_FILE_NAME))
         self.setObjectName("MainWindow")
         self.setup_ui()
 
@@ -46,6 +44,8 @@ class MainWindow(QtWidgets.QMainWindow):
         pass
 
     def closeEvent(self, e) -> None:
+        self.main_widget.stop_background_tasks()
         music_and_playlists_manager = MusicAndPlaylistsManager()
+        # Only returns once the DB writer has written everything, the last saves included
         music_and_playlists_manager.stop()
         e.accept()
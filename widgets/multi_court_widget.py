@@ -0,0 +1,164 @@
+from typing import Dict
+
+from PySide6 import QtCore
+from PySide6.QtCore import QTimer, QElapsedTimer
+from PySide6.QtWidgets import QWidget, QGridLayout, QLabel, QSpinBox, QPushButton
+
+from api.timer.court_scheduler import CourtScheduler, CourtTimeline, CourtEventType, deduplicate_cues, \
+    build_match_and_break_phases
+from widgets.court_timer_widget import CourtTimerWidget
+
+DEFAULT_NUMBER_OF_COURTS = 4
+MAX_NUMBER_OF_COURTS = 64
+DEFAULT_MATCH_DURATION = 300
+DEFAULT_BREAK_DURATION = 300
+DEFAULT_STAGGER_OFFSET = 30
+TICK_INTERVAL_MS = 100
+COURTS_PER_ROW = 4
+
+
+class MultiCourtWidget(QWidget):
+    court_cue = QtCore.Signal(int, int, int)
+
+    _scheduler: CourtScheduler
+    _clock: QElapsedTimer
+    _tick_timer: QTimer
+    _court_views: Dict[int, CourtTimerWidget]
+    _number_of_courts_label: QLabel
+    _number_of_courts_spin_box: QSpinBox
+    _stagger_label: QLabel
+    _stagger_spin_box: QSpinBox
+    _start_all_button: QPushButton
+    _stop_all_button: QPushButton
+    _courts_widget: QWidget
+    _courts_layout: QGridLayout
+    _grid_layout: QGridLayout
+
+    def __init__(self, p_parent):
+        super().__init__(p_parent)
+        self._scheduler = CourtScheduler()
+        self._court_views = {}
+        self.setup_ui()
+        self.build_courts(DEFAULT_NUMBER_OF_COURTS)
+
+    def setup_ui(self):
+        self.create_widgets()
+        self.modify_widgets()
+        self.create_layout()
+        self.add_widgets_layout()
+        self.setup_connections()
+
+    def create_widgets(self):
+        # A single clock and a single tick source drive every court
+        self._clock = QElapsedTimer()
+        self._clock.start()
+        self._tick_timer = QTimer(self)
+        self._tick_timer.setInterval(TICK_INTERVAL_MS)
+        self._tick_timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+
+        self._number_of_courts_label = QLabel(self)
+        self._number_of_courts_spin_box = QSpinBox(self)
+        self._stagger_label = QLabel(self)
+        self._stagger_spin_box = QSpinBox(self)
+        self._start_all_button = QPushButton(self)
+        self._stop_all_button = QPushButton(self)
+        self._courts_widget = QWidget(self)
+
+    def modify_widgets(self):
+        self._number_of_courts_label.setText("Nombre de terrains :")
+        self._number_of_courts_spin_box.setRange(1, MAX_NUMBER_OF_COURTS)
+        self._number_of_courts_spin_box.setValue(DEFAULT_NUMBER_OF_COURTS)
+        self._stagger_label.setText("Décalage entre terrains (s) :")
+        self._stagger_spin_box.setRange(0, DEFAULT_MATCH_DURATION)
+        self._stagger_spin_box.setValue(DEFAULT_STAGGER_OFFSET)
+        self._start_all_button.setText("Démarrer tous les terrains")
+        self._stop_all_button.setText("Arrêter tous les terrains")
+
+    def create_layout(self):
+        self._grid_layout = QGridLayout(self)
+        self._courts_layout = QGridLayout(self._courts_widget)
+
+    def add_widgets_layout(self):
+        self._grid_layout.addWidget(self._number_of_courts_label, 0, 0)
+        self._grid_layout.addWidget(self._number_of_courts_spin_box, 0, 1)
+        self._grid_layout.addWidget(self._stagger_label, 0, 2)
+        self._grid_layout.addWidget(self._stagger_spin_box, 0, 3)
+        self._grid_layout.addWidget(self._start_all_button, 1, 0, 1, 2)
+        self._grid_layout.addWidget(self._stop_all_button, 1, 2, 1, 2)
+        self._grid_layout.addWidget(self._courts_widget, 2, 0, 1, -1)
+
+    def setup_connections(self):
+        self._tick_timer.timeout.connect(self.tick)
+        self._number_of_courts_spin_box.valueChanged.connect(self.build_courts)
+        self._start_all_button.clicked.connect(self.start_all_courts)
+        self._stop_all_button.clicked.connect(self.stop_all_courts)
+
+    def now(self):
+        return self._clock.elapsed() / 1000
+
+    def build_courts(self, p_number_of_courts: int):
+        for court_id, court_view in list(self._court_views.items()):
+            self._scheduler.remove_court(court_id)
+            self._courts_layout.removeWidget(court_view)
+            court_view.deleteLater()
+        self._court_views = {}
+        for court_id in range(p_number_of_courts):
+            name = f"Terrain {court_id + 1}"
+            phases = build_match_and_break_phases(DEFAULT_MATCH_DURATION, DEFAULT_BREAK_DURATION)
+            self._scheduler.add_court(CourtTimeline(court_id, name, phases))
+            court_view = CourtTimerWidget(self._courts_widget, court_id, name)
+            court_view.update_time_left(DEFAULT_MATCH_DURATION)
+            court_view.start_pause_clicked.connect(self.handle_court_start_pause)
+            court_view.stop_clicked.connect(self.handle_court_stop)
+            self._courts_layout.addWidget(court_view, court_id // COURTS_PER_ROW, court_id % COURTS_PER_ROW)
+            self._court_views[court_id] = court_view
+
+    def start_all_courts(self):
+        now = self.now()
+        stagger = self._stagger_spin_box.value()
+        for court_id in self._court_views:
+            self._scheduler.start_court(court_id, now + court_id * stagger)
+            self._court_views[court_id].update_state(True, False)
+        self._number_of_courts_spin_box.setEnabled(False)
+        self._tick_timer.start()
+
+    def stop_all_courts(self):
+        for court_id in self._court_views:
+            self.handle_court_stop(court_id)
+        self._number_of_courts_spin_box.setEnabled(True)
+        self._tick_timer.stop()
+
+    def handle_court_start_pause(self, p_court_id: int):
+        # The events due until now are handled before the court changes state, as if the tick had just run
+        self.handle_court_events(self._scheduler.advance(self.now()))
+        timeline = self._scheduler.get_court(p_court_id)
+        if not timeline.is_started:
+            self._scheduler.start_court(p_court_id)
+        elif timeline.is_paused:
+            self._scheduler.resume_court(p_court_id)
+        else:
+            self._scheduler.pause_court(p_court_id)
+        self._court_views[p_court_id].update_state(timeline.is_started, timeline.is_paused)
+        if not self._tick_timer.isActive():
+            self._tick_timer.start()
+
+    def handle_court_stop(self, p_court_id: int):
+        self._scheduler.stop_court(p_court_id)
+        timeline = self._scheduler.get_court(p_court_id)
+        court_view = self._court_views[p_court_id]
+        court_view.update_state(False, False)
+        court_view.update_time_left(timeline.time_left(self.now()))
+
+    def tick(self):
+        now = self.now()
+        self.handle_court_events(self._scheduler.advance(now))
+        for court_id, court_view in self._court_views.items():
+            court_view.update_time_left(self._scheduler.get_court(court_id).time_left(now))
+
+    def handle_court_events(self, p_events: list):
+        for event in p_events:
+            if event.event_type == CourtEventType.TRANSITION:
+                self._court_views[event.court_id].update_phase(event.phase_identifier)
+        # Several courts reaching the same cue during one tick only trigger one sound
+        for event_type, phase_identifier, threshold in deduplicate_cues(p_events):
+            self.court_cue.emit(event_type.value, phase_identifier, threshold)
@@ -1,28 +1,40 @@
-import os.path
 import sys
 import time
 from enum import Enum
+from functools import partial
 from math import sqrt, exp, log
 from pathlib import Path
 
 from PySide6 import QtWidgets, QtCore
 from PySide6.QtCore import QStandardPaths, Qt, Slot, QUrl, QTimer
 from PySide6.QtGui import QIcon, QAction
-from PySide6.QtMultimedia import (QAudioOutput, QMediaFormat,
-                                  QMediaPlayer)
+from PySide6.QtMultimedia import (QAudioOutput,
+                                  QMediaPlayer, QMediaDevices)
 from PySide6.QtWidgets import (QDialog, QFileDialog,
                                QSlider, QToolBar, QGridLayout, QStatusBar, QLabel)
 
+from api.audio.cue_scheduler import CueLatencyTable
+from api.audio.ducking_engine import DuckingEngine
+from api.music.music_and_playlists_manager import MusicAndPlaylistsManager
 from api.music.music_object import MusicObject
-from config.config import PRELOADED_SOUNDS_DIR_NAME, RESOURCES_DIR_NAME, BUZZER_MATCH_END_FILE_NAME, \
-    BUZZER_MATCH_START_FILE_NAME, FIVE_SECONDS_COUNTDOWN_FILE_NAME, ONE_MINUTE_LEFT_FOR_MATCH_FILE_NAME, \
-    ONE_MINUTE_LEFT_FOR_BREAK_FILE_NAME
+from api.timer.court_scheduler import CourtEventType, MATCH_PHASE_IDENTIFIER
+from api.timer.sequence import MusicSource
+from api.util.instrumentation import instrumented, Instrumentation
+from api.util.resources_bundle import ResourcesBundle
+from api.util.stall_detector import StallDetector, STALL_THRESHOLD_S
+from widgets.waveform_slider import WaveformSlider
+from config.config import PRELOADED_SOUNDS_DIR_NAME, CUE_SOUND_FILE_NAMES, CUE_BUZZER_MATCH_START, \
+    CUE_BUZZER_MATCH_END, CUE_FIVE_SECONDS_COUNTDOWN, CUE_ONE_MINUTE_LEFT_FOR_MATCH, CUE_ONE_MINUTE_LEFT_FOR_BREAK, \
+    MUSIC_CONTROLS_DIR_NAME, CURRENT_MUSIC_CONTROLS_VERSION, USER_DATA_FOLDER, STALLS_REPORT_FILE_NAME
 
 SONG_TITLE_LABEL_TEXT = "Titre : "
 ARTIST_NAME_LABEL_TEXT = "Artiste : "
 UNDEFINED_SONG_DURATION = "--:--:--"
 START_SONG_DURATION = "00:00:00"
 SEPARATOR = "\\"
+DUCKING_TICK_INTERVAL_MS = 15
+CUE_READY_MEDIA_STATUSES = [QMediaPlayer.MediaStatus.LoadedMedia, QMediaPlayer.MediaStatus.BufferedMedia,
+                            QMediaPlayer.MediaStatus.EndOfMedia]
 
 
 def format_position(position_milliseconds: int):
@@ -64,17 +76,6 @@ def interpret_label_as_position(p_label: str):
     return 1000 * (3600 * int(h) + 60 * int(m) + int(s))
 
 
-def get_supported_mime_types():
-    result = []
-    for f in QMediaFormat().supportedAudioCodecs(QMediaFormat.ConversionMode.Decode):
-        try:
-            mime_type = QMediaFormat(QMediaFormat.FileFormat(f)).mimeType()
-            result.append(mime_type.name())
-        except:
-            continue
-    return result
-
-
 class MusicPlayerShuffleMode(Enum):
     SHUFFLE_OFF = 1
     SHUFFLE_ON = 2
@@ -98,19 +99,29 @@ class MusicPlayer(QtWidgets.QWidget):
     request_ambient_music_track = QtCore.Signal()
     music_started_or_resumed = QtCore.Signal()
     music_stopped = QtCore.Signal()
+    session_state_changed = QtCore.Signal()
 
     _current_playlist_index: int
     _old_position: int
     _threshold_to_switch: int
+    _start_position: int
+    _resume_position: int
     _layout: QGridLayout
     _audio_output_normal_music: QAudioOutput
     _audio_output_ambient_music: QAudioOutput
-    _audio_output_events: QAudioOutput
     _normal_music_qmedia_player: QMediaPlayer
     _ambient_music_qmedia_player: QMediaPlayer
-    _events_qmedia_player: QMediaPlayer
+    _cue_audio_outputs: dict
+    _cue_qmedia_players: dict
+    _cue_play_requested_at: dict
+    _cue_duck_timers: dict
+    _cue_latencies: CueLatencyTable
+    _media_devices: QMediaDevices
+    _music_and_playlists_manager: MusicAndPlaylistsManager
     _toolbar: QToolBar
     _statusbar: QStatusBar
+    _stalls_label: QLabel
+    _stall_detector: StallDetector
     _play_action: QAction
     _pause_action: QAction
     _next_action: QAction
@@ -119,7 +130,7 @@ class MusicPlayer(QtWidgets.QWidget):
     _switch_shuffle_mode_action: QAction
     _switch_repeat_mode_action: QAction
     _volume_slider: QSlider
-    _position_slider: QSlider
+    _position_slider: WaveformSlider
     _label_song_title: QLabel
     _label_song_title_value: QLabel
     _label_artist_name: QLabel
@@ -127,11 +138,7 @@ class MusicPlayer(QtWidgets.QWidget):
     _label_current_song_position: QLabel
     _label_current_song_duration: QLabel
     _label_separator: QLabel
-    _path_to_start_buzzer_sound: Path
-    _path_to_end_buzzer_sound: Path
-    _path_to_five_seconds_countdown_sound: Path
-    _path_to_one_minute_left_match: Path
-    _path_to_one_minute_left_break: Path
+    _cue_urls: dict
     _play_icon: QIcon
     _pause_icon: QIcon
     _stop_icon: QIcon
@@ -145,28 +152,33 @@ class MusicPlayer(QtWidgets.QWidget):
     _shuffle_mode: MusicPlayerShuffleMode
     _repeat_mode: MusicPlayerRepeatMode
     _ambient_music_mode: AmbientMusicMode
-    _initial_position: int
+    _ducking_engine: DuckingEngine
+    _ducking_timer: QTimer
+    _slider_volume: float
+    _track_gain: float
 
     def __init__(self, p_parent):
         super().__init__(p_parent)
         self._old_position = 0
         self._current_playlist_index = -1
         self._threshold_to_switch = -1
+        self._start_position = 0
+        self._resume_position = 0
         self.base_dir = p_parent._base_dir
+        self._music_and_playlists_manager = MusicAndPlaylistsManager()
 
-        self._mime_types = get_supported_mime_types()
-
-        self._path_to_start_buzzer_sound = self.base_dir / RESOURCES_DIR_NAME / PRELOADED_SOUNDS_DIR_NAME / BUZZER_MATCH_START_FILE_NAME
-        self._path_to_end_buzzer_sound = self.base_dir / RESOURCES_DIR_NAME / PRELOADED_SOUNDS_DIR_NAME / BUZZER_MATCH_END_FILE_NAME
-        self._path_to_five_seconds_countdown_sound = self.base_dir / RESOURCES_DIR_NAME / PRELOADED_SOUNDS_DIR_NAME / FIVE_SECONDS_COUNTDOWN_FILE_NAME
-        self._path_to_one_minute_left_match = self.base_dir / RESOURCES_DIR_NAME / PRELOADED_SOUNDS_DIR_NAME / ONE_MINUTE_LEFT_FOR_MATCH_FILE_NAME
-        self._path_to_one_minute_left_break = self.base_dir / RESOURCES_DIR_NAME / PRELOADED_SOUNDS_DIR_NAME / ONE_MINUTE_LEFT_FOR_BREAK_FILE_NAME
+        # The cue sounds are read from the resources bundle when it is available
+        self._cue_urls = {k: ResourcesBundle().url(PRELOADED_SOUNDS_DIR_NAME, v) for k, v in
+                          CUE_SOUND_FILE_NAMES.items()}
 
         self._shuffle_mode = MusicPlayerShuffleMode.SHUFFLE_OFF
         self._repeat_mode = MusicPlayerRepeatMode.REPEAT_ALL
         self._ambient_music_mode = AmbientMusicMode.NO_AMBIENT_MUSIC
 
         self.setup_ui()
+        # The cue players decode their sounds when created, that waits until the window is shown
+        QTimer.singleShot(0, self.init_cue_players)
+        QTimer.singleShot(0, self._stall_detector.start)
 
     @property
     def shuffle_mode(self):
@@ -176,7 +188,7 @@ class MusicPlayer(QtWidgets.QWidget):
     def shuffle_mode(self, p_shuffle_mode):
         if isinstance(p_shuffle_mode, MusicPlayerShuffleMode):
             self._shuffle_mode = p_shuffle_mode
-        elif isinstance(p_shuffle_mode, int) and (p_shuffle_mode == 1 or p_shuffle_mode == 2 or p_shuffle_mode == 3):
+        elif isinstance(p_shuffle_mode, int) and p_shuffle_mode in [x.value for x in MusicPlayerShuffleMode]:
             self._shuffle_mode = MusicPlayerShuffleMode(p_shuffle_mode)
 
     @property
@@ -187,7 +199,7 @@ class MusicPlayer(QtWidgets.QWidget):
     def repeat_mode(self, p_repeat_mode):
         if isinstance(p_repeat_mode, MusicPlayerRepeatMode):
             self._repeat_mode = p_repeat_mode
-        elif isinstance(p_repeat_mode, int) and (p_repeat_mode == 1 or p_repeat_mode == 2):
+        elif isinstance(p_repeat_mode, int) and p_repeat_mode in [x.value for x in MusicPlayerRepeatMode]:
             self._repeat_mode = MusicPlayerRepeatMode(p_repeat_mode)
 
     @property
@@ -216,13 +228,26 @@ class MusicPlayer(QtWidgets.QWidget):
 
         self._audio_output_ambient_music = QAudioOutput()
         self._audio_output_ambient_music.setVolume(0.5)
-        self._events_qmedia_player = QMediaPlayer(self)
-        self._events_qmedia_player.setAudioOutput(self._audio_output_ambient_music)
-
-        self._audio_output_events = QAudioOutput()
-        self._audio_output_events.setVolume(0.5)
         self._ambient_music_qmedia_player = QMediaPlayer(self)
-        self._ambient_music_qmedia_player.setAudioOutput(self._audio_output_events)
+        self._ambient_music_qmedia_player.setAudioOutput(self._audio_output_ambient_music)
+
+        self._cue_audio_outputs = {}
+        self._cue_qmedia_players = {}
+        self._cue_play_requested_at = {}
+        self._cue_duck_timers = {}
+
+        # Ducking works on the outputs gains, the volume slider only sets the base volume of the music
+        self._ducking_engine = DuckingEngine()
+        self._slider_volume = self._audio_output_normal_music.volume()
+        self._track_gain = 1.0
+        self._ducking_engine.add_output(self._audio_output_normal_music, self._audio_output_normal_music.volume())
+        self._ducking_engine.add_output(self._audio_output_ambient_music, self._audio_output_ambient_music.volume())
+        self._ducking_timer = QTimer(self)
+        self._ducking_timer.setInterval(DUCKING_TICK_INTERVAL_MS)
+        self._ducking_timer.setTimerType(Qt.TimerType.PreciseTimer)
+
+        self._media_devices = QMediaDevices(self)
+        self._cue_latencies = self._music_and_playlists_manager.get_cue_latency_table(self.get_audio_device_id())
 
         self._label_song_title = QLabel(self)
         self._label_song_title.setText(SONG_TITLE_LABEL_TEXT)
@@ -243,32 +268,28 @@ class MusicPlayer(QtWidgets.QWidget):
         self._label_current_song_duration = QLabel(self)
         self._label_current_song_duration.setText(UNDEFINED_SONG_DURATION)
 
-        self._position_slider = QSlider(self)
+        self._position_slider = WaveformSlider(self)
         self._position_slider.setRange(0, 0)
-        self._position_slider.setOrientation(Qt.Horizontal)
         self._position_slider.setToolTip("Position")
 
         self._toolbar = QToolBar(self)
 
         self._statusbar = QStatusBar(self)
-
-        self._play_icon = QIcon(os.path.join(self.base_dir, 'resources', 'musicControls', 'V3', 'play_icon_small.png'))
-        self._pause_icon = QIcon(
-            os.path.join(self.base_dir, 'resources', 'musicControls', 'V3', 'pause_icon_small.png'))
-        self._stop_icon = QIcon(os.path.join(self.base_dir, 'resources', 'musicControls', 'V3', 'stop_icon_small.png'))
-        self._next_icon = QIcon(os.path.join(self.base_dir, 'resources', 'musicControls', 'V3', 'next_icon_small.png'))
-        self._previous_icon = QIcon(
-            os.path.join(self.base_dir, 'resources', 'musicControls', 'V3', 'previous_icon_small.png'))
-        self._shuffle_on_icon = QIcon(
-            os.path.join(self.base_dir, 'resources', 'musicControls', 'V3', 'shuffle_on_icon_small.png'))
-        self._shuffle_off_icon = QIcon(
-            os.path.join(self.base_dir, 'resources', 'musicControls', 'V3', 'shuffle_off_icon_small.png'))
-        self._no_repeat_icon = QIcon(
-            os.path.join(self.base_dir, 'resources', 'musicControls', 'V3', 'no_repeat_icon_small.png'))
-        self._repeat_all_icon = QIcon(
-            os.path.join(self.base_dir, 'resources', 'musicControls', 'V3', 'repeat_all_icon_small.png'))
-        self._repeat_one_icon = QIcon(
-            os.path.join(self.base_dir, 'resources', 'musicControls', 'V3', 'repeat_one_icon_small.png'))
+        self._stalls_label = QLabel(self)
+        self._stall_detector = StallDetector(self)
+
+        resources_bundle = ResourcesBundle()
+        music_controls_dir = (MUSIC_CONTROLS_DIR_NAME, CURRENT_MUSIC_CONTROLS_VERSION)
+        self._play_icon = resources_bundle.icon(*music_controls_dir, 'play_icon_small.png')
+        self._pause_icon = resources_bundle.icon(*music_controls_dir, 'pause_icon_small.png')
+        self._stop_icon = resources_bundle.icon(*music_controls_dir, 'stop_icon_small.png')
+        self._next_icon = resources_bundle.icon(*music_controls_dir, 'next_icon_small.png')
+        self._previous_icon = resources_bundle.icon(*music_controls_dir, 'previous_icon_small.png')
+        self._shuffle_on_icon = resources_bundle.icon(*music_controls_dir, 'shuffle_on_icon_small.png')
+        self._shuffle_off_icon = resources_bundle.icon(*music_controls_dir, 'shuffle_off_icon_small.png')
+        self._no_repeat_icon = resources_bundle.icon(*music_controls_dir, 'no_repeat_icon_small.png')
+        self._repeat_all_icon = resources_bundle.icon(*music_controls_dir, 'repeat_all_icon_small.png')
+        self._repeat_one_icon = resources_bundle.icon(*music_controls_dir, 'repeat_one_icon_small.png')
 
         self._play_action = self._toolbar.addAction(self._play_icon, "Play")
         self._previous_action = self._toolbar.addAction(self._previous_icon, "Previous")
@@ -294,7 +315,10 @@ class MusicPlayer(QtWidgets.QWidget):
         self.update_buttons(self._normal_music_qmedia_player.playbackState())
 
     def modify_widgets(self):
-        pass
+        self._stalls_label.setText("Blocages : 0")
+        self._stalls_label.setToolTip(f"Nombre de fois où l'interface est restée figée plus de "
+                                      f"{1000 * STALL_THRESHOLD_S:.0f} ms")
+        self._statusbar.addPermanentWidget(self._stalls_label)
 
     def create_layout(self):
         self._layout = QGridLayout(self)
@@ -313,14 +337,19 @@ class MusicPlayer(QtWidgets.QWidget):
 
     def setup_connections(self):
         # Connect Normal Music Player Signals
+        self._stall_detector.stall_recorded.connect(self.handle_stall_recorded)
         self._normal_music_qmedia_player.errorOccurred.connect(self.player_error)
         self._normal_music_qmedia_player.positionChanged.connect(self.position_changed)
         self._normal_music_qmedia_player.positionChanged.connect(self._position_slider.setSliderPosition)
         self._normal_music_qmedia_player.durationChanged.connect(self.duration_changed)
         self._normal_music_qmedia_player.sourceChanged.connect(self.source_changed)
+        self._normal_music_qmedia_player.mediaStatusChanged.connect(self.media_status_changed)
         self._normal_music_qmedia_player.playbackStateChanged.connect(self.notify_playback_state_changed)
         self._normal_music_qmedia_player.playbackStateChanged.connect(self.update_buttons)
 
+        self._ducking_timer.timeout.connect(self.tick_ducking)
+        self._media_devices.audioOutputsChanged.connect(self.handle_audio_outputs_changed)
+
         # Connect Music Control Actions Signals
         self._play_action.triggered.connect(self.play_clicked)
         self._previous_action.triggered.connect(self.previous_clicked)
@@ -360,20 +389,29 @@ class MusicPlayer(QtWidgets.QWidget):
     def switch_shuffle_mode_clicked(self):
         if self.shuffle_mode == MusicPlayerShuffleMode.SHUFFLE_ON:
             self.shuffle_mode = MusicPlayerShuffleMode.SHUFFLE_OFF
-            self._switch_shuffle_mode_action.setIcon(self._shuffle_off_icon)
         else:
             self.shuffle_mode = MusicPlayerShuffleMode.SHUFFLE_ON
-            self._switch_shuffle_mode_action.setIcon(self._shuffle_on_icon)
+        self.update_mode_icons()
+        self.session_state_changed.emit()
 
     def switch_repeat_mode_clicked(self):
         if self.repeat_mode == MusicPlayerRepeatMode.REPEAT_ALL:
             self.repeat_mode = MusicPlayerRepeatMode.REPEAT_ONE
-            self._switch_repeat_mode_action.setIcon(self._repeat_one_icon)
         elif self.repeat_mode == MusicPlayerRepeatMode.REPEAT_ONE:
             self.repeat_mode = MusicPlayerRepeatMode.NO_REPEAT
-            self._switch_repeat_mode_action.setIcon(self._no_repeat_icon)
         else:
             self.repeat_mode = MusicPlayerRepeatMode.REPEAT_ALL
+        self.update_mode_icons()
+        self.session_state_changed.emit()
+
+    def update_mode_icons(self):
+        self._switch_shuffle_mode_action.setIcon(
+            (self._shuffle_off_icon, self._shuffle_on_icon)[self.shuffle_mode == MusicPlayerShuffleMode.SHUFFLE_ON])
+        if self.repeat_mode == MusicPlayerRepeatMode.REPEAT_ONE:
+            self._switch_repeat_mode_action.setIcon(self._repeat_one_icon)
+        elif self.repeat_mode == MusicPlayerRepeatMode.NO_REPEAT:
+            self._switch_repeat_mode_action.setIcon(self._no_repeat_icon)
+        else:
             self._switch_repeat_mode_action.setIcon(self._repeat_all_icon)
 
     def play_music(self):
@@ -397,26 +435,98 @@ class MusicPlayer(QtWidgets.QWidget):
         if self._ambient_music_qmedia_player.playbackState() != QMediaPlayer.PlaybackState.StoppedState:
             self._ambient_music_qmedia_player.stop()
 
-    def play_events_player(self):
-        if self._events_qmedia_player.playbackState() != QMediaPlayer.PlaybackState.PlayingState and self._events_qmedia_player.source() != QUrl(''):
-            self._events_qmedia_player.play()
-            if self._normal_music_qmedia_player.playbackState() != QMediaPlayer.PlaybackState.StoppedState:
-                self._initial_position = self._volume_slider.sliderPosition()
-                self._volume_slider.setEnabled(False)
-                self._volume_slider.setSliderPosition(5)
-                timer = QTimer(self)
-                timer.setSingleShot(True)
-                timer.timeout.connect(self.restore_music_volume)
-                timer.start(3000)
-
-    def restore_music_volume(self):
-        if self._normal_music_qmedia_player.playbackState() != QMediaPlayer.PlaybackState.StoppedState:
-            self._volume_slider.setSliderPosition(self._initial_position)
-        self._volume_slider.setEnabled(True)
+    def handle_stall_recorded(self, p_nb_of_stalls: int, p_duration_ms: float):
+        self._stalls_label.setText(f"Blocages : {p_nb_of_stalls}")
+        self._statusbar.showMessage(f"Interface figée pendant {p_duration_ms:.0f} ms", 5000)
+
+    def stop_background_tasks(self):
+        # The report holds the stack of the main thread at every stall, to find what froze the interface
+        self._stall_detector.stop()
+        self._stall_detector.dump_report(self.base_dir / USER_DATA_FOLDER / STALLS_REPORT_FILE_NAME)
+
+    def init_cue_players(self):
+        # One preloaded player per cue so that every cue is already decoded when it has to be triggered
+        if len(self._cue_qmedia_players) > 0:
+            return
+        for cue_name, cue_url in self._cue_urls.items():
+            cue_audio_output = QAudioOutput()
+            cue_audio_output.setVolume(0.5)
+            cue_qmedia_player = QMediaPlayer(self)
+            cue_qmedia_player.setAudioOutput(cue_audio_output)
+            cue_qmedia_player.setSource(cue_url)
+            cue_qmedia_player.positionChanged.connect(partial(self.handle_cue_position_changed, cue_name))
+            cue_qmedia_player.playbackStateChanged.connect(partial(self.handle_cue_playback_state_changed, cue_name))
+            # Started again when the cue is, a cue triggered twice within its latency only ducks once
+            cue_duck_timer = QTimer(self)
+            cue_duck_timer.setSingleShot(True)
+            cue_duck_timer.setTimerType(Qt.TimerType.PreciseTimer)
+            cue_duck_timer.timeout.connect(partial(self.duck_music_volume, cue_name))
+            self._cue_audio_outputs[cue_name] = cue_audio_output
+            self._cue_qmedia_players[cue_name] = cue_qmedia_player
+            self._cue_duck_timers[cue_name] = cue_duck_timer
+
+    def play_events_player(self, p_cue_name: str):
+        cue_qmedia_player = self._cue_qmedia_players[p_cue_name]
+        if cue_qmedia_player.playbackState() != QMediaPlayer.PlaybackState.StoppedState:
+            cue_qmedia_player.stop()
+        self._cue_play_requested_at[p_cue_name] = time.perf_counter()
+        cue_qmedia_player.play()
+        # The dip starts with the audible onset of the cue, not when play() is requested
+        self._cue_duck_timers[p_cue_name].start(int(self._cue_latencies.latency(p_cue_name)))
+
+    def duck_music_volume(self, p_cue_name: str):
+        if self._cue_qmedia_players[p_cue_name].playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+            self._ducking_engine.duck(p_cue_name, time.perf_counter())
+            self._ducking_timer.start()
+
+    def restore_music_volume(self, p_cue_name: str):
+        self._ducking_engine.release(p_cue_name, time.perf_counter())
+        self._ducking_timer.start()
+
+    def tick_ducking(self):
+        if not self._ducking_engine.tick(time.perf_counter()):
+            self._ducking_timer.stop()
+
+    def handle_cue_playback_state_changed(self, p_cue_name: str, p_playback_state: QMediaPlayer.PlaybackState):
+        # The music comes back when the cue ends, whatever its length
+        if p_playback_state == QMediaPlayer.PlaybackState.StoppedState:
+            self.restore_music_volume(p_cue_name)
 
     def stop_events_player(self):
-        if self._events_qmedia_player.playbackState() != QMediaPlayer.PlaybackState.StoppedState:
-            self._events_qmedia_player.stop()
+        for cue_qmedia_player in self._cue_qmedia_players.values():
+            if cue_qmedia_player.playbackState() != QMediaPlayer.PlaybackState.StoppedState:
+                cue_qmedia_player.stop()
+
+    def get_audio_device_id(self):
+        device = self._media_devices.defaultAudioOutput()
+        if device.isNull():
+            return "default"
+        return f"{device.description()}:{bytes(device.id().toHex()).decode('ascii')}"
+
+    def handle_audio_outputs_changed(self):
+        self._cue_latencies = self._music_and_playlists_manager.get_cue_latency_table(self.get_audio_device_id())
+
+    def is_cue_ready(self, p_cue_name: str):
+        return self._cue_qmedia_players[p_cue_name].mediaStatus() in CUE_READY_MEDIA_STATUSES
+
+    def get_cue_lead_time(self, p_cue_name: str):
+        if p_cue_name not in self._cue_qmedia_players:
+            return 0
+        return self._cue_latencies.lead_time(p_cue_name, self.is_cue_ready(p_cue_name))
+
+    def cue_for_match_threshold(self, p_threshold: int):
+        if p_threshold == 60:
+            return CUE_ONE_MINUTE_LEFT_FOR_MATCH
+        elif p_threshold == 5:
+            return CUE_FIVE_SECONDS_COUNTDOWN
+        return None
+
+    def handle_cue_position_changed(self, p_cue_name: str, p_position: int):
+        # The first reported position gives the audible onset, hence the start latency of the pipeline
+        if p_position > 0 and p_cue_name in self._cue_play_requested_at:
+            requested_at = self._cue_play_requested_at.pop(p_cue_name)
+            measured_latency = 1000 * (time.perf_counter() - requested_at) - p_position
+            self._cue_latencies.record_measurement(p_cue_name, measured_latency)
 
     def update_buttons(self, state):
         if state == QMediaPlayer.PlaybackState.StoppedState:
@@ -438,20 +548,42 @@ class MusicPlayer(QtWidgets.QWidget):
             self._next_action.setEnabled(True)
             self._previous_action.setEnabled(True)
 
+    @instrumented("player")
     def source_changed(self, p_url: QUrl):
         music_object = MusicObject(Path(p_url.toLocalFile()))
         self._label_song_title_value.setText(music_object.title)
         self._label_artiste_name_value.setText(music_object.artist)
         self._threshold_to_switch = music_object.duration * 1000 - 100
+        self._start_position = 0
+        # Head and tail silences found by the background analysis are skipped to avoid dead air between songs
+        stored_music_object = self._music_and_playlists_manager.get_music_from_store_by_path(p_url.toLocalFile())
+        if stored_music_object is not None:
+            self._position_slider.set_peaks(self._music_and_playlists_manager.load_waveform_peaks(stored_music_object.uid))
+        else:
+            self._position_slider.set_peaks(None)
+        if stored_music_object is not None and stored_music_object.is_analyzed():
+            if stored_music_object.end_offset_ms > stored_music_object.start_offset_ms:
+                self._start_position = stored_music_object.start_offset_ms
+                self._threshold_to_switch = min(self._threshold_to_switch, stored_music_object.end_offset_ms)
+        # Set before the source when a previous session is restored
+        self._start_position = max(self._start_position, self._resume_position)
+        self._resume_position = 0
         self._label_current_song_duration.setText(music_object.format_duration())
         self._label_current_song_position.setText(START_SONG_DURATION)
         self._old_position = 0
 
+    def media_status_changed(self, p_status: QMediaPlayer.MediaStatus):
+        # Seeking is only reliable once the media is loaded
+        if p_status == QMediaPlayer.MediaStatus.LoadedMedia and self._start_position > 0:
+            if self._normal_music_qmedia_player.position() < self._start_position:
+                self._normal_music_qmedia_player.setPosition(self._start_position)
+
     def position_changed(self, position):
         delta = position - self._old_position
         if delta >= 1000:
             self._label_current_song_position.setText(format_position(position))
             self._old_position = position
+            self.session_state_changed.emit()
         if position >= self._threshold_to_switch:
             self.next_clicked()
 
@@ -503,34 +635,19 @@ class MusicPlayer(QtWidgets.QWidget):
             self.enable_all_music_player_actions()
             self.stop_ambient_music()
             self.stop_events_player()
-            self._events_qmedia_player.setSource(QUrl(''))
-            self._events_qmedia_player.setSource(QUrl.fromLocalFile(str(self._path_to_start_buzzer_sound)))
-            self.play_events_player()
+            self.play_events_player(CUE_BUZZER_MATCH_START)
             self.play_music()
         elif self.ambient_music_mode == AmbientMusicMode.AMBIENT_MUSIC:
             self.stop_music()
             self.play_ambient_music()
 
-    def handle_break_timer_threshold(self, p_threshold: int):
-        self.stop_events_player()
-        if p_threshold == 60:
-            self._events_qmedia_player.setSource(QUrl.fromLocalFile(str(self._path_to_one_minute_left_break)))
-        elif p_threshold == 5:
-            self._events_qmedia_player.setSource(QUrl.fromLocalFile(str(self._path_to_five_seconds_countdown_sound)))
-        self.play_events_player()
-
     def handle_match_timer_threshold(self, p_threshold: int):
-        self.stop_events_player()
-        if p_threshold == 60:
-            self._events_qmedia_player.setSource(QUrl.fromLocalFile(str(self._path_to_one_minute_left_match)))
-        elif p_threshold == 5:
-            self._events_qmedia_player.setSource(QUrl.fromLocalFile(str(self._path_to_five_seconds_countdown_sound)))
-        self.play_events_player()
+        cue_name = self.cue_for_match_threshold(p_threshold)
+        if cue_name is not None:
+            self.play_cue(cue_name)
 
     def handle_match_timer_ends(self):
-        self.stop_events_player()
-        self._events_qmedia_player.setSource(QUrl.fromLocalFile(str(self._path_to_end_buzzer_sound)))
-        self.play_events_player()
+        self.play_cue(CUE_BUZZER_MATCH_END)
         if self.ambient_music_mode.value == 2:
             self.stop_music()
             self.disable_all_music_player_actions()
@@ -539,18 +656,42 @@ class MusicPlayer(QtWidgets.QWidget):
     def handle_match_timer_stops(self):
         pass
 
-    def handle_break_timer_ends(self, p_mode: int):
-        if p_mode == 2:
+    def handle_court_cue(self, p_event_type: int, p_phase_identifier: int, p_threshold: int):
+        is_match = p_phase_identifier == MATCH_PHASE_IDENTIFIER
+        if p_event_type == CourtEventType.TRANSITION.value and is_match:
+            self.play_cue(CUE_BUZZER_MATCH_START)
+        elif p_event_type == CourtEventType.END.value and is_match:
+            self.play_cue(CUE_BUZZER_MATCH_END)
+        elif p_event_type == CourtEventType.THRESHOLD.value and p_threshold == 5:
+            self.play_cue(CUE_FIVE_SECONDS_COUNTDOWN)
+        elif p_event_type == CourtEventType.THRESHOLD.value and p_threshold == 60:
+            self.play_cue((CUE_ONE_MINUTE_LEFT_FOR_BREAK, CUE_ONE_MINUTE_LEFT_FOR_MATCH)[is_match])
+
+    @instrumented("cue")
+    def play_cue(self, p_cue_name: str):
+        Instrumentation().count(f"cue.{p_cue_name}")
+        self.init_cue_players()
+        if p_cue_name in self._cue_qmedia_players:
+            self.play_events_player(p_cue_name)
+
+    def handle_sequence_phase_started(self, p_music_source: int):
+        if p_music_source == MusicSource.PLAYLIST.value:
             self.stop_ambient_music()
-            self.play_music()
             self.enable_all_music_player_actions()
+            self.play_music()
+        elif p_music_source == MusicSource.AMBIENT.value and self.ambient_music_mode == AmbientMusicMode.AMBIENT_MUSIC:
+            self.stop_music()
+            self.disable_all_music_player_actions()
+            self.play_ambient_music()
+        elif p_music_source == MusicSource.SILENCE.value:
+            self.stop_music()
+            self.stop_ambient_music()
 
-    def handle_break_timer_stops(self):
-        pass
-
+    @instrumented("player")
     def handle_music_to_play_received(self, p_music_file_path: str, p_playlist_index: int):
         self.stop_music()
         self._current_playlist_index = p_playlist_index
+        self.set_track_gain(p_music_file_path)
         self._normal_music_qmedia_player.setSource(QUrl.fromLocalFile(p_music_file_path))
         self._normal_music_qmedia_player.setLoops(1)
         self._normal_music_qmedia_player.play()
@@ -571,6 +712,7 @@ class MusicPlayer(QtWidgets.QWidget):
 
     def handle_received_song_to_play(self, p_path_to_music: str, p_position_in_playlist: int):
         self.stop_music()
+        self.set_track_gain(p_path_to_music)
         self._normal_music_qmedia_player.setSource(QUrl.fromLocalFile(p_path_to_music))
         self._current_playlist_index = p_position_in_playlist
 
@@ -579,6 +721,32 @@ class MusicPlayer(QtWidgets.QWidget):
             self.music_started_or_resumed.emit()
         elif p_state == QMediaPlayer.PlaybackState.StoppedState:
             self.music_stopped.emit()
+        self.session_state_changed.emit()
+
+    def session_state(self):
+        # Saved in the native form of the path, as the library store keys it
+        track_path = self._normal_music_qmedia_player.source().toLocalFile()
+        return {"track_path": str(Path(track_path)) if track_path else None,
+                "playlist_index": self._current_playlist_index,
+                "position_ms": self._normal_music_qmedia_player.position(),
+                "is_playing": self._normal_music_qmedia_player.playbackState() == QMediaPlayer.PlaybackState.PlayingState,
+                "shuffle_mode": self.shuffle_mode.value, "repeat_mode": self.repeat_mode.value}
+
+    def restore_session_state(self, p_session_state: dict, p_is_resuming: bool):
+        # The track is taken back from the library store, nothing is scanned. It is sought once loaded, as for the
+        # head silence, and only plays again when p_is_resuming
+        self.shuffle_mode = p_session_state.get("shuffle_mode")
+        self.repeat_mode = p_session_state.get("repeat_mode")
+        self.update_mode_icons()
+        track_path = p_session_state.get("track_path")
+        music_object = None if not track_path else \
+            self._music_and_playlists_manager.get_music_from_store_by_path(track_path)
+        if music_object is None:
+            return
+        self._resume_position = p_session_state.get("position_ms", 0)
+        self.handle_received_song_to_play(str(music_object.path), p_session_state.get("playlist_index", 0))
+        if p_is_resuming and p_session_state.get("is_playing") is True:
+            self._normal_music_qmedia_player.play()
 
     def handle_playlist_switched(self):
         self.stop_music()
@@ -592,7 +760,23 @@ class MusicPlayer(QtWidgets.QWidget):
         self.disable_all_music_player_actions()
 
     def set_music_volume_from_volume_slider(self, p_position: int):
-        self._audio_output_normal_music.setVolume(exp(log(1000) * p_position / 100)/250)
+        self._slider_volume = exp(log(1000) * p_position / 100)/250
+        self.apply_music_volume()
+
+    def set_track_gain(self, p_music_file_path: str):
+        # Normalization gain measured by the background analysis, unity until the song has been analyzed
+        music_object = self._music_and_playlists_manager.get_music_from_store_by_path(p_music_file_path)
+        if music_object is not None and music_object.gain_db is not None:
+            # Imported here, the analysis modules pull numpy in and are not needed to show the window
+            from api.audio.loudness import db_to_linear
+            self._track_gain = db_to_linear(music_object.gain_db)
+        else:
+            self._track_gain = 1.0
+        self.apply_music_volume()
+
+    def apply_music_volume(self):
+        self._ducking_engine.set_base_volume(self._audio_output_normal_music,
+                                             min(1.0, self._slider_volume * self._track_gain))
 
     def handle_stop_cycling(self):
         self.stop_ambient_music()
@@ -1,31 +1,37 @@
-import os
 import random
 from pathlib import Path
 from typing import List
 
 from PySide6 import QtWidgets, QtCore
 from PySide6.QtCore import QModelIndex
-from PySide6.QtGui import QIcon, QPalette, QColor, QShortcut, QKeySequence
+from PySide6.QtGui import QPalette, QColor, QShortcut, QKeySequence, QAction
 from PySide6.QtWidgets import QTableView, QComboBox, QGridLayout, QPushButton, QFileDialog, QLabel, QLineEdit, QFrame, \
-    QMessageBox, QTabWidget
+    QMessageBox, QTabWidget, QInputDialog
 
 from api.music.music_and_playlists_manager import MusicAndPlaylistsManager
+from api.music.music_importer import MusicImporter
 from api.music.playlist_model import PlaylistModel
 from api.music.playlist import Playlist
-from widgets.spotify_widget import SpotifyWidget
+from api.util.resources_bundle import ResourcesBundle
+from config.config import APPICON_DIR_NAME, APP_ICON_FILE_NAME
+from widgets.timer_widget import secs_to_hoursminsec
 
 
 class PlayListWidget(QtWidgets.QWidget):
     signal_file_to_play = QtCore.Signal(str, int)
     signal_playlist_switched = QtCore.Signal()
+    songs_added = QtCore.Signal(list)
+    playlist_saved = QtCore.Signal(bool)
 
     _base_dir: Path
     _tab_widget: QTabWidget
     _playlist_view: QTableView
     _playlist_combo_box: QComboBox
+    _playlist_summary_label: QLabel
     _delete_playlist_button: QPushButton
     _save_playlist_button: QPushButton
     _add_songs_button: QPushButton
+    _plan_songs_button: QPushButton
     _new_playlist_label: QLabel
     _new_playlist_line_edit: QLineEdit
     _new_playlist_push_button: QPushButton
@@ -35,12 +41,24 @@ class PlayListWidget(QtWidgets.QWidget):
     _playlist_model: PlaylistModel
     _delete_song_shortcut: QShortcut
     _alt_delete_song_shortcut: QShortcut
-    _spotify_widget: SpotifyWidget
+    _undo_shortcut: QShortcut
+    _redo_shortcut: QShortcut
+    _play_next_action: QAction
+    _add_to_queue_action: QAction
+    _music_importer: MusicImporter
+    _import_playlist_uid: object
+    _import_row: int
+    _is_import_step_open: bool
+    _pending_drops: list
 
     def __init__(self, parent):
         super().__init__(parent)
         self._base_dir = self.parent()._base_dir
         self._music_and_playlists_manager = MusicAndPlaylistsManager()
+        self._import_playlist_uid = None
+        self._import_row = 0
+        self._is_import_step_open = False
+        self._pending_drops = []
         self.setup_ui()
         self.populate_playlist_combo_box()
 
@@ -57,33 +75,47 @@ class PlayListWidget(QtWidgets.QWidget):
         self._playlist_view = QTableView(self)
         self._playlist_view.setModel(self._playlist_model)
         self._playlist_combo_box = QComboBox(self)
+        self._playlist_summary_label = QLabel(self)
         self._delete_playlist_button = QPushButton(self)
         self._add_songs_button = QPushButton(self)
+        self._plan_songs_button = QPushButton(self)
         self._save_playlist_button = QPushButton(self)
         self._new_playlist_label = QLabel(self)
         self._new_playlist_line_edit = QLineEdit(self)
         self._new_playlist_push_button = QPushButton(self)
         self._frame = QFrame(self)
+        self._music_importer = MusicImporter(self)
+        self._play_next_action = QAction("Lire ensuite", self._playlist_view)
+        self._add_to_queue_action = QAction("Ajouter à la file d'attente", self._playlist_view)
 
     def modify_widgets(self):
-        save_icon = QIcon(os.path.join(self._base_dir, 'resources', 'disquette.png'))
+        resources_bundle = ResourcesBundle()
+        save_icon = resources_bundle.icon('disquette.png')
         self._save_playlist_button.setIcon(save_icon)
         self._save_playlist_button.setToolTip("Sauvegarder la playlist")
         self._save_playlist_button.setEnabled(False)
 
-        plus_icon = QIcon(os.path.join(self._base_dir, 'resources', 'plus.ico'))
+        plus_icon = resources_bundle.icon('plus.ico')
         self._add_songs_button.setIcon(plus_icon)
         self._add_songs_button.setToolTip("Ajouter chanson(s) à la playlist courante")
         self._add_songs_button.setEnabled(False)
 
-        bin_icon = QIcon(os.path.join(self._base_dir, 'resources', 'bin.png'))
+        self._plan_songs_button.setText("Remplir")
+        self._plan_songs_button.setToolTip("Ajouter des chansons de la bibliothèque pour remplir une durée donnée")
+        self._plan_songs_button.setEnabled(False)
+
+        bin_icon = resources_bundle.icon('bin.png')
         self._delete_playlist_button.setIcon(bin_icon)
         self._delete_playlist_button.setToolTip("Supprimer la playlist courante")
         self._delete_playlist_button.setEnabled(False)
 
         self._playlist_view.setShowGrid(False)
-        self._playlist_view.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.SingleSelection)
+        self._playlist_view.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection)
+        self._playlist_view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        # Drag and drop both for the rows of the playlist and for files and folders from the OS
         self._playlist_view.setDragDropMode(QtWidgets.QAbstractItemView.DragDropMode.DragDrop)
+        self._playlist_view.setDefaultDropAction(QtCore.Qt.DropAction.MoveAction)
+        self._playlist_view.setDragDropOverwriteMode(False)
         self._playlist_view.setColumnHidden(4, True)
         self._playlist_view.setEnabled(False)
         self._playlist_view.setColumnWidth(0, 50)
@@ -91,6 +123,9 @@ class PlayListWidget(QtWidgets.QWidget):
         self._playlist_view.setColumnWidth(2, 125)
         self._playlist_view.setColumnWidth(3, 200)
         self._playlist_view.horizontalHeader().setSectionResizeMode(1, QtWidgets.QHeaderView.ResizeMode.Stretch)
+        self._playlist_view.setContextMenuPolicy(QtCore.Qt.ContextMenuPolicy.ActionsContextMenu)
+        self._playlist_view.addAction(self._play_next_action)
+        self._playlist_view.addAction(self._add_to_queue_action)
 
         self._new_playlist_label.setText("Nom de nouvelle playlist :")
         self._new_playlist_line_edit.setText("Nouvelle Playlist")
@@ -106,6 +141,8 @@ class PlayListWidget(QtWidgets.QWidget):
 
         self._delete_song_shortcut = QShortcut(QKeySequence(QtCore.Qt.Key.Key_Delete), self._playlist_view)
         self._alt_delete_song_shortcut = QShortcut(QKeySequence(QtCore.Qt.Key.Key_Backspace), self._playlist_view)
+        self._undo_shortcut = QShortcut(QKeySequence(QKeySequence.StandardKey.Undo), self._playlist_view)
+        self._redo_shortcut = QShortcut(QKeySequence(QKeySequence.StandardKey.Redo), self._playlist_view)
 
     def create_layout(self):
         self._layout = QGridLayout(self)
@@ -115,15 +152,19 @@ class PlayListWidget(QtWidgets.QWidget):
         self._layout.addWidget(self._new_playlist_line_edit, 0, 1, 1, 4)
         self._layout.addWidget(self._new_playlist_push_button, 0, 5, 1, 1)
         self._layout.addWidget(self._frame, 1, 0, 1, -1)
-        self._layout.addWidget(self._playlist_combo_box, 2, 0, 1, 3)
+        self._layout.addWidget(self._playlist_combo_box, 2, 0, 1, 2)
+        self._layout.addWidget(self._playlist_summary_label, 2, 2, 1, 1)
         self._layout.addWidget(self._delete_playlist_button, 2, 3, 1, 1)
         self._layout.addWidget(self._save_playlist_button, 2, 4, 1, 1)
         self._layout.addWidget(self._add_songs_button, 2, 5, 1, 1)
+        self._layout.addWidget(self._plan_songs_button, 2, 6, 1, 1)
         self._layout.addWidget(self._playlist_view, 3, 0, -1, -1)
 
     def setup_connections(self):
         self._add_songs_button.clicked.connect(self.open_add_songs_dialog)
+        self._plan_songs_button.clicked.connect(self.open_plan_songs_dialog)
         self._save_playlist_button.clicked.connect(self.save_current_playlist)
+        self.playlist_saved.connect(self.handle_playlist_saved)
         self._delete_playlist_button.clicked.connect(self.delete_current_playlist)
         self._playlist_combo_box.currentIndexChanged.connect(self._playlist_model.switch_playlist)
         self._new_playlist_line_edit.textEdited.connect(self.handle_new_playlist_name_edited)
@@ -131,8 +172,18 @@ class PlayListWidget(QtWidgets.QWidget):
         self._playlist_view.doubleClicked.connect(self.handle_view_double_clicked)
         self._delete_song_shortcut.activated.connect(self.handle_delete_song)
         self._alt_delete_song_shortcut.activated.connect(self.handle_delete_song)
+        self._undo_shortcut.activated.connect(self._playlist_model.undo)
+        self._redo_shortcut.activated.connect(self._playlist_model.redo)
+        self._play_next_action.triggered.connect(self.handle_play_next)
+        self._add_to_queue_action.triggered.connect(self.handle_add_to_queue)
         self._playlist_model.signal_no_playlist_selected.connect(self.handle_no_playlist)
         self._playlist_model.playlist_switched.connect(self.handle_playlist_switched)
+        self._playlist_model.files_dropped.connect(self.handle_files_dropped)
+        self._music_importer.musics_imported.connect(self.handle_musics_imported)
+        self._music_importer.import_finished.connect(self.handle_import_finished)
+        self._playlist_model.rowsInserted.connect(self.update_playlist_summary)
+        self._playlist_model.rowsRemoved.connect(self.update_playlist_summary)
+        self._playlist_model.modelReset.connect(self.update_playlist_summary)
 
     def open_add_songs_dialog(self):
         dialog = QFileDialog(self, caption="Choose Music File(s) to add")
@@ -143,28 +194,67 @@ class PlayListWidget(QtWidgets.QWidget):
             file_names = dialog.selectedFiles()
             self.add_songs_to_current_playlist(file_names)
 
+    def open_plan_songs_dialog(self):
+        target_duration, ok = QInputDialog.getInt(self, "Remplir la playlist", "Durée à remplir (secondes) :", 300, 30,
+                                                  24 * 3600, 30)
+        if ok:
+            current_playlist = self._playlist_model.get_playlist()
+            planned_songs = self._music_and_playlists_manager.plan_songs_for_duration(
+                target_duration, p_excluded_uids=set(current_playlist.get_all_songs()))
+            if len(planned_songs) == 0:
+                QMessageBox.information(self, "Remplir la playlist",
+                                        "Aucune combinaison de chansons ne correspond à cette durée")
+            else:
+                self._playlist_model.insert_songs_rows(planned_songs, self._playlist_model.rowCount(),
+                                                       modify_current_playlist=True)
+
     def populate_playlist_combo_box(self):
         all_available_playlists = self._music_and_playlists_manager.get_all_playlists_from_store()
         if len(all_available_playlists) > 0:
             [self._playlist_combo_box.addItem(x.name) for x in all_available_playlists]
             self._save_playlist_button.setEnabled(True)
             self._add_songs_button.setEnabled(True)
+            self._plan_songs_button.setEnabled(True)
             self._delete_playlist_button.setEnabled(True)
             self._playlist_view.setEnabled(True)
             self._playlist_combo_box.setCurrentIndex(0)
 
+    def get_current_playlist_uid(self):
+        current_playlist = self._playlist_model.get_playlist()
+        return None if current_playlist is None else current_playlist.uid
+
+    def select_playlist(self, p_playlist_uid):
+        all_available_playlists = self._music_and_playlists_manager.get_all_playlists_from_store()
+        for index, playlist in enumerate(all_available_playlists):
+            if str(playlist.uid) == str(p_playlist_uid):
+                self._playlist_combo_box.setCurrentIndex(index)
+                return True
+        return False
+
     def save_current_playlist(self):
         index = self._playlist_combo_box.currentIndex()
         all_available_playlists = self._music_and_playlists_manager.get_all_playlists_from_store()
         playlist = all_available_playlists[index]
-        self._music_and_playlists_manager.save_one_playlist(playlist.uid)
+        save_future = self._music_and_playlists_manager.save_one_playlist(playlist.uid)
+        if save_future is not None:
+            # The DB writer thread calls back, the signal brings the result back to the GUI thread
+            self._save_playlist_button.setEnabled(False)
+            save_future.add_done_callback(
+                lambda x: self.playlist_saved.emit(x.exception() is None and x.result() is True))
+
+    def handle_playlist_saved(self, p_is_saved: bool):
+        self._save_playlist_button.setEnabled(self._playlist_combo_box.currentIndex() != -1)
+        if not p_is_saved:
+            QMessageBox.warning(self, "Sauvegarde de la playlist",
+                                "La playlist n'a pas pu être sauvegardée, elle sera entièrement réécrite à la "
+                                "prochaine sauvegarde")
 
     def delete_current_playlist(self):
         index = self._playlist_combo_box.currentIndex()
         if index != -1:
             msg_box = QMessageBox(QMessageBox.Icon.Warning, "Confirmer suppression",
                                   "Voulez-vous vraiment supprimmer cette playlist ?")
-            msg_box.setWindowIcon(QIcon(os.path.join(self._base_dir, 'resources', 'appIcon', 'beach_volley_icon.ico')))
+            msg_box.setWindowIcon(ResourcesBundle().icon(APPICON_DIR_NAME, APP_ICON_FILE_NAME))
             msg_box.setInformativeText("Attention : toute suppression est définitive")
             yes_button = msg_box.addButton(QMessageBox.StandardButton.Yes)
             no_button = msg_box.addButton(QMessageBox.StandardButton.No)
@@ -177,6 +267,52 @@ class PlayListWidget(QtWidgets.QWidget):
         if p_files is not None and len(p_files) > 0:
             music_objects = [self._music_and_playlists_manager.add_music_to_store(Path(x)) for x in p_files]
             self._playlist_model.insert_songs_rows(music_objects, self._playlist_model.rowCount(), modify_current_playlist=True)
+            self.songs_added.emit(music_objects)
+
+    def handle_files_dropped(self, p_paths: List[Path], p_row: int):
+        current_playlist = self._playlist_model.get_playlist()
+        if current_playlist is not None:
+            # Files dropped while an import runs are imported once it is finished
+            self._pending_drops.append((p_paths, current_playlist.uid, p_row))
+            self.start_next_import()
+
+    def start_next_import(self):
+        if len(self._pending_drops) == 0 or self._music_importer.is_running():
+            return
+        paths, playlist_uid, row = self._pending_drops.pop(0)
+        if self._music_importer.start(paths):
+            self._import_playlist_uid = playlist_uid
+            self._import_row = row
+            self._is_import_step_open = False
+
+    def handle_import_finished(self, p_nb_of_imported_files: int):
+        # The import thread signals just before it ends
+        self._music_importer.stop()
+        self.start_next_import()
+
+    def handle_musics_imported(self, p_music_objects: list):
+        # Batches keep coming in while the import runs, each one is inserted after the previous one
+        [self._music_and_playlists_manager.put_music_in_store(x) for x in p_music_objects if
+         self._music_and_playlists_manager.get_music_from_store(x.uid) is None]
+        current_playlist = self._playlist_model.get_playlist()
+        if current_playlist is not None and current_playlist.uid == self._import_playlist_uid:
+            self._import_row = min(self._import_row, self._playlist_model.rowCount())
+            # The whole import is one undo step
+            self._playlist_model.insert_songs_rows(p_music_objects, self._import_row, modify_current_playlist=True,
+                                                   merge_with_last_step=self._is_import_step_open)
+            self._is_import_step_open = True
+        else:
+            import_playlist = self._music_and_playlists_manager.get_playlist_from_store(self._import_playlist_uid)
+            if import_playlist is None:
+                return
+            self._import_row = min(self._import_row, import_playlist.size())
+            import_playlist.add_songs_at_index(p_music_objects, self._import_row)
+        self._import_row += len(p_music_objects)
+        self.songs_added.emit(p_music_objects)
+
+    def stop_background_tasks(self):
+        self._pending_drops = []
+        self._music_importer.stop()
 
     def handle_new_playlist_name_edited(self):
         text = self._new_playlist_line_edit.text()
@@ -193,6 +329,7 @@ class PlayListWidget(QtWidgets.QWidget):
         self._playlist_combo_box.addItem(new_playlist_name)
         self._save_playlist_button.setEnabled(True)
         self._add_songs_button.setEnabled(True)
+        self._plan_songs_button.setEnabled(True)
         self._delete_playlist_button.setEnabled(True)
         self._playlist_view.setEnabled(True)
         self._playlist_combo_box.setCurrentIndex(nb_of_playlists - 1)
@@ -207,12 +344,55 @@ class PlayListWidget(QtWidgets.QWidget):
         if index.isValid():
             self._playlist_model.remove_songs_rows(1, index.row(), modify_current_playlist=True)
 
+    def handle_play_next(self):
+        index = self._playlist_view.currentIndex()
+        current_playlist = self._playlist_model.get_playlist()
+        if index.isValid() and current_playlist is not None:
+            self._music_and_playlists_manager.get_play_queue().play_next(current_playlist.get_song(index.row()),
+                                                                         current_playlist.uid, index.row())
+
+    def handle_add_to_queue(self):
+        index = self._playlist_view.currentIndex()
+        current_playlist = self._playlist_model.get_playlist()
+        if index.isValid() and current_playlist is not None:
+            self._music_and_playlists_manager.get_play_queue().add_to_queue(current_playlist.get_song(index.row()),
+                                                                            current_playlist.uid, index.row())
+
+    def play_next_in_queue(self, p_position: int):
+        # The up-next queue goes before the playlist order, returns False when there is nothing to play from it
+        play_queue = self._music_and_playlists_manager.get_play_queue()
+        current_playlist = self._playlist_model.get_playlist()
+        while not play_queue.is_empty():
+            song_uid, playlist_uid, playlist_position = play_queue.pop_next()
+            music_object = self._music_and_playlists_manager.get_music_from_store(song_uid)
+            if music_object is None:
+                continue
+            # Outside of the current playlist, or moved since it was queued, the playlist carries on from where it was
+            if current_playlist is None or playlist_uid != current_playlist.uid or \
+                    current_playlist.get_song(playlist_position) != song_uid:
+                playlist_position = p_position
+            self.signal_file_to_play.emit(str(music_object.path), playlist_position)
+            return True
+        return False
+
     def handle_playlist_switched(self):
+        self.update_playlist_summary()
         self.signal_playlist_switched.emit()
 
+    def update_playlist_summary(self):
+        # Running totals kept by the playlist, nothing is summed here
+        current_playlist = self._playlist_model.get_playlist()
+        if current_playlist is None:
+            self._playlist_summary_label.clear()
+        else:
+            self._playlist_summary_label.setText(
+                f"{current_playlist.size()} titres - {secs_to_hoursminsec(int(current_playlist.total_duration))}")
+
     def handle_no_playlist(self):
+        self._playlist_summary_label.clear()
         self._playlist_combo_box.setEnabled(False)
         self._add_songs_button.setEnabled(False)
+        self._plan_songs_button.setEnabled(False)
         self._delete_playlist_button.setEnabled(False)
         self._playlist_view.setEnabled(False)
 
@@ -230,6 +410,8 @@ class PlayListWidget(QtWidgets.QWidget):
         current_playlist = self._playlist_model.get_playlist()
         if current_playlist is None:
             return
+        if p_increment > 0 and self.play_next_in_queue(p_position):
+            return
         current_playlist_size = current_playlist.size()
         if current_playlist_size <= 1:
             return
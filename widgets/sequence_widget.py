@@ -0,0 +1,246 @@
+import uuid
+from pathlib import Path
+
+from PySide6 import QtCore
+from PySide6.QtCore import QTimer, QElapsedTimer
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import QWidget, QLabel, QComboBox, QPushButton, QGridLayout, QFileDialog, QMessageBox
+
+from api.audio.cue_scheduler import CueScheduler, MAX_CUE_LEAD_MS, DEFAULT_CUE_LATENCY_MS
+from api.music.music_and_playlists_manager import MusicAndPlaylistsManager
+from api.timer.sequence import Sequence
+from api.timer.sequence_engine import SequenceEngine, SequenceEventType
+from api.timer.timer_exceptions import SequenceDefinitionError
+from widgets.timer_widget import secs_to_hoursminsec, PAUSE_BUTTON_TEXT, RESUME_BUTTON_TEXT
+
+TICK_INTERVAL_MS = 100
+LOOKAHEAD_HORIZON_S = (MAX_CUE_LEAD_MS + 2 * TICK_INTERVAL_MS) / 1000
+IDLE_PHASE_TEXT = "Séquence arrêtée"
+
+
+class SequenceWidget(QWidget):
+    phase_started = QtCore.Signal(int)
+    cue_triggered = QtCore.Signal(str)
+    sequence_ended = QtCore.Signal()
+    session_state_changed = QtCore.Signal()
+
+    _engine: SequenceEngine
+    _cue_scheduler: CueScheduler
+    _pending_cue_timers: list
+    _clock: QElapsedTimer
+    _tick_timer: QTimer
+    _displayed_time_left: int
+    _sequence_combo_box: QComboBox
+    _import_sequence_button: QPushButton
+    _phase_label: QLabel
+    _time_label: QLabel
+    _pause_button: QPushButton
+    _grid_layout: QGridLayout
+    _music_and_playlists_manager: MusicAndPlaylistsManager
+
+    def __init__(self, p_parent):
+        super().__init__(p_parent)
+        self._engine = None
+        self._cue_scheduler = CueScheduler()
+        self._pending_cue_timers = []
+        self._cue_lead_time_provider = lambda x: DEFAULT_CUE_LATENCY_MS
+        self._displayed_time_left = -1
+        self._music_and_playlists_manager = MusicAndPlaylistsManager()
+        self.setup_ui()
+        self.populate_sequence_combo_box()
+
+    def setup_ui(self):
+        self.create_widgets()
+        self.modify_widgets()
+        self.create_layout()
+        self.add_widgets_layout()
+        self.setup_connections()
+
+    def create_widgets(self):
+        self._clock = QElapsedTimer()
+        self._clock.start()
+        self._tick_timer = QTimer(self)
+        self._tick_timer.setInterval(TICK_INTERVAL_MS)
+        self._tick_timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+
+        self._sequence_combo_box = QComboBox(self)
+        self._import_sequence_button = QPushButton(self)
+        self._phase_label = QLabel(self)
+        self._time_label = QLabel(self)
+        self._pause_button = QPushButton(self)
+
+    def modify_widgets(self):
+        self._import_sequence_button.setText("Importer une séquence")
+        self._import_sequence_button.setToolTip("Charger une séquence de phases depuis un fichier JSON")
+        self._phase_label.setText(IDLE_PHASE_TEXT)
+        custom_font = QFont()
+        custom_font.setPointSize(32)
+        self._time_label.setFont(custom_font)
+        self._time_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self._pause_button.setText(PAUSE_BUTTON_TEXT)
+        self._pause_button.setEnabled(False)
+
+    def create_layout(self):
+        self._grid_layout = QGridLayout(self)
+
+    def add_widgets_layout(self):
+        self._grid_layout.addWidget(self._sequence_combo_box, 0, 0)
+        self._grid_layout.addWidget(self._import_sequence_button, 0, 1)
+        self._grid_layout.addWidget(self._phase_label, 1, 0, 1, -1)
+        self._grid_layout.addWidget(self._time_label, 2, 0, 1, -1)
+        self._grid_layout.addWidget(self._pause_button, 3, 0, 1, -1)
+
+    def setup_connections(self):
+        self._tick_timer.timeout.connect(self.tick)
+        self._sequence_combo_box.currentIndexChanged.connect(self.select_sequence)
+        self._import_sequence_button.clicked.connect(self.open_import_sequence_dialog)
+        self._pause_button.clicked.connect(self.pause_or_resume_sequence)
+
+    def now(self):
+        return self._clock.elapsed() / 1000
+
+    def set_cue_lead_time_provider(self, p_cue_lead_time_provider):
+        self._cue_lead_time_provider = p_cue_lead_time_provider
+
+    def populate_sequence_combo_box(self):
+        self._sequence_combo_box.clear()
+        for sequence in self._music_and_playlists_manager.get_all_sequences_from_store():
+            self._sequence_combo_box.addItem(sequence.name, str(sequence.uid))
+
+    def select_sequence(self, p_index: int):
+        if p_index < 0:
+            return
+        sequence = self._music_and_playlists_manager.get_sequence_from_store(
+            uuid.UUID(self._sequence_combo_box.itemData(p_index)))
+        if sequence is not None:
+            self._engine = SequenceEngine(sequence)
+            self.update_time_left()
+
+    def open_import_sequence_dialog(self):
+        file_name, _ = QFileDialog.getOpenFileName(self, "Choisir une séquence", "", "Séquence (*.json)")
+        if len(file_name) > 0:
+            path = Path(file_name)
+            try:
+                sequence = Sequence.from_json(None, path.stem, path.read_text(encoding="utf-8"))
+            except SequenceDefinitionError as e:
+                QMessageBox.warning(self, "Séquence invalide", e.message)
+                return
+            self._music_and_playlists_manager.add_sequence(sequence)
+            self.populate_sequence_combo_box()
+            self._sequence_combo_box.setCurrentIndex(self._sequence_combo_box.count() - 1)
+
+    def start_sequence(self):
+        if self._engine is not None:
+            self._engine.start(self.now())
+            self.lock_sequence_selection()
+            self.tick()
+            self._tick_timer.start()
+            self.session_state_changed.emit()
+
+    def lock_sequence_selection(self):
+        self._sequence_combo_box.setEnabled(False)
+        self._import_sequence_button.setEnabled(False)
+        self._pause_button.setEnabled(True)
+        self._pause_button.setText(PAUSE_BUTTON_TEXT)
+
+    def stop_sequence(self):
+        self._tick_timer.stop()
+        self.cancel_pending_cues()
+        self._cue_scheduler.reset()
+        if self._engine is not None:
+            self._engine.stop()
+        self._sequence_combo_box.setEnabled(True)
+        self._import_sequence_button.setEnabled(True)
+        self._pause_button.setEnabled(False)
+        self._phase_label.setText(IDLE_PHASE_TEXT)
+        self.update_time_left()
+        self.session_state_changed.emit()
+
+    def pause_or_resume_sequence(self):
+        if self._engine.is_paused:
+            self._engine.resume(self.now())
+            self._pause_button.setText(PAUSE_BUTTON_TEXT)
+        else:
+            self._engine.pause(self.now())
+            self.cancel_pending_cues()
+            self._pause_button.setText(RESUME_BUTTON_TEXT)
+        self.session_state_changed.emit()
+
+    def session_state(self):
+        is_started = self._engine is not None and (self._engine.is_running or self._engine.is_paused)
+        return {"sequence_uid": self._sequence_combo_box.currentData(), "is_started": is_started,
+                "is_paused": is_started and self._engine.is_paused,
+                "elapsed_s": self._engine.elapsed(self.now()) if is_started else 0.0}
+
+    def restore_session_state(self, p_session_state: dict, p_catch_up_s: float):
+        # A running sequence goes on p_catch_up_s further, the time spent since the state was saved. Returns True when
+        # the sequence runs again
+        index = self._sequence_combo_box.findData(p_session_state.get("sequence_uid"))
+        if index < 0:
+            return False
+        self._sequence_combo_box.setCurrentIndex(index)
+        if not p_session_state.get("is_started") or self._engine is None:
+            return False
+        is_paused = p_session_state.get("is_paused") is True
+        self._engine.start(self.now(), p_session_state.get("elapsed_s", 0.0) + (p_catch_up_s, 0.0)[is_paused])
+        if not self._engine.is_running:
+            self.stop_sequence()
+            return False
+        self.lock_sequence_selection()
+        self._phase_label.setText(self._engine.current_phase().name)
+        if is_paused:
+            self._engine.pause(self.now())
+            self._pause_button.setText(RESUME_BUTTON_TEXT)
+        else:
+            self.phase_started.emit(self._engine.current_phase().music_source.value)
+            self._tick_timer.start()
+        self.update_time_left()
+        return True
+
+    def schedule_upcoming_cues(self, p_now: float):
+        # Cues are triggered early by their lead time so that the audible onset lands on the exact second
+        upcoming_cues = self._engine.upcoming_cues(p_now, LOOKAHEAD_HORIZON_S)
+        for key, delay, cue_name in self._cue_scheduler.plan(p_now, upcoming_cues, self._cue_lead_time_provider):
+            cue_timer = QTimer(self)
+            cue_timer.setSingleShot(True)
+            cue_timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+            cue_timer.timeout.connect(lambda t=cue_timer, k=key, c=cue_name: self.fire_cue(t, k, c))
+            self._pending_cue_timers.append(cue_timer)
+            cue_timer.start(int(delay * 1000))
+
+    def fire_cue(self, p_cue_timer: QTimer, p_key: tuple, p_cue_name: str):
+        if p_cue_timer in self._pending_cue_timers:
+            self._pending_cue_timers.remove(p_cue_timer)
+        p_cue_timer.deleteLater()
+        self._cue_scheduler.mark_fired(p_key)
+        self.cue_triggered.emit(p_cue_name)
+
+    def cancel_pending_cues(self):
+        for cue_timer in self._pending_cue_timers:
+            cue_timer.stop()
+            cue_timer.deleteLater()
+        self._pending_cue_timers = []
+        self._cue_scheduler.cancel_all()
+
+    def tick(self):
+        now = self.now()
+        self.schedule_upcoming_cues(now)
+        for event in self._engine.tick(now):
+            if event.event_type == SequenceEventType.PHASE_START:
+                phase = self._engine.sequence.phases[event.phase_index]
+                self._phase_label.setText(phase.name)
+                self.phase_started.emit(phase.music_source.value)
+                self.session_state_changed.emit()
+            elif event.event_type == SequenceEventType.SEQUENCE_END:
+                self.stop_sequence()
+                self.sequence_ended.emit()
+                return
+        self._cue_scheduler.forget_before(self._engine.position_key())
+        self.update_time_left()
+
+    def update_time_left(self):
+        if self._engine is not None:
+            time_left = self._engine.time_left(self.now())
+            if time_left != self._displayed_time_left:
+                self._displayed_time_left = time_left
+                self._time_label.setText(secs_to_hoursminsec(time_left))
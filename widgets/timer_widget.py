@@ -4,6 +4,7 @@ from PySide6 import QtCore, QtWidgets, QtGui
 from PySide6.QtWidgets import QWidget, QPushButton, QLabel, QGridLayout
 from PySide6.QtCore import QTimer
 
+from api.timer.court_scheduler import DEFAULT_CUE_THRESHOLDS
 from widgets.editable_label_widget import EditableLabelWidget
 
 START_BUTTON_TEXT = "Démarrer"
@@ -76,8 +77,11 @@ class MyTimerWidget(QWidget):
     timer_ends = QtCore.Signal(int)
     timer_specific_threshold = QtCore.Signal(int)
     timer_stops = QtCore.Signal(int, int)
+    session_state_changed = QtCore.Signal()
 
     _timer: QTimer
+    _threshold_timer: QTimer
+    _pending_threshold: int
     _timer_duration: int
     _time_left: int
     _identifier: TimerIdentifier
@@ -88,12 +92,16 @@ class MyTimerWidget(QWidget):
     _grid_layout: QGridLayout
     _state_before_edition: TimerState
     _mode: TimerMode
+    _cue_thresholds: frozenset
 
     def __init__(self, p_parent, p_timer_duration: int, p_identifier: int):
         super().__init__(p_parent)
         self.timer_duration = p_timer_duration
         self.time_left = self.timer_duration
         self.identifier = p_identifier
+        self.cue_thresholds = DEFAULT_CUE_THRESHOLDS
+        self._cue_lead_time_provider = lambda x: 0
+        self._pending_threshold = -1
         self.mode = TimerMode.FREE if self.identifier == TimerIdentifier.MATCH else TimerMode.SLAVE
         self.setup_ui()
         self._state_before_edition = TimerState()
@@ -113,6 +121,9 @@ class MyTimerWidget(QWidget):
         # Timer and associated editable label
         self._timer = QTimer(self)
         self._timer.setInterval(1000)
+        self._threshold_timer = QTimer(self)
+        self._threshold_timer.setSingleShot(True)
+        self._threshold_timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
         self._label_widget = EditableLabelWidget(self)
         hours_mins_secs = secs_to_hoursminsec(self._time_left)
         self._label_widget.set_text(hours_mins_secs)
@@ -145,26 +156,35 @@ class MyTimerWidget(QWidget):
         self._start_pause_button.clicked.connect(self.start_timer)
         self._stop_button.clicked.connect(self.stop_timer)
         self._timer.timeout.connect(self.timer_timeout)
+        self._threshold_timer.timeout.connect(self.threshold_timeout)
         self._label_widget.label_pressed.connect(self.timer_value_under_edition)
         self._label_widget.text_changed.connect(self.timer_value_edition_finished)
 
     def start_timer(self):
+        self.run_timer()
+        self.timer_starts.emit(self.identifier.value)
+        self.session_state_changed.emit()
+
+    def run_timer(self):
         self._stop_button.setEnabled(True)
         self._start_pause_button.setEnabled(True)
         self._start_pause_button.setText("Pause")
         self._start_pause_button.clicked.disconnect(self.start_timer)
         self._start_pause_button.clicked.connect(self.pause_timer)
         self._timer.start(1000)
-        self.timer_starts.emit(self.identifier.value)
+        self.schedule_next_threshold()
 
     def pause_timer(self):
         self._timer.stop()
+        self._threshold_timer.stop()
         self._start_pause_button.setText(RESUME_BUTTON_TEXT)
         self._start_pause_button.clicked.disconnect(self.pause_timer)
         self._start_pause_button.clicked.connect(self.start_timer)
+        self.session_state_changed.emit()
 
     def stop_timer(self):
         self._timer.stop()
+        self._threshold_timer.stop()
         self._stop_button.setEnabled(False)
         self._start_pause_button.setText(START_BUTTON_TEXT)
         self._start_pause_button.clicked.connect(self.start_timer)
@@ -175,19 +195,34 @@ class MyTimerWidget(QWidget):
             self._start_pause_button.setText(PAUSE_BUTTON_TEXT)
             self._start_pause_button.clicked.connect(self.pause_timer)
         self.timer_stops.emit(self.identifier.value, self.mode.value)
+        self.session_state_changed.emit()
 
     def timer_timeout(self):
         self.time_left -= 1
 
-        if self.time_left == 60 or self.time_left == 5:
-            self.timer_specific_threshold.emit(self.time_left)
-
         if self.time_left == 0:
             self.time_left = self.timer_duration
             self.stop_timer()
             self.timer_ends.emit(self.identifier.value)
+        else:
+            self.schedule_next_threshold()
 
         self.update_gui()
+        self.session_state_changed.emit()
+
+    def set_cue_lead_time_provider(self, p_cue_lead_time_provider):
+        self._cue_lead_time_provider = p_cue_lead_time_provider
+
+    def schedule_next_threshold(self):
+        # The threshold cue is triggered ahead of the next second by its lead time, so it is heard on the second
+        next_time_left = self.time_left - 1
+        if next_time_left in self._cue_thresholds:
+            lead_time = max(0, min(1000, int(self._cue_lead_time_provider(next_time_left))))
+            self._pending_threshold = next_time_left
+            self._threshold_timer.start(1000 - lead_time)
+
+    def threshold_timeout(self):
+        self.timer_specific_threshold.emit(self._pending_threshold)
 
     @property
     def identifier(self):
@@ -219,6 +254,15 @@ class MyTimerWidget(QWidget):
                                                                                     TimerMode):
             self._mode = TimerMode(p_mode)
 
+    @property
+    def cue_thresholds(self):
+        return self._cue_thresholds
+
+    @cue_thresholds.setter
+    def cue_thresholds(self, p_cue_thresholds):
+        if isinstance(p_cue_thresholds, (tuple, list, set)):
+            self._cue_thresholds = frozenset(int(x) for x in p_cue_thresholds)
+
     @property
     def timer_duration(self):
         return self._timer_duration
@@ -240,6 +284,7 @@ class MyTimerWidget(QWidget):
     def timer_value_under_edition(self):
         self.save_state()
         self._timer.stop()
+        self._threshold_timer.stop()
         self._start_pause_button.setEnabled(False)
         self._stop_button.setEnabled(False)
 
@@ -249,13 +294,37 @@ class MyTimerWidget(QWidget):
         self.timer_duration += self.time_left - previous_time_left
         if self._state_before_edition.running:
             self._timer.start()
+            self.schedule_next_threshold()
         self._start_pause_button.setEnabled(self._state_before_edition.start_enabled)
         self._stop_button.setEnabled(self._state_before_edition.stop_enabled)
+        self.session_state_changed.emit()
 
     def update_gui(self):
         minsec = secs_to_hoursminsec(self._time_left)
         self._label_widget.set_text(minsec)
 
+    def session_state(self):
+        return {"timer_duration": self.timer_duration, "time_left": self.time_left, "is_running": self._timer.isActive()}
+
+    def restore_session_state(self, p_session_state: dict, p_catch_up_s: int):
+        # A running timer goes on p_catch_up_s further, the time spent since the state was saved. The start is not
+        # signaled again, its cues are not played twice. Returns True when the timer runs again
+        self.timer_duration = p_session_state.get("timer_duration")
+        is_running = p_session_state.get("is_running") is True and self.mode == TimerMode.FREE
+        time_left = p_session_state.get("time_left", self.timer_duration) - (0, p_catch_up_s)[is_running]
+        if not isinstance(time_left, int) or not 0 < time_left < self.timer_duration:
+            self.time_left = self.timer_duration
+            self.update_gui()
+            return False
+        self.time_left = time_left
+        self.update_gui()
+        if is_running:
+            self.run_timer()
+        elif self.mode == TimerMode.FREE:
+            self._stop_button.setEnabled(True)
+            self._start_pause_button.setText(RESUME_BUTTON_TEXT)
+        return is_running
+
     def save_state(self):
         self._state_before_edition.running = self._timer.isActive()
         self._state_before_edition.start_enabled = self._start_pause_button.isEnabled()
@@ -0,0 +1,65 @@
+from PySide6.QtCore import Qt, QLine
+from PySide6.QtGui import QPainter, QPixmap, QColor, QPen
+from PySide6.QtWidgets import QSlider, QStyle
+
+WAVEFORM_MINIMUM_HEIGHT = 36
+PLAYED_WAVEFORM_COLOR = QColor(0, 127, 255, 160)
+UNPLAYED_WAVEFORM_COLOR = QColor(128, 128, 128, 110)
+
+
+class WaveformSlider(QSlider):
+    _peaks: object
+    _played_pixmap: QPixmap
+    _unplayed_pixmap: QPixmap
+    _is_waveform_dirty: bool
+
+    def __init__(self, p_parent):
+        super().__init__(Qt.Orientation.Horizontal, p_parent)
+        self._peaks = None
+        self._played_pixmap = QPixmap()
+        self._unplayed_pixmap = QPixmap()
+        self._is_waveform_dirty = True
+        self.setMinimumHeight(WAVEFORM_MINIMUM_HEIGHT)
+
+    def set_peaks(self, p_peaks):
+        self._peaks = p_peaks if p_peaks is not None and len(p_peaks) > 0 else None
+        self._is_waveform_dirty = True
+        self.update()
+
+    def resizeEvent(self, event):
+        self._is_waveform_dirty = True
+        super().resizeEvent(event)
+
+    def render_waveform(self):
+        # Both waveforms are drawn once per track or size change, painting a frame only blits them
+        from api.audio.waveform import peaks_for_width
+        width, height = self.width(), self.height()
+        mins, maxs = peaks_for_width(self._peaks, width)
+        middle = height / 2
+        scale = (height - 2) / 254
+        lines = [QLine(x, int(middle - int(maxs[x]) * scale), x, int(middle - int(mins[x]) * scale))
+                 for x in range(width)]
+        self._played_pixmap = self.render_lines(lines, PLAYED_WAVEFORM_COLOR)
+        self._unplayed_pixmap = self.render_lines(lines, UNPLAYED_WAVEFORM_COLOR)
+        self._is_waveform_dirty = False
+
+    def render_lines(self, p_lines: list, p_color: QColor):
+        pixmap = QPixmap(self.size())
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setPen(QPen(p_color, 1))
+        painter.drawLines(p_lines)
+        painter.end()
+        return pixmap
+
+    def paintEvent(self, event):
+        if self._peaks is not None:
+            if self._is_waveform_dirty:
+                self.render_waveform()
+            width, height = self.width(), self.height()
+            played_width = QStyle.sliderPositionFromValue(self.minimum(), self.maximum(), self.value(), width)
+            painter = QPainter(self)
+            painter.drawPixmap(0, 0, self._played_pixmap, 0, 0, played_width, height)
+            painter.drawPixmap(played_width, 0, self._unplayed_pixmap, played_width, 0, width - played_width, height)
+            painter.end()
+        super().paintEvent(event)